@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+CACHE_ENABLED = os.environ.get("API_CACHE", "1") not in ("0", "false", "False")
+CACHE_BACKEND = os.environ.get("API_CACHE_BACKEND", "memory")  # 'memory' or 'redis'
+CACHE_TTL_SECONDS = float(os.environ.get("API_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.environ.get("API_CACHE_MAX_ENTRIES", "1024"))
+# How often the data version is re-read from raw.data_version
+VERSION_CHECK_SECONDS = float(os.environ.get("API_CACHE_VERSION_CHECK_SECONDS", "5"))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryBackend:
+    """Per-process LRU of (expiry, value), bounded by max_entries
+
+    Its methods are async only to share RedisBackend's interface; none of them wait.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()  # sync handlers run on the threadpool
+
+    async def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    async def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    async def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    async def size(self):
+        return len(self.entries)
+
+
+class RedisBackend:
+    """Shared across API workers; entries expire with SETEX and old versions simply age out
+
+    Uses redis.asyncio, so a lookup awaits the round trip instead of blocking the event loop.
+    """
+
+    name = "redis"
+    prefix = "api-cache:"
+
+    def __init__(self, url=REDIS_URL):
+        import redis.asyncio
+        self.client = redis.asyncio.Redis.from_url(url)
+
+    async def get(self, key):
+        value = await self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key, value, ttl):
+        await self.client.setex(self.prefix + key, int(max(ttl, 1)), json.dumps(value))
+
+    async def clear(self):
+        pass  # keys carry the data version, so stale ones are never read again
+
+    async def size(self):
+        # SCAN in pages rather than KEYS, which walks the whole keyspace in one blocking call
+        count = 0
+        async for _ in self.client.scan_iter(match=self.prefix + "*", count=1000):
+            count += 1
+        return count
+
+
+class ResponseCache:
+    """
+    Caches endpoint results keyed on endpoint, parameters and the data version.
+
+    The marts only change when dbt rebuilds them; dbt's on-run-end hook bumps
+    raw.data_version, and once the new version is seen every older entry stops matching.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL_SECONDS, version_check_seconds=VERSION_CHECK_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.version_check_seconds = version_check_seconds
+        self.data_version = None
+        self.version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version_is_stale(self):
+        return time.monotonic() - self.version_checked_at >= self.version_check_seconds
+
+    async def set_version(self, version):
+        self.version_checked_at = time.monotonic()
+        if version != self.data_version:
+            if self.data_version is not None:
+                self.invalidations += 1
+                await self.backend.clear()
+            self.data_version = version
+
+    def _key(self, endpoint, params):
+        return f"{self.data_version}:{endpoint}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    async def get(self, endpoint, params):
+        value = await self.backend.get(self._key(endpoint, params))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, endpoint, params, value):
+        await self.backend.set(self._key(endpoint, params), value, self.ttl)
+
+    async def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "data_version": self.data_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": await self.backend.size(),
+        }
+
+
+def open_response_cache():
+    """The cache configured by API_CACHE_BACKEND, or None if API_CACHE=0"""
+    if not CACHE_ENABLED:
+        return None
+    backend = RedisBackend() if CACHE_BACKEND == "redis" else MemoryBackend()
+    return ResponseCache(backend)
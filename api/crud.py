@@ -1,59 +1,70 @@
+import json
+import base64
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
+from sqlalchemy.exc import DBAPIError
+from .instrumentation import timed_query
 
 # These will be implemented to query the data marts
 
 SCHEMA = "dbt_dev"
 
-def get_top_products(db: Session, limit: int = 10):
-    """Return the most frequently mentioned products."""
-    result = db.execute(
-        text(f"""
-        SELECT detected_object_class AS product_name, COUNT(*) AS mention_count
-        FROM {SCHEMA}.fct_image_detections
-        GROUP BY detected_object_class
-        ORDER BY mention_count DESC
-        LIMIT :limit
-        """),
-        {"limit": limit}
-    )
+# Both reports read the daily rollups maintained by dbt, so their cost grows with
+# the number of days and classes rather than with the number of messages
+TOP_PRODUCTS_SQL = text(f"""
+    SELECT detected_object_class AS product_name, SUM(detection_count)::BIGINT AS mention_count
+    FROM {SCHEMA}.agg_daily_product_detections
+    GROUP BY detected_object_class
+    ORDER BY mention_count DESC
+    LIMIT :limit
+""")
+
+CHANNEL_ACTIVITY_SQL = text(f"""
+    SELECT channel_name, activity_date AS date, message_count
+    FROM {SCHEMA}.agg_channel_daily_activity
+    WHERE channel_name = :channel_name
+    ORDER BY activity_date
+""")
+
+SEARCH_MESSAGES_SQL = text(f"""
+    SELECT message_id, channel_name, message_text, message_timestamp
+    FROM {SCHEMA}.fct_messages
+    WHERE message_text ILIKE :pattern
+    ORDER BY message_timestamp DESC
+    LIMIT 50
+""")
+
+# English stems OR unstemmed tokens, matching how fct_messages.search_vector is built
+SEARCH_TSQUERY = "(websearch_to_tsquery('english', :query) || websearch_to_tsquery('simple', :query))"
+
+# Sort orders for search_messages_page_async -> (ORDER BY, keyset columns compared with the cursor)
+SEARCH_SORTS = {
+    "recent": ("message_timestamp DESC, message_key DESC",
+               "(message_timestamp, message_key) < (:cursor_timestamp, :cursor_key)"),
+    "relevance": ("rank DESC, message_timestamp DESC, message_key DESC",
+                  "(rank, message_timestamp, message_key) < (CAST(:cursor_rank AS real), :cursor_timestamp, :cursor_key)"),
+}
+
+# Bumped by dbt's on-run-end hook every time the marts are rebuilt
+DATA_VERSION_SQL = text("SELECT version FROM raw.data_version WHERE id = 1")
+
+
+def _top_products_rows(rows):
     return [
         {"product_name": row[0], "mention_count": row[1]}
-        for row in result.fetchall()
+        for row in rows
     ]
 
 
-def get_channel_activity(db: Session, channel_name: str):
-    """Return posting activity for a specific channel."""
-    result = db.execute(
-        text(f"""
-        SELECT channel_name, DATE(message_timestamp) AS date, COUNT(*) AS message_count
-        FROM {SCHEMA}.fct_messages
-        WHERE channel_name = :channel_name
-        GROUP BY channel_name, DATE(message_timestamp)
-        ORDER BY date
-        """),
-        {"channel_name": channel_name}
-    )
+def _channel_activity_rows(rows):
     return [
         {"channel_name": row[0], "date": str(row[1]), "message_count": row[2]}
-        for row in result.fetchall()
+        for row in rows
     ]
 
 
-def search_messages(db: Session, query: str):
-    """Search for messages containing a specific keyword."""
-    result = db.execute(
-        text(f"""
-        SELECT message_id, channel_name, message_text, message_timestamp
-        FROM {SCHEMA}.fct_messages
-        WHERE message_text ILIKE :pattern
-        ORDER BY message_timestamp DESC
-        LIMIT 50
-        """),
-        {"pattern": f"%{query}%"}
-    )
+def _search_rows(rows):
     return [
         {
             "message_id": row[0],
@@ -61,5 +72,130 @@ def search_messages(db: Session, query: str):
             "message_text": row[2],
             "message_timestamp": str(row[3])
         }
+        for row in rows
+    ]
+
+
+@timed_query
+def get_top_products(db: Session, limit: int = 10):
+    """Return the most frequently mentioned products."""
+    result = db.execute(TOP_PRODUCTS_SQL, {"limit": limit})
+    return _top_products_rows(result.fetchall())
+
+
+@timed_query
+def get_channel_activity(db: Session, channel_name: str):
+    """Return posting activity for a specific channel."""
+    result = db.execute(CHANNEL_ACTIVITY_SQL, {"channel_name": channel_name})
+    return _channel_activity_rows(result.fetchall())
+
+
+@timed_query
+def search_messages(db: Session, query: str):
+    """Search for messages containing a specific keyword."""
+    result = db.execute(SEARCH_MESSAGES_SQL, {"pattern": f"%{query}%"})
+    return _search_rows(result.fetchall())
+
+
+# --- Async versions, run on the asyncpg pool without blocking the event loop ---
+
+@timed_query
+async def get_top_products_async(db, limit: int = 10):
+    result = await db.execute(TOP_PRODUCTS_SQL, {"limit": limit})
+    return _top_products_rows(result.fetchall())
+
+
+@timed_query
+async def get_channel_activity_async(db, channel_name: str):
+    result = await db.execute(CHANNEL_ACTIVITY_SQL, {"channel_name": channel_name})
+    return _channel_activity_rows(result.fetchall())
+
+
+@timed_query
+async def get_data_version_async(db):
+    """Current marts version, or 0 if dbt has not created raw.data_version yet"""
+    try:
+        result = await db.execute(DATA_VERSION_SQL)
+    except DBAPIError:
+        await db.rollback()
+        return 0
+    return result.scalar() or 0
+
+
+def encode_cursor(row, sort):
+    values = [row["message_timestamp"], row["message_key"]]
+    if sort == "relevance":
+        values.insert(0, row["rank"])
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, sort):
+    """Cursor -> bind parameters for the keyset condition; ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if sort == "relevance":
+            rank, timestamp, key = values
+            params = {"cursor_rank": float(rank)}
+        else:
+            timestamp, key = values
+            params = {}
+        params.update(cursor_timestamp=datetime.fromisoformat(timestamp), cursor_key=int(key))
+        return params
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+@timed_query
+async def search_messages_page_async(db, query: str, channel_name=None, date_from=None, date_to=None,
+                                     cursor=None, limit: int = 50, sort: str = "recent"):
+    """
+    Ranked full-text and substring search with keyset pagination.
+
+    Matches the tsvector (GIN) or, for partial words, the trigram index on
+    message_text. Pages continue from the cursor's (message_timestamp, message_key)
+    instead of an OFFSET, so deep pages cost the same as the first one.
+    """
+    order_by, keyset = SEARCH_SORTS[sort]
+    conditions = [f"(search_vector @@ {SEARCH_TSQUERY} OR message_text ILIKE :pattern)"]
+    params = {"query": query, "pattern": f"%{query}%", "limit": limit + 1}
+    if channel_name:
+        conditions.append("channel_name = :channel_name")
+        params["channel_name"] = channel_name
+    if date_from:
+        conditions.append("message_timestamp >= :date_from")
+        params["date_from"] = datetime.combine(date_from, datetime.min.time())
+    if date_to:
+        conditions.append("message_timestamp < :date_to")
+        params["date_to"] = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+
+    outer_conditions = []
+    if cursor:
+        params.update(decode_cursor(cursor, sort))
+        outer_conditions.append(keyset)
+
+    sql = f"""
+        SELECT message_key, message_id, channel_name, message_text, message_timestamp, rank
+        FROM (
+            SELECT message_key, message_id, channel_name, message_text, message_timestamp,
+                   ts_rank(search_vector, {SEARCH_TSQUERY}) AS rank
+            FROM {SCHEMA}.fct_messages
+            WHERE {' AND '.join(conditions)}
+        ) matches
+        {'WHERE ' + ' AND '.join(outer_conditions) if outer_conditions else ''}
+        ORDER BY {order_by}
+        LIMIT :limit
+    """
+    result = await db.execute(text(sql), params)
+    rows = [
+        {
+            "message_key": row[0],
+            "message_id": row[1],
+            "channel_name": row[2],
+            "message_text": row[3],
+            "message_timestamp": str(row[4]),
+            "rank": float(row[5]),
+        }
         for row in result.fetchall()
-    ] 
\ No newline at end of file
+    ]
+    next_cursor = encode_cursor(rows[limit - 1], sort) if len(rows) > limit else None
+    return {"results": rows[:limit], "next_cursor": next_cursor}
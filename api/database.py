@@ -1,17 +1,31 @@
-import os
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 
-load_dotenv()
+# The API shares src/db.py's engine factory with the pipeline scripts
+from .instrumentation import SRC_DIR  # noqa: F401 (puts src/ on sys.path)
+import db
+from db import POOL_OPTIONS, STATEMENT_TIMEOUT_MS  # noqa: F401
 
-DB_USER = os.environ.get("DB_USER")
-DB_PASSWORD = os.environ.get("DB_PASSWORD")
-DB_HOST = os.environ.get("DB_HOST", "localhost")
-DB_PORT = os.environ.get("DB_PORT", "5432")
-DB_NAME = os.environ.get("DB_NAME")
+DATABASE_URL = db.database_url()
+ASYNC_DATABASE_URL = db.database_url('postgresql+asyncpg')
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+engine = db.get_engine(statement_timeout_ms=STATEMENT_TIMEOUT_MS)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+_async_sessionmaker = None
+
+def get_async_engine():
+    return db.get_async_engine(statement_timeout_ms=STATEMENT_TIMEOUT_MS)
+
+def AsyncSessionLocal():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+        _async_sessionmaker = sessionmaker(
+            bind=get_async_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker()
+
+async def dispose_engines():
+    """Close pooled connections on shutdown"""
+    await db.dispose_async_engines()
+    db.dispose_engines()
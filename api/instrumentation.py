@@ -0,0 +1,20 @@
+# The API shares src/ modules (metrics, db) with the pipeline scripts
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+
+REQUEST_SECONDS = metrics.histogram(
+    'api_request_seconds', "Request latency by route template, method and status", ['route', 'method', 'status'])
+QUERY_SECONDS = metrics.histogram('api_db_query_seconds', "Database time per crud function", ['function'])
+CACHE_LOOKUPS = metrics.counter('api_cache_lookups_total', "Response cache lookups by endpoint and result",
+                                ['endpoint', 'result'])
+
+
+def timed_query(func):
+    """Observe a crud function's duration under its own name"""
+    return metrics.timed(QUERY_SECONDS, function=func.__name__)(func)
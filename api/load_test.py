@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+API Load Test
+Fires concurrent requests at a running API and compares latency and throughput of the
+async endpoints with the threadpool-based /api/sync/ ones.
+
+Usage:
+    uvicorn api.main:app --workers 1 &
+    python -m api.load_test --base-url http://localhost:8000 --concurrency 50 --requests 2000
+"""
+
+import time
+import asyncio
+import argparse
+
+import httpx
+
+ENDPOINTS = [
+    "/api/reports/top-products?limit=10",
+    "/api/channels/{channel}/activity",
+    "/api/search/messages?query={query}",
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_endpoint(client, path, total, concurrency):
+    """Send `total` GETs with at most `concurrency` in flight; returns (latencies, errors, elapsed)"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+async def main(base_url, total, concurrency, channel, query):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        print(f"{'path':<48} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for template in ENDPOINTS:
+            path = template.format(channel=channel, query=query)
+            for prefix in ("/api/", "/api/sync/"):
+                target = path.replace("/api/", prefix, 1)
+                await client.get(target)  # warm up the pool
+                latencies, errors, elapsed = await run_endpoint(client, target, total, concurrency)
+                print(f"{target:<48} {total / elapsed:>8.1f} "
+                      f"{percentile(latencies, 0.50) * 1000:>8.1f} "
+                      f"{percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare async and sync API endpoints under load")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--channel", default="lobelia4cosmetics")
+    parser.add_argument("--query", default="paracetamol")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.requests, args.concurrency, args.channel, args.query))
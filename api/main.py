@@ -1,11 +1,21 @@
-from fastapi import FastAPI, Depends
+import time
+from datetime import date
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
-from .database import SessionLocal
-from .schemas import TopProduct, ChannelActivity, MessageSearchResult
-from .crud import get_top_products, get_channel_activity, search_messages
-from typing import List
+from .database import SessionLocal, AsyncSessionLocal, dispose_engines
+from .cache import open_response_cache
+from .instrumentation import CACHE_LOOKUPS, REQUEST_SECONDS, metrics
+from .schemas import TopProduct, ChannelActivity, MessageSearchResult, RankedMessage
+from .crud import (
+    get_top_products, get_channel_activity, search_messages,
+    get_top_products_async, get_channel_activity_async, search_messages_page_async,
+    get_data_version_async,
+)
+from typing import List, Literal, Optional
 
 app = FastAPI()
+response_cache = open_response_cache()
 
 # Dependency to get DB session
 def get_db():
@@ -15,18 +25,104 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async DB session from the shared asyncpg pool
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def cached(endpoint, params, db, compute):
+    """Serve from the response cache, re-reading the data version at most every few seconds"""
+    if response_cache is None:
+        return await compute()
+    if response_cache.version_is_stale():
+        await response_cache.set_version(await get_data_version_async(db))
+    value = await response_cache.get(endpoint, params)
+    CACHE_LOOKUPS.inc(endpoint=endpoint, result='miss' if value is None else 'hit')
+    if value is None:
+        value = await compute()
+        await response_cache.set(endpoint, params, value)
+    return value
+
+if metrics.METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_request_latency(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # The route template, not the raw path, so /channels/{channel_name} is one series
+            route = request.scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route=getattr(route, "path", "unmatched"),
+                                    method=request.method, status=status)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await dispose_engines()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Analytical API"}
 
 @app.get("/api/reports/top-products", response_model=List[TopProduct])
-def top_products(limit: int = 10, db: Session = Depends(get_db)):
-    return get_top_products(db, limit=limit)
+async def top_products(limit: int = 10, db=Depends(get_async_db)):
+    return await cached("top-products", {"limit": limit}, db,
+                        lambda: get_top_products_async(db, limit=limit))
 
 @app.get("/api/channels/{channel_name}/activity", response_model=List[ChannelActivity])
-def channel_activity(channel_name: str, db: Session = Depends(get_db)):
+async def channel_activity(channel_name: str, db=Depends(get_async_db)):
+    return await cached("channel-activity", {"channel_name": channel_name}, db,
+                        lambda: get_channel_activity_async(db, channel_name=channel_name))
+
+# The body stays a list of messages; the next page's cursor travels in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+@app.get("/api/search/messages", response_model=List[RankedMessage])
+async def search_messages_endpoint(
+    response: Response,
+    query: str = Query(..., min_length=1),
+    channel: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    sort: Literal["recent", "relevance"] = "recent",
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db=Depends(get_async_db),
+):
+    try:
+        page = await search_messages_page_async(
+            db, query=query, channel_name=channel, date_from=date_from, date_to=date_to,
+            cursor=cursor, limit=limit, sort=sort,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["results"]
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of this worker's response cache"""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await response_cache.stats())}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """This worker's request, query and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Threadpool-based sync handlers, kept for comparison in api/load_test.py
+@app.get("/api/sync/reports/top-products", response_model=List[TopProduct])
+def top_products_sync(limit: int = 10, db: Session = Depends(get_db)):
+    return get_top_products(db, limit=limit)
+
+@app.get("/api/sync/channels/{channel_name}/activity", response_model=List[ChannelActivity])
+def channel_activity_sync(channel_name: str, db: Session = Depends(get_db)):
     return get_channel_activity(db, channel_name=channel_name)
 
-@app.get("/api/search/messages", response_model=List[MessageSearchResult])
-def search_messages_endpoint(query: str, db: Session = Depends(get_db)):
-    return search_messages(db, query=query) 
\ No newline at end of file
+@app.get("/api/sync/search/messages", response_model=List[MessageSearchResult])
+def search_messages_endpoint_sync(query: str, db: Session = Depends(get_db)):
+    return search_messages(db, query=query)
@@ -14,4 +14,8 @@ class MessageSearchResult(BaseModel):
     message_id: int
     channel_name: str
     message_text: str
-    message_timestamp: str 
\ No newline at end of file
+    message_timestamp: str
+
+class RankedMessage(MessageSearchResult):
+    message_key: int
+    rank: float
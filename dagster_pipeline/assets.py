@@ -0,0 +1,128 @@
+from dagster import (
+    asset, AssetSelection, DailyPartitionsDefinition, MultiPartitionsDefinition,
+    StaticPartitionsDefinition, define_asset_job,
+)
+from pathlib import Path
+import json
+import os
+import time
+
+from dagster_pipeline.pipeline import CHANNEL_DETECTIONS_DIR, PHOTOS_DIR, run_dbt
+from data_lake import data_lake_path  # noqa: E402 (src/ is on sys.path once pipeline is imported)
+
+DATA_LAKE_PATH = data_lake_path()
+PARTITIONS_START_DATE = os.getenv("PIPELINE_PARTITIONS_START", "2023-01-01")
+PARTITION_CHANNELS = [
+    channel.strip().lstrip("@")
+    for channel in os.getenv("PIPELINE_CHANNELS", "CheMed123,lobelia4cosmetics,tikvahpharma").split(",")
+    if channel.strip()
+]
+
+# One partition per posting date (the scraper's YYYY-MM-DD directories) and channel
+channel_date_partitions = MultiPartitionsDefinition({
+    "date": DailyPartitionsDefinition(start_date=PARTITIONS_START_DATE, end_offset=1),  # includes today
+    "channel": StaticPartitionsDefinition(PARTITION_CHANNELS),
+})
+
+
+def partition_files(date, channel, root=DATA_LAKE_PATH):
+    """Published JSONL segments (and a legacy <channel>.json) of one date/channel partition"""
+    partition_dir = Path(root) / date
+    return sorted(list(partition_dir.glob(f"{channel}.*.jsonl")) +
+                  list(partition_dir.glob(f"{channel}.json")))
+
+
+def _iter_records(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        if file_path.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from data if isinstance(data, list) else [data]
+
+
+def partition_photos(date, channel, photos_dir=PHOTOS_DIR):
+    """(message_id, path) for the downloaded photos of one partition's messages"""
+    photos = {}
+    for file_path in partition_files(date, channel):
+        for record in _iter_records(file_path):
+            media_path = record.get("media_path")
+            if media_path:
+                image_path = Path(photos_dir) / Path(media_path).name
+                if image_path.exists():
+                    photos[record["id"]] = image_path
+    return sorted(photos.items())
+
+
+def _partition(context):
+    keys = context.partition_key.keys_by_dimension
+    return keys["date"], keys["channel"]
+
+
+@asset(partitions_def=channel_date_partitions, group_name="telegram")
+def raw_telegram_messages(context):
+    """One date/channel partition of the data lake, loaded into raw.telegram_messages"""
+    from load_raw_data import RawDataLoader
+
+    date, channel = _partition(context)
+    files = partition_files(date, channel)
+    loader = RawDataLoader()
+    loader.create_raw_schema()
+    summary = loader.load_files(files) if files else {
+        'files_loaded': 0, 'files_failed': 0, 'files_skipped': 0, 'rows_loaded': 0}
+    context.add_output_metadata({"files": len(files), **summary})
+    if summary['files_failed']:
+        # Fail the partition so a retry (or the next backfill) picks the files up again
+        raise Exception(f"{summary['files_failed']} file(s) of {date}/{channel} failed to load")
+
+
+@asset(partitions_def=channel_date_partitions, group_name="telegram")
+def channel_image_detections(context):
+    """YOLO detections for the photos of one date/channel partition, loaded into raw.image_detections"""
+    import image_object_detection
+    import loadYOLO
+
+    date, channel = _partition(context)
+    images = partition_photos(date, channel)
+    detections = 0
+    if images:
+        os.makedirs(CHANNEL_DETECTIONS_DIR, exist_ok=True)
+        output_csv = os.path.join(CHANNEL_DETECTIONS_DIR, f"{date}_{channel}.csv")
+        parquet_files = []  # only this partition's new files, not the whole dataset
+        detections = image_object_detection.run_single_process(images, output_csv=output_csv,
+                                                               parquet_files=parquet_files)
+        if detections:
+            loadYOLO.load_detections(parquet_files or output_csv)
+    context.add_output_metadata({"photos": len(images), "detections": detections})
+
+
+@asset(deps=[raw_telegram_messages], group_name="warehouse")
+def message_content(context):
+    """Keyword flags and product mentions for messages loaded since the last classification"""
+    from classify_messages import MessageClassifier
+    from text_matcher import open_default_classifier
+
+    classified = MessageClassifier(open_default_classifier()).run()
+    context.add_output_metadata({"messages": classified})
+
+
+@asset(deps=[message_content, channel_image_detections], group_name="warehouse")
+def dbt_marts(context):
+    """Incremental `dbt run` over whatever the partitions loaded"""
+    started = time.perf_counter()
+    run_dbt()
+    context.add_output_metadata({"wall_time_s": round(time.perf_counter() - started, 2)})
+
+
+channel_partitions_job = define_asset_job(
+    "channel_partitions_job",
+    selection=AssetSelection.assets(raw_telegram_messages, channel_image_detections),
+    partitions_def=channel_date_partitions,
+)
+
+warehouse_refresh_job = define_asset_job(
+    "warehouse_refresh_job",
+    selection=AssetSelection.assets(message_content, dbt_marts),
+)
@@ -1,33 +1,164 @@
-from dagster import op, job
+from dagster import op, job, DynamicOut, DynamicOutput, multiprocess_executor
+from importlib.util import find_spec
+from pathlib import Path
+import os
+import re
+import sys
+import time
 import subprocess
 
+# The pipeline calls the scripts in src/ directly instead of shelling out to them
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+
+PIPELINE_MAX_CONCURRENT = int(os.getenv("PIPELINE_MAX_CONCURRENT", "4"))
+PHOTOS_DIR = os.getenv("PIPELINE_PHOTOS_DIR", "data/raw/photos")  # where the scraper saves photos
+CHANNEL_DETECTIONS_DIR = "data/raw/image_detections_by_channel"
+DBT_PROJECT_DIR = os.getenv("DBT_PROJECT_DIR", "dbt_project")
+
+# Imported once in the forkserver, so each op process starts with them already loaded
+PRELOAD_MODULES = [name for name in ("pandas", "sqlalchemy", "psycopg2", "ultralytics")
+                   if find_spec(name) is not None]
+
+
+def _report(context, name, started_wall, started, attach_metadata=True, **details):
+    """Log an op's wall time and return it, with the metrics its process recorded, as a report
+    that downstream ops merge"""
+    elapsed = time.perf_counter() - started
+    context.log.info(f"{name} took {elapsed:.1f}s")
+    if attach_metadata:
+        context.add_output_metadata({"wall_time_s": round(elapsed, 2), **details})
+    return {"started_at": started_wall, "timings": {name: elapsed}, "metrics": {name: metrics.snapshot()}}
+
+
+def _merge_reports(*reports):
+    """One report from several: earliest start, every op's timing"""
+    merged = {"started_at": None, "timings": {}, "metrics": {}}
+    for report in reports:
+        if report["started_at"] is not None:
+            merged["started_at"] = min(filter(None, [merged["started_at"], report["started_at"]]))
+        merged["timings"].update(report["timings"])
+        merged["metrics"].update(report.get("metrics", {}))
+    return merged
+
+
+def run_dbt():
+    """`dbt run` in-process when dbt-core >= 1.5 is installed, as a subprocess otherwise"""
+    try:
+        from dbt.cli.main import dbtRunner
+    except ImportError:
+        dbtRunner = None
+    if dbtRunner is not None:
+        result = dbtRunner().invoke(["run", "--project-dir", DBT_PROJECT_DIR, "--profiles-dir", DBT_PROJECT_DIR])
+        if not result.success:
+            raise Exception(f"dbt run failed: {result.exception}")
+    else:
+        subprocess.run(["dbt", "run"], cwd=DBT_PROJECT_DIR, check=True)
+
+
+@op
+def prepare_warehouse(context):
+    # Create raw tables once, before per-channel ops race to create them concurrently
+    started_wall, started = time.time(), time.perf_counter()
+    from load_raw_data import RawDataLoader
+    from db import get_engine
+    import loadYOLO
+
+    RawDataLoader().create_raw_schema()
+    with get_engine().begin() as conn:
+        loadYOLO.create_detections_table(conn)
+    return _report(context, "prepare_warehouse", started_wall, started)
+
+
+@op(out=DynamicOut(dict))
+def scrape_telegram_data(context):
+    # All channels in one Telethon session; they are scraped concurrently inside it.
+    # Each mapped branch receives its channel plus the scrape's report.
+    started_wall, started = time.time(), time.perf_counter()
+    import telegram_scrapper
+
+    telegram_scrapper.scrape(output_mode="jsonl")
+    report = _report(context, "scrape_telegram_data", started_wall, started, attach_metadata=False)
+    for channel in telegram_scrapper.CHANNELS:
+        name = channel.lstrip("@")
+        yield DynamicOutput({"channel": name, **report},
+                           mapping_key=re.sub(r"[^A-Za-z0-9_]", "_", name))
+
+
+@op
+def load_channel_messages(context, scraped: dict, warehouse_ready: dict):
+    started_wall, started = time.time(), time.perf_counter()
+    from load_raw_data import RawDataLoader
+
+    channel = scraped["channel"]
+    summary = RawDataLoader().load_all_raw_data(channels=[channel]) or {}
+    report = _report(context, f"load_channel_messages[{channel}]", started_wall, started, **summary)
+    return _merge_reports(scraped, warehouse_ready, report)
+
+
 @op
-def scrape_telegram_data():
-    # Replace with actual scraping logic or script call
-    subprocess.run(["python", "src/telegram_scrapper.py"], check=True)
-    return "scraped"
+def detect_channel_images(context, scraped: dict, warehouse_ready: dict):
+    # Only needs the downloaded photos, so it runs alongside the message load
+    started_wall, started = time.time(), time.perf_counter()
+    import image_object_detection
+    import loadYOLO
+
+    channel = scraped["channel"]
+    os.makedirs(CHANNEL_DETECTIONS_DIR, exist_ok=True)
+    output_csv = os.path.join(CHANNEL_DETECTIONS_DIR, f"{channel}.csv")
+    images = image_object_detection.iter_images(PHOTOS_DIR, channel=channel)
+    parquet_files = []  # only this run's files, not the whole dataset
+    detections = image_object_detection.run_single_process(images, output_csv=output_csv,
+                                                           parquet_files=parquet_files)
+    if detections:
+        loadYOLO.load_detections(parquet_files or output_csv)
+    report = _report(context, f"detect_channel_images[{channel}]", started_wall, started, detections=detections)
+    return _merge_reports(scraped, warehouse_ready, report)
+
 
 @op
-def load_raw_to_postgres(scrape_result):
-    # Replace with actual loading logic or script call
-    subprocess.run(["python", "src/load_raw_data.py"], check=True)
-    return "loaded"
+def classify_message_content(context, loads: list):
+    # Keyword flags and product mentions for the newly loaded messages
+    started_wall, started = time.time(), time.perf_counter()
+    from classify_messages import MessageClassifier
+    from text_matcher import open_default_classifier
+
+    classified = MessageClassifier(open_default_classifier()).run()
+    report = _report(context, "classify_message_content", started_wall, started, messages=classified)
+    return _merge_reports(*loads, report)
+
 
 @op
-def run_dbt_transformations(load_result):
-    # Run dbt transformations
-    subprocess.run(["dbt", "run"], cwd="Shipping-Data-Product/dbt_project", check=True)
+def run_dbt_transformations(context, classified: dict, detections: list):
+    # Needs both the messages and the detections, so fct_image_detections is current
+    started_wall, started = time.time(), time.perf_counter()
+    run_dbt()
+
+    report = _merge_reports(classified, *detections,
+                            _report(context, "run_dbt_transformations", started_wall, started))
+    total = time.time() - report["started_at"]
+    context.log.info("Wall time per op:\n" + "\n".join(
+        f"  {name:<48} {seconds:>8.1f}s" for name, seconds in report["timings"].items())
+        + f"\n  {'end to end':<48} {total:>8.1f}s")
+    context.add_output_metadata({"end_to_end_s": round(total, 2)})
+    metrics.write_run_report(f"pipeline-{context.run_id[:8]}", report["started_at"], {
+        "run_id": context.run_id,
+        "op_seconds": {name: round(seconds, 3) for name, seconds in report["timings"].items()},
+    }, metrics_snapshot=report["metrics"])
     return "dbt_done"
 
-@op
-def run_yolo_enrichment(dbt_result):
-    # Replace with actual YOLO enrichment logic or script call
-    subprocess.run(["python", "src/loadYOLO.py"], check=True)
-    return "yolo_done"
 
-@job
+@job(executor_def=multiprocess_executor.configured({
+    "max_concurrent": PIPELINE_MAX_CONCURRENT,
+    "start_method": {"forkserver": {"preload_modules": PRELOAD_MODULES}},
+}))
 def shipping_data_pipeline():
-    telegram = scrape_telegram_data()
-    raw = load_raw_to_postgres(telegram)
-    dbt = run_dbt_transformations(raw)
-    run_yolo_enrichment(dbt) 
\ No newline at end of file
+    ready = prepare_warehouse()
+    channels = scrape_telegram_data()
+    loads = channels.map(lambda channel: load_channel_messages(channel, ready))
+    detections = channels.map(lambda channel: detect_channel_images(channel, ready))
+    classified = classify_message_content(loads.collect())
+    run_dbt_transformations(classified, detections.collect())
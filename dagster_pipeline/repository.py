@@ -1,6 +1,16 @@
 from dagster import repository
 from dagster_pipeline.pipeline import shipping_data_pipeline
+from dagster_pipeline.assets import (
+    raw_telegram_messages, channel_image_detections, message_content, dbt_marts,
+    channel_partitions_job, warehouse_refresh_job,
+)
+from dagster_pipeline.sensors import new_files_sensor, warehouse_refresh_sensor
 
 @repository
 def shipping_repo():
-    return [shipping_data_pipeline] 
\ No newline at end of file
+    return [
+        shipping_data_pipeline,
+        raw_telegram_messages, channel_image_detections, message_content, dbt_marts,
+        channel_partitions_job, warehouse_refresh_job,
+        new_files_sensor, warehouse_refresh_sensor,
+    ]
@@ -0,0 +1,160 @@
+from dagster import (
+    sensor, AssetKey, DagsterRunStatus, MultiPartitionKey, RunRequest, RunsFilter, SkipReason,
+)
+from pathlib import Path
+import json
+import os
+import re
+import time
+
+from dagster_pipeline.assets import (
+    DATA_LAKE_PATH, PARTITION_CHANNELS, PARTITIONS_START_DATE, PHOTOS_DIR,
+    channel_image_detections, channel_partitions_job, warehouse_refresh_job,
+)
+
+SENSOR_INTERVAL_SECONDS = int(os.getenv("PIPELINE_SENSOR_INTERVAL", "60"))
+# A photo whose message is not in a published segment yet is looked for again for this long
+PHOTO_MATCH_GRACE_SECONDS = int(os.getenv("PIPELINE_PHOTO_GRACE_SECONDS", "3600"))
+DATE_DIR_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+IN_PROGRESS = [DagsterRunStatus.QUEUED, DagsterRunStatus.NOT_STARTED,
+               DagsterRunStatus.STARTING, DagsterRunStatus.STARTED]
+
+# segment path -> (change time, photo filenames its records reference). Published segments
+# are renamed into place complete, so each is read once per sensor process rather than
+# on every tick that still has unmatched photos.
+_segment_photos = {}
+
+
+def _changed_at(path):
+    # ctime also moves on rename (a published segment) and on hard-linking (a deduplicated photo)
+    stat = os.lstat(path)
+    return max(stat.st_mtime, stat.st_ctime)
+
+
+def _date_dirs(root=DATA_LAKE_PATH):
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted((d for d in root.iterdir()
+                   if DATE_DIR_PATTERN.match(d.name) and d.name >= PARTITIONS_START_DATE), reverse=True)
+
+
+def changed_segments(since, root=DATA_LAKE_PATH):
+    """{(date, channel): newest change time} for data lake files changed after `since`"""
+    changed = {}
+    for date_dir in _date_dirs(root):
+        for path in list(date_dir.glob("*.jsonl")) + list(date_dir.glob("*.json")):
+            channel = path.name.split(".")[0]
+            changed_at = _changed_at(path)
+            if channel in PARTITION_CHANNELS and changed_at > since:
+                key = (date_dir.name, channel)
+                changed[key] = max(changed.get(key, 0.0), changed_at)
+    return changed
+
+
+def changed_photos(since, photos_dir=PHOTOS_DIR):
+    """{channel: {filename: change time}} for '@<channel>_<id>.jpg' photos changed after `since`"""
+    changed = {}
+    photos_dir = Path(photos_dir)
+    if not photos_dir.is_dir():
+        return changed
+    for path in photos_dir.glob("@*_*.jpg"):
+        channel = path.stem.rsplit("_", 1)[0].lstrip("@")
+        changed_at = _changed_at(path)
+        if channel in PARTITION_CHANNELS and changed_at > since:
+            changed.setdefault(channel, {})[path.name] = changed_at
+    return changed
+
+
+def segment_photos(path):
+    """Filenames of the photos a segment's records point to, re-read only if the file changed"""
+    changed_at = _changed_at(path)
+    cached = _segment_photos.get(path)
+    if cached is None or cached[0] != changed_at:
+        names = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if ".jpg" not in line:
+                    continue
+                media_path = json.loads(line).get("media_path")
+                if media_path:
+                    names.add(Path(media_path).name)
+        cached = _segment_photos[path] = (changed_at, frozenset(names))
+    return cached[1]
+
+
+def locate_photos(photos_by_channel, root=DATA_LAKE_PATH):
+    """Find each photo's partition from the segment record that references it
+
+    Returns ({(date, channel): newest photo change time}, {filename: change time} not found).
+    Dates are searched newest first, since new photos almost always belong to recent messages.
+    Segments are looked up in the segment_photos index, so only new files are read.
+    """
+    located = {}
+    unmatched = {}
+    date_dirs = _date_dirs(root)
+    for channel, photos in photos_by_channel.items():
+        remaining = dict(photos)
+        for date_dir in date_dirs:
+            if not remaining:
+                break
+            for path in date_dir.glob(f"{channel}.*.jsonl"):
+                for name in segment_photos(path) & remaining.keys():
+                    key = (date_dir.name, channel)
+                    located[key] = max(located.get(key, 0.0), remaining.pop(name))
+        unmatched.update(remaining)
+    return located, unmatched
+
+
+def _partition_key(date, channel):
+    return MultiPartitionKey({"date": date, "channel": channel})
+
+
+@sensor(job=channel_partitions_job, minimum_interval_seconds=SENSOR_INTERVAL_SECONDS)
+def new_files_sensor(context):
+    """Materialize only the date/channel partitions with new segments in DATA_LAKE_PATH or new photos"""
+    cursor = json.loads(context.cursor) if context.cursor else {"segments": 0.0, "photos": 0.0}
+    segments = changed_segments(cursor["segments"])
+    photos = changed_photos(cursor["photos"])
+    located, unmatched = locate_photos(photos)
+
+    # New segments: load the messages and detect their photos
+    for (date, channel), changed_at in sorted(segments.items()):
+        yield RunRequest(run_key=f"{date}|{channel}|segments|{changed_at}",
+                         partition_key=_partition_key(date, channel))
+    # New photos of messages loaded earlier: detections only
+    for (date, channel), changed_at in sorted(located.items()):
+        if (date, channel) not in segments:
+            yield RunRequest(run_key=f"{date}|{channel}|photos|{changed_at}",
+                             partition_key=_partition_key(date, channel),
+                             asset_selection=[channel_image_detections.key])
+
+    # Photos whose message segment is still being written hold the cursor back; run keys
+    # stop the partitions seen again from launching twice
+    now = time.time()
+    waiting = [t for t in unmatched.values() if now - t < PHOTO_MATCH_GRACE_SECONDS]
+    if len(waiting) < len(unmatched):
+        context.log.warning(f"{len(unmatched) - len(waiting)} photo(s) matched no message; skipping them")
+    photo_times = [t for channel_photos in photos.values() for t in channel_photos.values()]
+    context.update_cursor(json.dumps({
+        "segments": max([cursor["segments"], *segments.values()]),
+        "photos": min(waiting) - 1e-6 if waiting else max([cursor["photos"], *photo_times]),
+    }))
+
+
+@sensor(job=warehouse_refresh_job, minimum_interval_seconds=SENSOR_INTERVAL_SECONDS)
+def warehouse_refresh_sensor(context):
+    """Classify and run dbt once, after the partition runs (or a backfill) have finished"""
+    active = context.instance.get_runs(filters=RunsFilter(statuses=IN_PROGRESS))
+    if any(run.job_name != warehouse_refresh_job.name for run in active):
+        return SkipReason("Waiting for partition runs to finish")
+
+    latest = [context.instance.get_latest_materialization_event(AssetKey(name))
+              for name in ("raw_telegram_messages", "channel_image_detections")]
+    latest_upstream = max((event.timestamp for event in latest if event), default=None)
+    if latest_upstream is None:
+        return SkipReason("No partitions materialized yet")
+    marts = context.instance.get_latest_materialization_event(AssetKey("dbt_marts"))
+    if marts and marts.timestamp >= latest_upstream:
+        return SkipReason("Marts are up to date")
+    return RunRequest(run_key=f"warehouse|{latest_upstream}")
@@ -0,0 +1,9 @@
+{% macro has_column(relation, column_name) %}
+  {#- True if the existing relation already has the column. Incremental models use it to
+      fall back to a full recount when they read a column an older build did not have. -#}
+  {% if not execute %}
+    {{ return(false) }}
+  {% endif %}
+  {% set columns = adapter.get_columns_in_relation(relation) | map(attribute='name') | map('lower') | list %}
+  {{ return(column_name | lower in columns) }}
+{% endmacro %}
@@ -0,0 +1,65 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key=['channel_name', 'activity_date'],
+    on_schema_change='append_new_columns',
+    tags=['marts', 'rollups'],
+    post_hook="CREATE INDEX IF NOT EXISTS idx_agg_channel_daily_activity_channel_date ON {{ this }} (channel_name, activity_date)"
+  )
+}}
+
+-- Daily message counts per channel, backing /api/channels/{channel_name}/activity.
+-- Incremental runs only recount the (channel, day) pairs that received newly loaded messages.
+-- The per-day sums also feed dim_channels, so it never has to scan fct_messages.
+-- A rollup built before those sums existed is recounted in full once, which fills them in.
+{% set recount_touched_days = is_incremental() and has_column(this, 'total_word_count') %}
+
+WITH
+{% if recount_touched_days %}
+touched_days AS (
+    SELECT DISTINCT channel_name, DATE(message_timestamp) AS activity_date
+    FROM {{ ref('fct_messages') }}
+    WHERE loaded_at > (SELECT COALESCE(MAX(max_loaded_at), '1900-01-01') FROM {{ this }})
+                      - INTERVAL '{{ var("lookback_hours") }} hours'
+      AND channel_name IS NOT NULL
+      AND message_timestamp IS NOT NULL
+),
+{% endif %}
+
+daily AS (
+    SELECT
+        m.channel_name,
+        DATE(m.message_timestamp) AS activity_date,
+        MAX(m.channel_id) AS channel_id,
+        COUNT(*) AS message_count,
+        SUM(CASE WHEN m.has_media THEN 1 ELSE 0 END) AS media_message_count,
+        SUM(m.message_length) AS total_message_length,
+        SUM(m.word_count) AS total_word_count,
+        MIN(m.message_timestamp) AS first_message_at,
+        MAX(m.message_timestamp) AS last_message_at,
+        MAX(m.loaded_at) AS max_loaded_at
+    FROM {{ ref('fct_messages') }} m
+    {% if recount_touched_days %}
+    JOIN touched_days t
+        ON m.channel_name = t.channel_name
+       AND m.message_timestamp >= t.activity_date
+       AND m.message_timestamp < t.activity_date + 1
+    {% endif %}
+    WHERE m.channel_name IS NOT NULL
+      AND m.message_timestamp IS NOT NULL
+    GROUP BY m.channel_name, DATE(m.message_timestamp)
+)
+
+SELECT
+    channel_name,
+    activity_date,
+    channel_id,
+    message_count,
+    media_message_count,
+    total_message_length,
+    total_word_count,
+    first_message_at,
+    last_message_at,
+    max_loaded_at,
+    CURRENT_TIMESTAMP AS dbt_updated_at
+FROM daily
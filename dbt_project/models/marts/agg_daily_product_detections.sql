@@ -0,0 +1,62 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key=['detection_date', 'channel_name', 'detected_object_class'],
+    tags=['marts', 'rollups'],
+    post_hook="CREATE INDEX IF NOT EXISTS idx_agg_daily_product_detections_class ON {{ this }} (detected_object_class)"
+  )
+}}
+
+-- Daily detection counts per object class and channel, backing /api/reports/top-products.
+-- Incremental runs only recount the groups that received new detections. Detections whose
+-- message is not in fct_messages yet are left out until it arrives; fct_image_detections
+-- then reports the message's loaded_at, so the group is picked up on that run.
+
+WITH detections AS (
+    SELECT
+        DATE(message_timestamp) AS detection_date,
+        channel_name,
+        detected_object_class,
+        confidence_score,
+        loaded_at
+    FROM {{ ref('fct_image_detections') }}
+    WHERE channel_name IS NOT NULL
+      AND message_timestamp IS NOT NULL
+),
+
+{% if is_incremental() %}
+touched_groups AS (
+    SELECT DISTINCT detection_date, channel_name, detected_object_class
+    FROM detections
+    WHERE loaded_at > (SELECT COALESCE(MAX(max_loaded_at), '1900-01-01') FROM {{ this }})
+                      - INTERVAL '{{ var("lookback_hours") }} hours'
+),
+{% endif %}
+
+daily AS (
+    SELECT
+        d.detection_date,
+        d.channel_name,
+        d.detected_object_class,
+        COUNT(*) AS detection_count,
+        AVG(d.confidence_score) AS avg_confidence_score,
+        MAX(d.loaded_at) AS max_loaded_at
+    FROM detections d
+    {% if is_incremental() %}
+    JOIN touched_groups t
+        ON d.detection_date = t.detection_date
+       AND d.channel_name = t.channel_name
+       AND d.detected_object_class = t.detected_object_class
+    {% endif %}
+    GROUP BY d.detection_date, d.channel_name, d.detected_object_class
+)
+
+SELECT
+    detection_date,
+    channel_name,
+    detected_object_class,
+    detection_count,
+    avg_confidence_score,
+    max_loaded_at,
+    CURRENT_TIMESTAMP AS dbt_updated_at
+FROM daily
@@ -5,19 +5,20 @@
   )
 }}
 
+-- Re-summed from the incrementally maintained per-day rollup (one row per channel
+-- and day) instead of scanning every message
 WITH channel_data AS (
-    SELECT DISTINCT
+    SELECT
         channel_name,
-        channel_id,
-        COUNT(*) as total_messages,
-        MIN(message_timestamp) as first_message_date,
-        MAX(message_timestamp) as last_message_date,
-        AVG(message_length) as avg_message_length,
-        AVG(word_count) as avg_word_count,
-        SUM(CASE WHEN has_media THEN 1 ELSE 0 END) as media_messages_count
-    FROM {{ ref('stg_telegram_messages') }}
-    WHERE channel_name IS NOT NULL
-    GROUP BY channel_name, channel_id
+        MAX(channel_id) as channel_id,
+        SUM(message_count) as total_messages,
+        MIN(first_message_at) as first_message_date,
+        MAX(last_message_at) as last_message_date,
+        SUM(total_message_length)::float / NULLIF(SUM(message_count), 0) as avg_message_length,
+        SUM(total_word_count)::float / NULLIF(SUM(message_count), 0) as avg_word_count,
+        SUM(media_message_count) as media_messages_count
+    FROM {{ ref('agg_channel_daily_activity') }}
+    GROUP BY channel_name
 ),
 
 final AS (
@@ -1,14 +1,24 @@
 {{
   config(
-    materialized='table',
+    materialized='incremental',
+    unique_key='date_key',
+    on_schema_change='append_new_columns',
     tags=['marts', 'dimensions']
   )
 }}
 
+-- Incremental runs rebuild only the dates that received newly loaded messages;
+-- their stats are recounted from staging through its message_date index.
+-- A dim_dates built as a table before this model was incremental has no max_loaded_at,
+-- so its first incremental run recounts every date and appends the column.
+
 WITH date_spine AS (
     SELECT DISTINCT message_date as date_key
     FROM {{ ref('stg_telegram_messages') }}
     WHERE message_date IS NOT NULL
+    {% if is_incremental() and has_column(this, 'max_loaded_at') %}
+      AND loaded_at > (SELECT MAX(max_loaded_at) FROM {{ this }}) - INTERVAL '{{ var("lookback_hours") }} hours'
+    {% endif %}
 ),
 
 date_attributes AS (
@@ -81,9 +91,10 @@ message_stats AS (
         COUNT(DISTINCT sender_id) as active_senders,
         AVG(message_length) as avg_message_length,
         AVG(word_count) as avg_word_count,
-        SUM(CASE WHEN has_media THEN 1 ELSE 0 END) as media_messages
+        SUM(CASE WHEN has_media THEN 1 ELSE 0 END) as media_messages,
+        MAX(loaded_at) as max_loaded_at
     FROM {{ ref('stg_telegram_messages') }}
-    WHERE message_date IS NOT NULL
+    WHERE message_date IN (SELECT date_key FROM date_spine)
     GROUP BY message_date
 )
 
@@ -113,6 +124,7 @@ SELECT
     COALESCE(ms.avg_message_length, 0) as avg_message_length,
     COALESCE(ms.avg_word_count, 0) as avg_word_count,
     COALESCE(ms.media_messages, 0) as media_messages,
+    ms.max_loaded_at,
     CURRENT_TIMESTAMP as dbt_updated_at
 FROM date_attributes da
 LEFT JOIN message_stats ms ON da.date_key = ms.date_key 
\ No newline at end of file
@@ -3,9 +3,12 @@
 with detections as (
     select
         d.message_id,
+        -- '@<channel>_<message id>.jpg' -> '<channel>', as columnar_io.channel_from_filename does
+        regexp_replace(d.image_filename, '^@?(.*)_[^_]*$', '\1') as channel_name,
         d.image_filename,
         d.detected_object_class,
-        d.confidence_score
+        d.confidence_score,
+        d.loaded_at
     from {{ source('raw', 'image_detections') }} d
 ),
 
@@ -14,7 +17,8 @@ messages as (
         message_key,
         message_id,
         channel_name,
-        message_timestamp
+        message_timestamp,
+        loaded_at
     from {{ ref('fct_messages') }}
 )
 
@@ -24,7 +28,11 @@ select
     d.detected_object_class,
     d.confidence_score,
     m.channel_name,
-    m.message_timestamp
+    m.message_timestamp,
+    -- Changes when either the detection or its message is (re)loaded; drives the rollups
+    greatest(d.loaded_at, m.loaded_at) as loaded_at
 from detections d
+-- Telegram message ids are only unique within a channel
 left join messages m
-    on d.message_id = m.message_id
\ No newline at end of file
+    on d.message_id = m.message_id
+   and d.channel_name = ltrim(m.channel_name, '@')
\ No newline at end of file
@@ -1,7 +1,19 @@
 {{
   config(
-    materialized='table',
-    tags=['marts', 'facts']
+    materialized='incremental',
+    unique_key='message_key',
+    on_schema_change='append_new_columns',
+    tags=['marts', 'facts'],
+    pre_hook="CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    post_hook=[
+      "CREATE UNIQUE INDEX IF NOT EXISTS idx_fct_messages_message_key ON {{ this }} (message_key)",
+      "CREATE INDEX IF NOT EXISTS idx_fct_messages_message_id ON {{ this }} (message_id)",
+      "CREATE INDEX IF NOT EXISTS idx_fct_messages_loaded_at ON {{ this }} (loaded_at)",
+      "CREATE INDEX IF NOT EXISTS idx_fct_messages_search_vector ON {{ this }} USING GIN (search_vector)",
+      "CREATE INDEX IF NOT EXISTS idx_fct_messages_text_trgm ON {{ this }} USING GIN (message_text gin_trgm_ops)",
+      "CREATE INDEX IF NOT EXISTS idx_fct_messages_timestamp_key ON {{ this }} (message_timestamp DESC, message_key DESC)",
+      "CREATE INDEX IF NOT EXISTS idx_fct_messages_channel_timestamp_key ON {{ this }} (channel_name, message_timestamp DESC, message_key DESC)"
+    ]
   )
 }}
 
@@ -26,25 +38,37 @@ WITH messages AS (
         message_type,
         loaded_at
     FROM {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    -- Only messages (re)loaded since the last run, with the same lookback as staging,
+    -- plus messages the classifier has (re)classified since, e.g. after a dictionary change
+    WHERE loaded_at > (SELECT MAX(loaded_at) FROM {{ this }}) - INTERVAL '{{ var("lookback_hours") }} hours'
+       OR message_key IN (
+           SELECT message_key
+           FROM {{ source('raw', 'message_content') }}
+           {#- A table built before classified_at was carried over takes every classified message once -#}
+           {% if has_column(this, 'classified_at') %}
+           WHERE classified_at > (SELECT COALESCE(MAX(classified_at), '1900-01-01') FROM {{ this }})
+                                 - INTERVAL '{{ var("lookback_hours") }} hours'
+           {% endif %}
+       )
+    {% endif %}
 ),
 
-channels AS (
-    SELECT channel_key, channel_id
-    FROM {{ ref('dim_channels') }}
-),
-
-dates AS (
-    SELECT date_key, year, month, day, day_of_week, quarter, is_weekend
-    FROM {{ ref('dim_dates') }}
+-- Flags from src/classify_messages.py (one dictionary pass per message)
+content AS (
+    SELECT message_key, flags, classified_at
+    FROM {{ source('raw', 'message_content') }}
 )
 
 SELECT
     -- Primary key
     m.message_key,
     
-    -- Foreign keys to dimension tables
-    c.channel_key,
-    d.date_key,
+    -- Foreign keys to dimension tables. These are the natural keys dim_channels and
+    -- dim_dates are built on, so they are derived here rather than joined; the
+    -- relationships tests in _marts.yml still check them.
+    m.channel_name as channel_key,
+    m.message_date as date_key,
     
     -- Message identifiers
     m.message_id,
@@ -53,6 +77,10 @@ SELECT
     
     -- Message content
     m.message_text,
+    -- Full-text search: English stems plus unstemmed 'simple' tokens, since Postgres
+    -- has no Amharic dictionary and Ge'ez-script words must still match as written
+    setweight(to_tsvector('english', COALESCE(m.message_text, '')), 'A')
+        || setweight(to_tsvector('simple', COALESCE(m.message_text, '')), 'B') as search_vector,
     m.message_length,
     m.word_count,
     m.message_type,
@@ -60,7 +88,7 @@ SELECT
     -- Time attributes
     m.message_timestamp,
     m.message_hour,
-    d.is_weekend,
+    EXTRACT(DOW FROM m.message_date) IN (0, 6) as is_weekend,
     
     -- Media information
     m.has_media,
@@ -81,28 +109,29 @@ SELECT
         ELSE 'empty'
     END as message_detail_level,
     
-    -- Content analysis
-    CASE 
-        WHEN m.message_text ILIKE '%medic%' OR m.message_text ILIKE '%drug%' OR m.message_text ILIKE '%pharma%' 
-        THEN TRUE 
-        ELSE FALSE 
-    END as contains_medical_content,
+    -- Content analysis: classifier flags, falling back to ILIKE for messages
+    -- the classifier has not seen yet (COALESCE skips the ILIKEs otherwise)
+    COALESCE(
+        'medical_content' = ANY(c.flags),
+        m.message_text ILIKE '%medic%' OR m.message_text ILIKE '%drug%' OR m.message_text ILIKE '%pharma%',
+        FALSE
+    ) as contains_medical_content,
     
-    CASE 
-        WHEN m.message_text ILIKE '%order%' OR m.message_text ILIKE '%buy%' OR m.message_text ILIKE '%purchase%' 
-        THEN TRUE 
-        ELSE FALSE 
-    END as contains_purchase_intent,
+    COALESCE(
+        'purchase_intent' = ANY(c.flags),
+        m.message_text ILIKE '%order%' OR m.message_text ILIKE '%buy%' OR m.message_text ILIKE '%purchase%',
+        FALSE
+    ) as contains_purchase_intent,
     
-    CASE 
-        WHEN m.message_text ILIKE '%delivery%' OR m.message_text ILIKE '%ship%' OR m.message_text ILIKE '%deliver%' 
-        THEN TRUE 
-        ELSE FALSE 
-    END as contains_delivery_content,
+    COALESCE(
+        'delivery_content' = ANY(c.flags),
+        m.message_text ILIKE '%delivery%' OR m.message_text ILIKE '%ship%' OR m.message_text ILIKE '%deliver%',
+        FALSE
+    ) as contains_delivery_content,
     
     m.loaded_at,
+    c.classified_at,
     CURRENT_TIMESTAMP as dbt_updated_at
 
 FROM messages m
-LEFT JOIN channels c ON m.channel_id = c.channel_id
-LEFT JOIN dates d ON m.message_date = d.date_key 
\ No newline at end of file
+LEFT JOIN content c ON c.message_key = m.message_key 
\ No newline at end of file
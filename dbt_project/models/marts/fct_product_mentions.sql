@@ -0,0 +1,21 @@
+{{
+  config(
+    materialized='table',
+    tags=['marts', 'facts']
+  )
+}}
+
+-- Products named in message text (src/classify_messages.py), alongside the YOLO-based
+-- fct_image_detections
+
+SELECT
+    pm.message_key,
+    m.channel_key,
+    m.date_key,
+    m.channel_name,
+    m.message_timestamp,
+    pm.product_name,
+    pm.matched_term,
+    pm.mention_count
+FROM {{ source('raw', 'message_product_mentions') }} pm
+JOIN {{ ref('fct_messages') }} m ON m.message_key = pm.message_key
@@ -1,12 +1,24 @@
 {{
   config(
-    materialized='view',
-    tags=['staging', 'telegram']
+    materialized='incremental',
+    unique_key='message_key',
+    tags=['staging', 'telegram'],
+    post_hook=[
+      "CREATE UNIQUE INDEX IF NOT EXISTS idx_stg_telegram_messages_message_key ON {{ this }} (message_key)",
+      "CREATE INDEX IF NOT EXISTS idx_stg_telegram_messages_loaded_at ON {{ this }} (loaded_at)",
+      "CREATE INDEX IF NOT EXISTS idx_stg_telegram_messages_message_date ON {{ this }} (message_date)"
+    ]
   )
 }}
 
+-- Incremental runs only clean rows loaded since the last run, minus a lookback window
+-- for late-arriving rows (e.g. a long COPY transaction that committed after a shorter one)
+
 WITH source AS (
     SELECT * FROM {{ source('raw', 'telegram_messages') }}
+    {% if is_incremental() %}
+    WHERE loaded_at > (SELECT MAX(loaded_at) FROM {{ this }}) - INTERVAL '{{ var("lookback_hours") }} hours'
+    {% endif %}
 ),
 
 cleaned AS (
@@ -3,6 +3,7 @@
 
 -- Create extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;  -- trigram index for message search
 
 -- Create schemas
 CREATE SCHEMA IF NOT EXISTS raw;
@@ -40,6 +41,58 @@ CREATE INDEX IF NOT EXISTS idx_telegram_messages_channel_id ON raw.telegram_mess
 CREATE INDEX IF NOT EXISTS idx_telegram_messages_message_date ON raw.telegram_messages(message_date);
 CREATE INDEX IF NOT EXISTS idx_telegram_messages_sender_id ON raw.telegram_messages(sender_id);
 CREATE INDEX IF NOT EXISTS idx_telegram_messages_raw_data ON raw.telegram_messages USING GIN(raw_data);
+CREATE INDEX IF NOT EXISTS idx_telegram_messages_loaded_at ON raw.telegram_messages(loaded_at);  -- incremental dbt models
+
+-- One row per message; reloads upsert on this key
+CREATE UNIQUE INDEX IF NOT EXISTS uq_telegram_messages_channel_message ON raw.telegram_messages(channel_id, message_id);
+
+-- YOLO detections loaded incrementally by src/loadYOLO.py
+CREATE TABLE IF NOT EXISTS raw.image_detections (
+    id BIGSERIAL PRIMARY KEY,
+    message_id BIGINT NOT NULL,
+    image_filename TEXT NOT NULL,
+    detected_object_class TEXT NOT NULL,
+    confidence_score DOUBLE PRECISION,
+    bbox DOUBLE PRECISION[],
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_image_detections_detection ON raw.image_detections(message_id, image_filename, detected_object_class, bbox);
+CREATE INDEX IF NOT EXISTS idx_image_detections_message_id ON raw.image_detections(message_id);
+
+-- Files already loaded by src/load_raw_data.py
+CREATE TABLE IF NOT EXISTS raw.load_manifest (
+    file_path TEXT PRIMARY KEY,
+    file_size BIGINT,
+    file_mtime DOUBLE PRECISION,
+    content_hash VARCHAR(64),
+    rows_loaded INTEGER,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Content flags and product mentions written by src/classify_messages.py
+CREATE TABLE IF NOT EXISTS raw.message_content (
+    message_key BIGINT PRIMARY KEY,
+    flags TEXT[] NOT NULL,
+    dictionary_version VARCHAR(16) NOT NULL,
+    classified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_message_content_classified_at ON raw.message_content(classified_at);
+CREATE TABLE IF NOT EXISTS raw.message_product_mentions (
+    message_key BIGINT NOT NULL,
+    product_name TEXT NOT NULL,
+    matched_term TEXT NOT NULL,
+    mention_count INTEGER NOT NULL,
+    PRIMARY KEY (message_key, product_name)
+);
+CREATE INDEX IF NOT EXISTS idx_message_product_mentions_product ON raw.message_product_mentions(product_name);
+
+-- Marts version, bumped by dbt's on-run-end hook; the API's response cache keys on it
+CREATE TABLE IF NOT EXISTS raw.data_version (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO raw.data_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
 
 -- Log successful initialization
 DO $$
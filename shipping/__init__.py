@@ -0,0 +1,9 @@
+# The CLI runs the scripts in src/ by module name, like the Dagster pipeline does
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+for path in (SRC_DIR, ROOT_DIR):  # src/ for the scripts, the root for the api package
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,3 @@
+from shipping.cli import main
+
+main()
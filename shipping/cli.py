@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Shipping Data Product CLI
+One entry point for the pipeline scripts and the API:
+
+    python -m shipping scrape [--backfill] [--output jsonl]
+    python -m shipping load [--force] [--workers N]
+    python -m shipping detect [--workers N]
+    python -m shipping enrich [--csv PATH] [--format json|parquet]
+    python -m shipping load-detections [PATH]
+    python -m shipping classify
+    python -m shipping serve [--host H] [--port P] [--workers N] [--reload]
+    python -m shipping cold-start [COMMAND ...]
+
+Options after the command go to the script's own parser (`python -m shipping load --help`).
+A command imports its module only when it runs, so `load` never pulls in Telethon, torch
+or FastAPI, and `--help` at the top level imports none of them.
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import statistics
+import subprocess
+
+from shipping import ROOT_DIR
+
+# command: (module in src/, entry point taking argv, help)
+COMMANDS = {
+    'scrape': ('telegram_scrapper', 'cli', "scrape the Telegram channels"),
+    'load': ('load_raw_data', 'main', "load the data lake into raw.telegram_messages"),
+    'detect': ('image_object_detection', 'main', "run YOLO over the downloaded photos"),
+    'enrich': ('yolo_image_enrichment', 'main', "run YOLO over the photos of the labeled messages CSV"),
+    'load-detections': ('loadYOLO', 'main', "load detection results into raw.image_detections"),
+    'classify': ('classify_messages', 'main', "flag message content and product mentions"),
+    'benchmark': ('benchmark_suite', 'main', "benchmark the pipeline stages on a synthetic corpus"),
+    'check-db': ('db', None, "print the Postgres server version"),
+}
+DB_COMMANDS = {'load', 'load-detections', 'classify', 'check-db', 'serve'}
+# Set by `cold-start`: stop once the command's modules are imported and its engine is built
+COLD_START_ENV = 'SHIPPING_COLD_START'
+# The module a script run directly (`python src/<script>.py`) imported before the CLI existed
+BASELINE_IMPORTS = {
+    'scrape': 'telegram_scrapper', 'load': 'load_raw_data', 'detect': 'image_object_detection',
+    'enrich': 'yolo_image_enrichment',
+    'load-detections': 'loadYOLO', 'classify': 'classify_messages', 'serve': 'uvicorn, api.main',
+}
+
+def prepare(command):
+    """Import what the command needs and return its entry point; nothing else is loaded"""
+    if command == 'serve':
+        import uvicorn  # noqa: F401
+        import api.main  # noqa: F401 (builds the app and the shared engine)
+        return serve
+    module_name, entry, _ = COMMANDS[command]
+    module = importlib.import_module(module_name)
+    if command in DB_COMMANDS:
+        import db
+        db.get_engine()
+    if entry is None:
+        return lambda argv: module.check_connection()
+    return getattr(module, entry)
+
+def serve(argv):
+    parser = argparse.ArgumentParser(prog='python -m shipping serve', description="Run the analytical API")
+    parser.add_argument('--host', default=os.getenv('API_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('API_PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('API_WORKERS', '1')))
+    parser.add_argument('--reload', action='store_true')
+    args = parser.parse_args(argv)
+    import uvicorn
+    uvicorn.run('api.main:app', host=args.host, port=args.port, workers=args.workers, reload=args.reload)
+
+def _time_runs(cmd, runs, cwd, env=None):
+    """Wall-clock seconds of each run of cmd, or None if it fails"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"  {' '.join(cmd[1:])} failed: {result.stderr.strip().splitlines()[-1:] or result.returncode}")
+            return None
+        timings.append(elapsed)
+    return timings
+
+def cold_start(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m shipping cold-start',
+        description="Time each command from process start until it is ready to work (imports done, engine built)")
+    parser.add_argument('commands', nargs='*', default=['load', 'serve'],
+                        choices=sorted(set(COMMANDS) | {'serve'}), metavar='COMMAND')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--baseline-tree', metavar='DIR',
+                        help="also time importing each script directly in a checkout of an earlier commit")
+    args = parser.parse_args(argv)
+
+    env = {**os.environ, COLD_START_ENV: '1'}
+    rows = [('python startup', _time_runs([sys.executable, '-c', 'pass'], args.runs, ROOT_DIR))]
+    for command in args.commands:
+        if args.baseline_tree and command in BASELINE_IMPORTS:
+            code = f"import sys; sys.path[:0] = ['src', '.']; import {BASELINE_IMPORTS[command]}"
+            rows.append((f"{command} (baseline)", _time_runs([sys.executable, '-c', code], args.runs,
+                                                             args.baseline_tree)))
+        rows.append((command, _time_runs([sys.executable, '-m', 'shipping', command], args.runs, ROOT_DIR, env)))
+
+    print(f"{'command':<28} {'min s':>8} {'median s':>9}")
+    for name, timings in rows:
+        if timings:
+            print(f"{name:<28} {min(timings):>8.3f} {statistics.median(timings):>9.3f}")
+        else:
+            print(f"{name:<28} {'failed':>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m shipping', description="Shipping Data Product pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, (_, _, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    subparsers.add_parser('serve', help="run the analytical API with uvicorn", add_help=False)
+    subparsers.add_parser('cold-start', help="time how long each command takes to start", add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    sys.argv[0] = f"python -m shipping {args.command}"  # usage lines of the scripts' own parsers
+    if args.command == 'cold-start':
+        return cold_start(rest)
+    entry = prepare(args.command)
+    if os.getenv(COLD_START_ENV):
+        return None
+    return entry(rest)
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,5 @@
-import psycopg2
-import dotenv
-import os
-dotenv.load_dotenv()
+# Quick check that the .env database settings reach Postgres (python -m shipping check-db)
+from db import check_connection
 
-
-
-
-
-
-
-# Replace with your own values
-conn = psycopg2.connect(
-  host=os.getenv("DB_HOST"),
-  port=os.getenv("DB_PORT"),
-  database=os.getenv("DB_NAME"),
-  user=os.getenv("DB_USER"),
-  password=os.getenv("DB_PASSWORD")
-)
-
-cur = conn.cursor()
-cur.execute("SELECT version();")
-print(cur.fetchone())
-
-cur.close()
-conn.close()
+if __name__ == "__main__":
+    check_connection()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+dbt Incremental Benchmark
+Fills raw.telegram_messages with a synthetic history and times a full dbt rebuild
+against incremental runs that only see a small batch of new messages.
+
+Synthetic rows use negative channel ids so they never collide with scraped data;
+remove them with --cleanup (then run `dbt run --full-refresh`).
+"""
+
+import os
+import time
+import argparse
+import subprocess
+from sqlalchemy import text
+from db import get_engine  # also loads .env
+
+DBT_DIR = os.getenv('DBT_PROJECT_DIR', 'dbt_project')
+
+SYNTHETIC_CHANNELS = 50
+
+# Spreads :rows messages over SYNTHETIC_CHANNELS channels and :span_days days from :start.
+# With :backdated, each message counts as loaded an hour after it was posted, so the
+# history looks like it arrived over time instead of inside one lookback window.
+INSERT_SYNTHETIC_SQL = f"""
+INSERT INTO raw.telegram_messages
+    (message_id, channel_name, channel_id, sender_id, message_text, message_date,
+     has_media, media_type, views, forwards, replies, loaded_at)
+SELECT
+    :offset + n,
+    'synthetic_' || (n % {SYNTHETIC_CHANNELS}),
+    -1 - (n % {SYNTHETIC_CHANNELS}),
+    n % 5000,
+    'Synthetic medical product message ' || n || ' order now with delivery',
+    posted_at,
+    n % 3 = 0,
+    CASE WHEN n % 3 = 0 THEN 'photo' END,
+    n % 1000, n % 50, n % 20,
+    CASE WHEN :backdated THEN posted_at + INTERVAL '1 hour' ELSE CURRENT_TIMESTAMP END
+FROM (
+    SELECT n, CAST(:start AS TIMESTAMP) + (n * CAST(:span_days AS FLOAT) / :rows) * INTERVAL '1 day' AS posted_at
+    FROM generate_series(1, :rows) AS n
+) synthetic
+ON CONFLICT (channel_id, message_id) DO NOTHING
+"""
+
+def insert_synthetic(engine, rows, offset, start_date, span_days, backdated):
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text(INSERT_SYNTHETIC_SQL), {
+            "rows": rows, "offset": offset, "start": start_date, "span_days": span_days,
+            "backdated": backdated,
+        })
+    print(f"Inserted {rows:,} synthetic messages in {time.perf_counter() - start:.1f}s")
+
+def run_dbt(*args):
+    """Run dbt in the project directory and return the wall-clock seconds"""
+    start = time.perf_counter()
+    subprocess.run(["dbt", "run", *args], cwd=DBT_DIR, check=True)
+    return time.perf_counter() - start
+
+def cleanup(engine):
+    with engine.begin() as conn:
+        deleted = conn.execute(text("DELETE FROM raw.telegram_messages WHERE channel_id < 0")).rowcount
+    print(f"Deleted {deleted:,} synthetic messages; run `dbt run --full-refresh` to rebuild the marts")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time full vs incremental dbt runs on a synthetic history")
+    parser.add_argument('--rows', type=int, default=3_000_000, help="synthetic history size")
+    parser.add_argument('--delta', type=int, default=10_000, help="new messages before the incremental run")
+    parser.add_argument('--cleanup', action='store_true', help="delete the synthetic rows and exit")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.cleanup:
+        cleanup(engine)
+        return
+
+    insert_synthetic(engine, args.rows, offset=0, start_date='2023-01-01', span_days=730, backdated=True)
+    results = {"full refresh": run_dbt("--full-refresh")}
+    results["incremental, no new rows"] = run_dbt()
+    # New messages land on the last few days, like a regular scrape
+    insert_synthetic(engine, args.delta, offset=args.rows, start_date='2024-12-29', span_days=3, backdated=False)
+    results[f"incremental, +{args.delta:,} rows"] = run_dbt()
+
+    print(f"\n{'run':<32} {'seconds':>10}")
+    for name, seconds in results.items():
+        print(f"{name:<32} {seconds:>10.1f}")
+
+if __name__ == "__main__":
+    main()
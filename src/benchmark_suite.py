@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Runs each pipeline stage on a synthetic Telegram corpus and writes throughput, latency
+percentiles and peak RSS as JSON, so runs can be compared between commits.
+
+Stages:
+    scrape  telegram_scrapper.main() against a fake Telegram client (needs telethon)
+    load    RawDataLoader over the synthetic data lake
+    detect  YOLO over the synthetic photos (needs ultralytics)
+    dbt     an incremental `dbt run` after the load
+    api     the three reporting endpoints, served by a local uvicorn
+
+load, dbt and api use the Postgres configured in .env; point DB_NAME at a scratch
+database. Synthetic rows use channel ids from -1000 down; remove them with --cleanup.
+
+Usage:
+    python src/benchmark_suite.py --messages-per-channel 20000
+    python src/benchmark_suite.py --stages scrape,load --compare benchmark_results/<commit>.json
+    python src/benchmark_suite.py --cleanup
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from concurrent.futures import ProcessPoolExecutor
+
+from synthetic_telegram import (
+    CHANNEL_PREFIX, FIRST_CHANNEL_ID, FakeTelegramClient, generate_corpus, write_data_lake, write_photos,
+)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = 'benchmark_results'
+STAGE_ORDER = ['scrape', 'load', 'detect', 'dbt', 'api']
+# Settings that change the numbers, recorded with every result
+RECORDED_ENV = [
+    'LOAD_METHOD', 'LOAD_WORKERS', 'LOAD_WRITERS', 'LOAD_BATCH_SIZE', 'SCRAPE_CONCURRENCY', 'MEDIA_WORKERS',
+    'YOLO_MODEL', 'YOLO_BATCH_SIZE', 'YOLO_IMGSZ', 'DETECTION_WORKERS', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW',
+]
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)  # bytes on macOS, KiB on Linux
+
+def _process_peak_rss_mb(pid):
+    """Peak RSS of another process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def _rate(count, seconds):
+    return round(count / max(seconds, 1e-9), 1)
+
+# --- STAGES ---
+# Each runs in a fresh process; config is a plain dict so it crosses the process boundary.
+
+def bench_scrape(config):
+    workdir = Path(config['workdir']) / 'scrape'
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)  # photos, checkpoints and the session file land here, not in data/raw
+    os.environ['DATA_LAKE_PATH'] = str(workdir / 'lake')
+    os.environ['SCRAPE_STATE_PATH'] = str(workdir / f"state-{time.time_ns()}.json")  # no checkpoints: full scrape
+    os.environ['SCRAPE_MESSAGE_LIMIT'] = str(config['messages_per_channel'])
+    import telegram_scrapper
+
+    corpus, photo_seeds = generate_corpus(config['channels'], config['messages_per_channel'],
+                                          config['photo_ratio'], seed=config['seed'])
+    telegram_scrapper.client = FakeTelegramClient(corpus, photo_seeds, latency=config['telegram_latency'])
+    messages = sum(len(m) for m in corpus.values())
+    photos = sum(1 for m in corpus.values() for message in m if message.photo)
+
+    start = time.perf_counter()
+    asyncio.run(telegram_scrapper.main(output_mode='jsonl', channels=list(corpus)))
+    seconds = time.perf_counter() - start
+    return {'messages': messages, 'photos': photos, 'seconds': round(seconds, 3),
+            'messages_per_s': _rate(messages, seconds), 'photos_per_s': _rate(photos, seconds)}
+
+def bench_load(config):
+    os.environ['DATA_LAKE_PATH'] = config['lake_dir']
+    from load_raw_data import RawDataLoader
+
+    loader = RawDataLoader()
+    loader.create_raw_schema()
+    files = sorted(Path(config['lake_dir']).rglob('*.jsonl'))
+    size = sum(f.stat().st_size for f in files)
+
+    start = time.perf_counter()
+    summary = loader.load_files(files, force=True)  # ignore the manifest so every run loads everything
+    seconds = time.perf_counter() - start
+    return {'files': len(files), 'rows': summary['rows_loaded'], 'files_failed': summary['files_failed'],
+            'seconds': round(seconds, 3), 'rows_per_s': _rate(summary['rows_loaded'], seconds),
+            'mb_per_s': round(size / 1e6 / max(seconds, 1e-9), 2)}
+
+def bench_detect(config):
+    # Every run measures the model, not the detection cache or near-duplicate reuse
+    os.environ['DETECTION_CACHE'] = '0'
+    os.environ['PHASH_DEDUP'] = '0'
+    os.environ['DETECTION_OUTPUT_FORMAT'] = 'csv'
+    import image_object_detection
+
+    images = list(image_object_detection.iter_images(config['photos_dir']))
+    start = time.perf_counter()
+    detections = image_object_detection.run_single_process(
+        images, output_csv=str(Path(config['workdir']) / 'detections.csv'))
+    seconds = time.perf_counter() - start
+    return {'images': len(images), 'detections': detections, 'seconds': round(seconds, 3),
+            'images_per_s': _rate(len(images), seconds)}
+
+def bench_dbt(config):
+    from benchmark_dbt_incremental import run_dbt
+
+    if find_spec('dbt') is None:
+        raise ImportError("dbt is not installed", name='dbt')
+    result = {'incremental_seconds': round(run_dbt(), 3)}
+    if config['dbt_full_refresh']:
+        result['full_refresh_seconds'] = round(run_dbt('--full-refresh'), 3)
+    return result
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+async def _load_endpoints(base_url, config):
+    import httpx
+    from api.load_test import ENDPOINTS, percentile, run_endpoint
+
+    results = {}
+    limits = httpx.Limits(max_connections=config['api_concurrency'],
+                          max_keepalive_connections=config['api_concurrency'])
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for template in ENDPOINTS:
+            path = template.format(channel=f"{CHANNEL_PREFIX}0", query='paracetamol')
+            await client.get(path)  # warm up the pool
+            latencies, errors, elapsed = await run_endpoint(client, path, config['api_requests'],
+                                                            config['api_concurrency'])
+            results[path.split('?')[0]] = {
+                'requests': config['api_requests'], 'errors': errors,
+                'req_per_s': _rate(config['api_requests'], elapsed),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            }
+    return results
+
+def bench_api(config):
+    for module in ('uvicorn', 'httpx'):
+        if find_spec(module) is None:
+            raise ImportError(f"{module} is not installed", name=module)
+    sys.path.insert(0, str(ROOT_DIR))
+    import httpx
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, API_CACHE='1' if config['api_cache'] else '0')
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(port),
+                               '--log-level', 'warning'], cwd=ROOT_DIR, env=env)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                if httpx.get(base_url + '/', timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("API did not start within 30s")
+            time.sleep(0.2)
+        result = {'endpoints': asyncio.run(_load_endpoints(base_url, config))}
+        result['server_peak_rss_mb'] = _process_peak_rss_mb(server.pid)
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+STAGES = {'scrape': bench_scrape, 'load': bench_load, 'detect': bench_detect, 'dbt': bench_dbt, 'api': bench_api}
+
+def _stage_entry(name, config):
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    try:
+        result = STAGES[name](config)
+    except ImportError as e:
+        return {'skipped': f"missing dependency: {e.name or e}"}
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+def run_stage(name, config):
+    """Run one stage in a fresh spawned process, so its imports and peak RSS are its own"""
+    print(f"\n=== {name} ===")
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_stage_entry, name, config).result()
+
+# --- CORPUS ---
+
+def prepare_corpus(config):
+    """Write the synthetic data lake and photos once per corpus configuration"""
+    workdir = Path(config['workdir'])
+    marker = workdir / 'corpus.json'
+    params = {k: config[k] for k in ('channels', 'messages_per_channel', 'photo_ratio', 'seed')}
+    if marker.exists() and json.loads(marker.read_text()).get('params') == params:
+        return json.loads(marker.read_text())['corpus']
+
+    print(f"Generating {config['channels']} x {config['messages_per_channel']} synthetic messages")
+    start = time.perf_counter()
+    corpus, photo_seeds = generate_corpus(config['channels'], config['messages_per_channel'],
+                                          config['photo_ratio'], seed=config['seed'])
+    for path in (config['lake_dir'], config['photos_dir']):
+        for old in Path(path).rglob('*') if Path(path).exists() else []:
+            if old.is_file():
+                old.unlink()
+    files, size = write_data_lake(corpus, config['lake_dir'], config['photos_dir'])
+    photos = write_photos(corpus, photo_seeds, config['photos_dir'])
+    summary = {'messages': sum(len(m) for m in corpus.values()), 'files': files,
+               'mb': round(size / 1e6, 2), 'photos': photos, 'unique_photos': len(photo_seeds)}
+    marker.write_text(json.dumps({'params': params, 'corpus': summary}))
+    print(f"Corpus written in {time.perf_counter() - start:.1f}s: {summary}")
+    return summary
+
+# --- RESULTS ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def flatten(results, prefix=''):
+    """{'api': {'endpoints': {'/x': {'p99_ms': 3}}}} -> {'api.endpoints./x.p99_ms': 3}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(stages, baseline_path):
+    """Print each metric next to the baseline's; rates are better higher, times and memory lower"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    current, previous = flatten(stages), flatten(baseline.get('stages', {}))
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')})")
+    print(f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in current.items():
+        old = previous.get(name)
+        if old is None or not any(name.endswith(s) for s in ('_per_s', '_ms', 'seconds', '_mb')):
+            continue
+        change = (value - old) / old * 100 if old else 0.0
+        worse = change < 0 if name.endswith('_per_s') else change > 0
+        flag = ' ⚠️' if worse and abs(change) >= 10 else ''
+        print(f"{name:<60} {old:>12} {value:>12} {change:>+7.1f}%{flag}")
+
+def cleanup():
+    """Delete the synthetic rows from every raw table the stages write"""
+    from sqlalchemy import text
+    from db import get_engine
+    engine = get_engine()
+    synthetic_ids = f"SELECT id FROM raw.telegram_messages WHERE channel_id <= {FIRST_CHANNEL_ID}"
+    statements = [
+        ('raw.message_product_mentions', f"DELETE FROM raw.message_product_mentions WHERE message_key IN ({synthetic_ids})"),
+        ('raw.message_content', f"DELETE FROM raw.message_content WHERE message_key IN ({synthetic_ids})"),
+        ('raw.image_detections', f"DELETE FROM raw.image_detections WHERE image_filename LIKE '@{CHANNEL_PREFIX}%'"),
+        ('raw.load_manifest', f"DELETE FROM raw.load_manifest WHERE file_path LIKE '%{CHANNEL_PREFIX}%'"),
+        ('raw.telegram_messages', f"DELETE FROM raw.telegram_messages WHERE channel_id <= {FIRST_CHANNEL_ID}"),
+    ]
+    with engine.begin() as conn:
+        for table, sql in statements:
+            if conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {'t': table}).scalar():
+                print(f"{table}: deleted {conn.execute(text(sql)).rowcount} rows")
+    print("Run `dbt run --full-refresh` to drop the synthetic rows from the marts")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic corpus")
+    parser.add_argument('--stages', default=','.join(STAGE_ORDER), help="comma-separated subset of " + ','.join(STAGE_ORDER))
+    parser.add_argument('--channels', type=int, default=3)
+    parser.add_argument('--messages-per-channel', type=int, default=5000)
+    parser.add_argument('--photo-ratio', type=float, default=0.3, help="share of messages with a photo")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0,
+                        help="seconds the fake client waits per page of messages and per download")
+    parser.add_argument('--dbt-full-refresh', action='store_true', help="also time `dbt run --full-refresh`")
+    parser.add_argument('--api-requests', type=int, default=500, help="requests per endpoint")
+    parser.add_argument('--api-concurrency', type=int, default=20)
+    parser.add_argument('--api-cache', action='store_true', help="leave the response cache on")
+    parser.add_argument('--workdir', default='data/benchmark')
+    parser.add_argument('--output', help=f"results file (default {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="print the change against an earlier results file")
+    parser.add_argument('--cleanup', action='store_true', help="delete the synthetic rows and exit")
+    args = parser.parse_args(argv)
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    workdir = Path(args.workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    config = {
+        'workdir': str(workdir), 'lake_dir': str(workdir / 'lake'), 'photos_dir': str(workdir / 'photos'),
+        'channels': args.channels, 'messages_per_channel': args.messages_per_channel,
+        'photo_ratio': args.photo_ratio, 'seed': args.seed, 'telegram_latency': args.telegram_latency,
+        'dbt_full_refresh': args.dbt_full_refresh, 'api_requests': args.api_requests,
+        'api_concurrency': args.api_concurrency, 'api_cache': args.api_cache,
+    }
+    corpus = prepare_corpus(config)
+
+    results = {}
+    for name in STAGE_ORDER:
+        if name in stages:
+            results[name] = run_stage(name, config)
+            print(f"{name}: {json.dumps(results[name])}")
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {k: v for k, v in config.items() if not k.endswith('_dir') and k != 'workdir'},
+        'corpus': corpus,
+        'env': {name: os.environ[name] for name in RECORDED_ENV if name in os.environ},
+        'stages': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'results'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    if any('error' in r for r in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Message Content Classifier
+Runs the keyword/product dictionary over raw.telegram_messages in one pass per message
+and writes content flags and product mentions for dbt to join
+"""
+
+import io
+import os
+import re
+import time
+import random
+import argparse
+from sqlalchemy import text
+from text_matcher import ContentClassifier, load_dictionary, DICTIONARY_PATH
+from db import get_engine  # also loads .env
+
+# --- CONFIGURATION ---
+BATCH_SIZE = int(os.getenv('CLASSIFY_BATCH_SIZE', '10000'))
+
+CREATE_TABLES_SQL = [
+    """CREATE TABLE IF NOT EXISTS raw.message_content (
+        message_key BIGINT PRIMARY KEY,  -- raw.telegram_messages.id
+        flags TEXT[] NOT NULL,
+        dictionary_version VARCHAR(16) NOT NULL,
+        classified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS raw.message_product_mentions (
+        message_key BIGINT NOT NULL,
+        product_name TEXT NOT NULL,
+        matched_term TEXT NOT NULL,
+        mention_count INTEGER NOT NULL,
+        PRIMARY KEY (message_key, product_name)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_message_product_mentions_product ON raw.message_product_mentions(product_name)",
+    # fct_messages picks up messages reclassified since its last run by this column
+    "CREATE INDEX IF NOT EXISTS idx_message_content_classified_at ON raw.message_content(classified_at)",
+]
+
+# Messages never classified, classified with another dictionary, or reloaded since
+PENDING_SQL = """
+SELECT r.id, r.message_text
+FROM raw.telegram_messages r
+LEFT JOIN raw.message_content c ON c.message_key = r.id
+WHERE c.message_key IS NULL
+   OR c.dictionary_version <> %(version)s
+   OR r.loaded_at > c.classified_at
+"""
+
+CREATE_STAGES_SQL = """
+CREATE TEMP TABLE message_content_stage (message_key BIGINT, flags TEXT[]) ON COMMIT DROP;
+CREATE TEMP TABLE message_mentions_stage (
+    message_key BIGINT, product_name TEXT, matched_term TEXT, mention_count INTEGER
+) ON COMMIT DROP;
+"""
+UPSERT_CONTENT_SQL = """
+INSERT INTO raw.message_content (message_key, flags, dictionary_version, classified_at)
+SELECT message_key, flags, %(version)s, CURRENT_TIMESTAMP FROM message_content_stage
+ON CONFLICT (message_key) DO UPDATE
+SET flags = EXCLUDED.flags,
+    dictionary_version = EXCLUDED.dictionary_version,
+    classified_at = EXCLUDED.classified_at
+"""
+REPLACE_MENTIONS_SQL = """
+DELETE FROM raw.message_product_mentions
+WHERE message_key IN (SELECT message_key FROM message_content_stage);
+INSERT INTO raw.message_product_mentions (message_key, product_name, matched_term, mention_count)
+SELECT message_key, product_name, matched_term, mention_count FROM message_mentions_stage;
+"""
+
+def _copy_value(value):
+    """Encode a value for PostgreSQL's COPY text format"""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _array_literal(values):
+    """['a', 'b'] -> '{"a","b"}' for a TEXT[] column"""
+    return "{" + ",".join('"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values) + "}"
+
+def classify_batch(classifier, rows):
+    """[(message_key, text), ...] -> (content COPY text, mentions COPY text)"""
+    content_lines = []
+    mention_lines = []
+    for message_key, message_text in rows:
+        flags, mentions = classifier.classify(message_text)
+        content_lines.append(f"{message_key}\t{_copy_value(_array_literal(flags))}\n")
+        for product, (count, term) in mentions.items():
+            mention_lines.append("\t".join(
+                _copy_value(v) for v in (message_key, product, term, count)) + "\n")
+    return "".join(content_lines), "".join(mention_lines)
+
+class MessageClassifier:
+    """Classifies pending messages batch by batch and upserts the results"""
+
+    def __init__(self, classifier, batch_size=BATCH_SIZE):
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.engine = get_engine()
+
+    def create_tables(self):
+        with self.engine.begin() as conn:
+            for sql in CREATE_TABLES_SQL:
+                conn.execute(text(sql))
+
+    def _write_batch(self, conn, rows):
+        content_text, mentions_text = classify_batch(self.classifier, rows)
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_STAGES_SQL)
+            cursor.copy_expert("COPY message_content_stage FROM STDIN WITH (FORMAT text)",
+                               io.StringIO(content_text))
+            cursor.copy_expert("COPY message_mentions_stage FROM STDIN WITH (FORMAT text)",
+                               io.StringIO(mentions_text))
+            cursor.execute(UPSERT_CONTENT_SQL, {"version": self.classifier.version})
+            cursor.execute(REPLACE_MENTIONS_SQL)
+        conn.commit()
+
+    def run(self):
+        """Classify every pending message; returns the number classified"""
+        self.create_tables()
+        start = time.perf_counter()
+        classified = text_bytes = 0
+
+        # A server-side cursor streams pending rows; results go through a second connection
+        # so each batch can commit without closing the cursor
+        read_conn = self.engine.raw_connection()
+        write_conn = self.engine.raw_connection()
+        try:
+            with read_conn.cursor(name="pending_messages") as cursor:
+                cursor.itersize = self.batch_size
+                cursor.execute(PENDING_SQL, {"version": self.classifier.version})
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    self._write_batch(write_conn, rows)
+                    classified += len(rows)
+                    text_bytes += sum(len(t.encode('utf-8')) for _, t in rows if t)
+                    print(f"  classified {classified} messages")
+        except Exception:
+            write_conn.rollback()
+            raise
+        finally:
+            read_conn.close()
+            write_conn.close()
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(f"✅ Classified {classified} messages in {elapsed:.1f}s "
+              f"({classified / elapsed:.0f} msg/s, {text_bytes / elapsed / 1e6:.1f} MB/s of text)")
+        return classified
+
+# --- BENCHMARK ---
+
+SYNTHETIC_FILLER = (
+    "ዋጋ new stock available today call us for more information free consultation "
+    "quality guaranteed original product best price in addis ababa visit our shop"
+).split()
+
+def synthetic_corpus(size, dictionary, seed=0):
+    """Messages of filler words with dictionary terms sprinkled in, roughly like the channels' posts"""
+    rng = random.Random(seed)
+    terms = [t for ts in dictionary.get('flags', {}).values() for t in ts]
+    terms += [s for ss in dictionary.get('products', {}).values() for s in ss]
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(SYNTHETIC_FILLER, k=rng.randint(5, 60))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(terms).title())
+        corpus.append(" ".join(words))
+    return corpus
+
+def ilike_flags(dictionary, message_text):
+    """What fct_messages' CASE/ILIKE columns did: one case-insensitive substring scan per term"""
+    lowered = message_text.lower()
+    return sorted(flag for flag, terms in dictionary.get('flags', {}).items()
+                  if any(term.lower() in lowered for term in terms))
+
+def benchmark(size, dictionary, sql=False):
+    corpus = synthetic_corpus(size, dictionary)
+    megabytes = sum(len(m.encode('utf-8')) for m in corpus) / 1e6
+    classifier = ContentClassifier(dictionary)
+    product_patterns = [
+        re.compile(r"(?<!\w)" + re.escape(s) + r"(?!\w)", re.IGNORECASE)
+        for ss in dictionary.get('products', {}).values() for s in ss
+    ]
+
+    timings = {}
+    start = time.perf_counter()
+    for message in corpus:
+        classifier.classify(message)
+    timings["single-pass matcher (flags + products)"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in corpus:
+        ilike_flags(dictionary, message)
+    timings["per-term substring scans (flags only)"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in corpus:
+        ilike_flags(dictionary, message)
+        for pattern in product_patterns:
+            pattern.findall(message)
+    timings["per-term scans + per-product regex"] = time.perf_counter() - start
+
+    if sql:
+        timings["Postgres ILIKE (flags only)"] = benchmark_ilike_sql(corpus, dictionary)
+
+    print(f"{size} synthetic messages, {megabytes:.1f} MB")
+    print(f"{'approach':<42} {'seconds':>8} {'msg/s':>10} {'MB/s':>7}")
+    for name, seconds in timings.items():
+        seconds = max(seconds, 1e-9)
+        print(f"{name:<42} {seconds:>8.2f} {size / seconds:>10.0f} {megabytes / seconds:>7.1f}")
+
+def benchmark_ilike_sql(corpus, dictionary):
+    """Time the ILIKE expressions fct_messages used, over the corpus in a temp table"""
+    engine = get_engine()
+    checks = ", ".join(
+        "COUNT(*) FILTER (WHERE " + " OR ".join(f"message_text ILIKE '%{t}%'" for t in terms) + f") AS {flag}"
+        for flag, terms in dictionary.get('flags', {}).items()
+    )
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE ilike_benchmark (message_text TEXT)")
+            cursor.copy_expert("COPY ilike_benchmark FROM STDIN WITH (FORMAT text)",
+                               io.StringIO("".join(_copy_value(m) + "\n" for m in corpus)))
+            start = time.perf_counter()
+            cursor.execute(f"SELECT {checks} FROM ilike_benchmark")
+            cursor.fetchall()
+            return time.perf_counter() - start
+    finally:
+        raw_conn.rollback()
+        raw_conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify messages with the content dictionary")
+    parser.add_argument('--dictionary', default=DICTIONARY_PATH)
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help="time the matcher against per-term ILIKE-style scans on N synthetic messages")
+    parser.add_argument('--sql', action='store_true', help="with --benchmark, also time ILIKE in Postgres")
+    args = parser.parse_args(argv)
+
+    dictionary = load_dictionary(args.dictionary)
+    if args.benchmark:
+        benchmark(args.benchmark, dictionary, sql=args.sql)
+        return
+    MessageClassifier(ContentClassifier(dictionary)).run()
+
+if __name__ == "__main__":
+    main()
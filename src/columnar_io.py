@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Columnar IO
+Typed Parquet datasets for detections and scraped messages, written in partitions and read back with Arrow
+"""
+
+import os
+import time
+import uuid
+from pathlib import Path
+
+PARQUET_COMPRESSION = os.getenv('PARQUET_COMPRESSION', 'zstd')
+ROWS_PER_FILE = int(os.getenv('PARQUET_ROWS_PER_FILE', '250000'))
+
+def _pyarrow():
+    """Import pyarrow on first use so CSV/JSON users do not need it installed"""
+    try:
+        import pyarrow
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def detection_schema():
+    """Detections with the bounding box as four float columns
+
+    float64, like raw.image_detections: the table's unique key includes the bbox, so the
+    values must reach Postgres exactly as the CSV path writes them.
+    """
+    pa = _pyarrow()
+    return pa.schema([
+        ('message_id', pa.int64()),
+        ('image_filename', pa.string()),
+        ('detected_object_class', pa.string()),
+        ('confidence_score', pa.float64()),
+        ('bbox_x1', pa.float64()),
+        ('bbox_y1', pa.float64()),
+        ('bbox_x2', pa.float64()),
+        ('bbox_y2', pa.float64()),
+        ('channel', pa.string()),
+    ])
+
+def message_schema():
+    """Scraped messages as written by telegram_scrapper.py's CSV output"""
+    pa = _pyarrow()
+    return pa.schema([
+        ('channel_title', pa.string()),
+        ('channel_username', pa.string()),
+        ('message_id', pa.int64()),
+        ('message_text', pa.string()),
+        ('message_date', pa.timestamp('us', tz='UTC')),
+        ('media_path', pa.string()),
+    ])
+
+# Scraper CSV header -> message_schema column
+MESSAGE_CSV_COLUMNS = {
+    'Channel Title': 'channel_title',
+    'Channel Username': 'channel_username',
+    'ID': 'message_id',
+    'Message': 'message_text',
+    'Date': 'message_date',
+    'Media Path': 'media_path',
+}
+
+def channel_from_filename(image_filename):
+    """'@lobelia4cosmetics_18511.jpg' -> 'lobelia4cosmetics' (partition value)"""
+    stem = Path(image_filename).stem
+    return stem.rsplit('_', 1)[0].lstrip('@') or 'unknown'
+
+def detection_row(message_id, image_filename, detection):
+    """Flatten one engine detection into a detection_schema row"""
+    x1, y1, x2, y2 = detection['bbox']
+    return {
+        'message_id': message_id,
+        'image_filename': image_filename,
+        'detected_object_class': detection['detected_object_class'],
+        'confidence_score': detection['confidence_score'],
+        'bbox_x1': x1,
+        'bbox_y1': y1,
+        'bbox_x2': x2,
+        'bbox_y2': y2,
+        'channel': channel_from_filename(image_filename),
+    }
+
+class ParquetDatasetWriter:
+    """
+    Buffers rows and writes them as a hive-partitioned Parquet dataset.
+
+    Every flush writes new files named after this run, so repeated runs add
+    files next to earlier ones instead of rewriting them.
+    """
+
+    def __init__(self, root, schema, partition_cols=None, rows_per_file=ROWS_PER_FILE, file_prefix='part'):
+        self.pa = _pyarrow()
+        self.root = Path(root)
+        self.schema = schema
+        self.partition_cols = partition_cols or []
+        self.rows_per_file = rows_per_file
+        self.file_prefix = file_prefix  # writers running in parallel need distinct prefixes
+        # Unique per writer: two runs started in the same second must not replace each other's files
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.columns = {name: [] for name in schema.names}
+        self.buffered = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.files = []  # paths of the files this writer created
+
+    def write(self, row):
+        for name, values in self.columns.items():
+            values.append(row.get(name))
+        self.buffered += 1
+        if self.buffered >= self.rows_per_file:
+            self.flush()
+
+    def write_table(self, table):
+        """Write an Arrow table that already matches the schema"""
+        self.flush()
+        self._write(table.cast(self.schema))
+
+    def flush(self):
+        if not self.buffered:
+            return
+        table = self.pa.table(self.columns, schema=self.schema)
+        self.columns = {name: [] for name in self.schema.names}
+        self.buffered = 0
+        self._write(table)
+
+    def _write(self, table):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.pa.parquet.write_to_dataset(
+            table, root_path=str(self.root), partition_cols=self.partition_cols or None,
+            basename_template=f"{self.file_prefix}-{self.run_id}-{self.flushes:04d}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore', compression=PARQUET_COMPRESSION,
+            file_visitor=lambda written: self.files.append(written.path),
+        )
+        self.flushes += 1
+        self.rows_written += table.num_rows
+
+    def close(self):
+        self.flush()
+
+def open_dataset(root, schema=None):
+    """A pyarrow Dataset over a partitioned Parquet directory, a single file or a list of files"""
+    pa = _pyarrow()
+    source = [str(path) for path in root] if isinstance(root, (list, tuple)) else str(root)
+    return pa.dataset.dataset(source, format='parquet', partitioning='hive', schema=schema)
+
+def column_values(root, column):
+    """The distinct values of one column of a Parquet dataset, reading only that column"""
+    if not is_parquet_path(root):
+        return set()
+    table = open_dataset(root).to_table(columns=[column])
+    return set(table.column(column).unique().to_pylist())
+
+def is_parquet_path(path):
+    """A .parquet file, a list of them, or a directory holding .parquet files (not e.g. a CSV directory)"""
+    if isinstance(path, (list, tuple)):
+        return bool(path) and all(is_parquet_path(p) for p in path)
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return True
+    return path.is_dir() and next(path.rglob('*.parquet'), None) is not None
@@ -1,24 +1,204 @@
 import os
 import csv
 import json
+import time
+import argparse
+import hashlib
+from datetime import datetime, timezone
+from columnar_io import MESSAGE_CSV_COLUMNS, ParquetDatasetWriter, message_schema
 
 # Always use the absolute path to data/labeled
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LABELED_DIR = os.path.join(BASE_DIR, 'data', 'labeled')
 OUTPUT_FILE = os.path.join(LABELED_DIR, 'all_data.json')
+OUTPUT_PARQUET_DIR = os.path.join(LABELED_DIR, 'all_data')  # Parquet dataset, partitioned by channel
+OUTPUT_JSONL_FILE = os.path.join(LABELED_DIR, 'all_data.jsonl')
+OUTPUT_FORMAT = os.getenv('COMBINE_OUTPUT_FORMAT', 'json')  # 'json', 'jsonl' or 'parquet'
+SCHEMA = os.getenv('COMBINE_SCHEMA')  # 'messages' or a JSON file of {column: type}
 
-all_records = []
+# Column types of the scraper's CSV output, used with --schema messages
+MESSAGES_SCHEMA = {
+    'Channel Title': 'str',
+    'Channel Username': 'str',
+    'ID': 'int',
+    'Message': 'str',
+    'Date': 'datetime',
+    'Media Path': 'str',
+}
 
-for root, dirs, files in os.walk(LABELED_DIR):
-    for file in files:
-        if file.endswith('.csv'):
-            file_path = os.path.join(root, file)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    all_records.append(row)
+def iter_csv_files():
+    for root, dirs, files in os.walk(LABELED_DIR):
+        for file in files:
+            if file.endswith('.csv'):
+                yield os.path.join(root, file)
 
-with open(OUTPUT_FILE, 'w', encoding='utf-8') as out_f:
-    json.dump(all_records, out_f, ensure_ascii=False, indent=2)
+def iter_rows():
+    """Yield every CSV row under data/labeled, one file open at a time"""
+    for file_path in iter_csv_files():
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
 
-print(f"Combined {len(all_records)} records from CSV files into {OUTPUT_FILE}") 
\ No newline at end of file
+def _to_datetime(value):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+COLUMN_CONVERTERS = {
+    'str': str,
+    'int': lambda value: int(float(value)),
+    'float': float,
+    'bool': lambda value: value.strip().lower() in ('1', 'true', 'yes'),
+    'datetime': _to_datetime,
+}
+
+def load_schema(schema):
+    """'messages' or the path of a JSON file mapping column names to str/int/float/bool/datetime"""
+    if not schema:
+        return None
+    if schema == 'messages':
+        columns = MESSAGES_SCHEMA
+    else:
+        with open(schema, 'r', encoding='utf-8') as f:
+            columns = json.load(f)
+    unknown = {kind for kind in columns.values() if kind not in COLUMN_CONVERTERS}
+    if unknown:
+        raise ValueError(f"Unknown column types in schema: {', '.join(sorted(unknown))}")
+    return {column: COLUMN_CONVERTERS[kind] for column, kind in columns.items()}
+
+def normalize_row(row, converters):
+    """Apply the schema's converters; empty cells become null and unparseable ones stay as text"""
+    for column, convert in converters.items():
+        value = row.get(column)
+        if value is None:
+            continue
+        if value == '':
+            row[column] = None
+            continue
+        try:
+            row[column] = convert(value)
+        except ValueError:
+            pass
+    return row
+
+class SeenKeys:
+    """
+    Compact set of (channel, message id) keys.
+
+    Numeric ids are stored as ints in one set per channel, so each key costs
+    a small int instead of a tuple of two strings; other ids fall back to an
+    8-byte digest. Ids go through the same int conversion as the output, so
+    "123" and "123.0" are one key.
+    """
+
+    def __init__(self):
+        self.channels = {}
+        self.size = 0
+
+    def add(self, channel, message_id):
+        """Record a key; False if it was already seen"""
+        ids = self.channels.setdefault(channel, set())
+        try:
+            key = COLUMN_CONVERTERS['int'](message_id)
+        except (TypeError, ValueError, OverflowError):
+            key = hashlib.blake2b(str(message_id).encode('utf-8'), digest_size=8).digest()
+        if key in ids:
+            return False
+        ids.add(key)
+        self.size += 1
+        return True
+
+def _dedup_key(row):
+    channel = row.get('Channel Username') or row.get('channel_username')
+    message_id = row.get('ID') if row.get('ID') is not None else row.get('message_id')
+    if channel is None or message_id in (None, ''):
+        return None
+    return channel, message_id
+
+def combine_to_jsonl(schema=SCHEMA):
+    """
+    Stream every row into all_data.jsonl, skipping repeated (channel, message id) pairs.
+
+    Rows are read lazily and written one line at a time, so only the seen-keys
+    set grows with the corpus. Rows without a channel and message id are written as-is.
+    """
+    converters = load_schema(schema)
+    seen = SeenKeys()
+    rows_read = rows_written = duplicates = bytes_written = 0
+    start = time.perf_counter()
+
+    tmp_path = OUTPUT_JSONL_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as out_f:
+        for row in iter_rows():
+            rows_read += 1
+            key = _dedup_key(row)
+            if key is not None and not seen.add(*key):
+                duplicates += 1
+                continue
+            if converters:
+                row = normalize_row(row, converters)
+            line = json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+            out_f.write(line)
+            bytes_written += len(line.encode('utf-8'))
+            rows_written += 1
+    os.replace(tmp_path, OUTPUT_JSONL_FILE)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Combined {rows_written} records from CSV files into {OUTPUT_JSONL_FILE} "
+          f"({duplicates} duplicates skipped)")
+    print(f"Read {rows_read} rows in {elapsed:.2f}s: {rows_read / elapsed:.0f} rows/s, "
+          f"{bytes_written / elapsed / 1e6:.1f} MB/s written")
+    return rows_written
+
+def combine_to_json():
+    all_records = []
+
+    for file_path in iter_csv_files():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                all_records.append(row)
+
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as out_f:
+        json.dump(all_records, out_f, ensure_ascii=False, indent=2)
+
+    print(f"Combined {len(all_records)} records from CSV files into {OUTPUT_FILE}")
+
+def combine_to_parquet():
+    """Read each scraped-messages CSV with Arrow's typed CSV reader and append it to a Parquet dataset"""
+    import pyarrow.csv as pa_csv
+
+    schema = message_schema()
+    column_types = {csv_name: schema.field(name).type for csv_name, name in MESSAGE_CSV_COLUMNS.items()}
+    writer = ParquetDatasetWriter(OUTPUT_PARQUET_DIR, schema, partition_cols=['channel_username'])
+
+    for file_path in iter_csv_files():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+        if set(header) != set(MESSAGE_CSV_COLUMNS):
+            print(f"Skipping {file_path}: not a scraped-messages CSV")
+            continue
+        table = pa_csv.read_csv(
+            file_path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+        )
+        table = table.rename_columns([MESSAGE_CSV_COLUMNS[name] for name in table.column_names])
+        writer.write_table(table.select(schema.names))
+
+    writer.close()
+    print(f"Combined {writer.rows_written} records from CSV files into {OUTPUT_PARQUET_DIR}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combine the CSV files under data/labeled")
+    parser.add_argument('--format', choices=['json', 'jsonl', 'parquet'], default=OUTPUT_FORMAT)
+    parser.add_argument('--schema', default=SCHEMA,
+                        help="jsonl only: 'messages' or a JSON file of {column: type} to normalize values")
+    args = parser.parse_args()
+
+    if args.format == 'parquet':
+        combine_to_parquet()
+    elif args.format == 'jsonl':
+        combine_to_jsonl(args.schema)
+    else:
+        combine_to_json()
@@ -0,0 +1,8 @@
+# The date/channel partitioned JSONL tree the scraper writes and the loader and Dagster assets read
+import os
+
+DEFAULT_DATA_LAKE_PATH = 'data/raw/telegrammessages'
+
+def data_lake_path():
+    """DATA_LAKE_PATH, read when called so a process can point it elsewhere before loading"""
+    return os.getenv('DATA_LAKE_PATH', DEFAULT_DATA_LAKE_PATH)
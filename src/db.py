@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Database
+The pooled SQLAlchemy engines shared by the loaders, the classifier, the benchmarks and
+the API. Each process gets one engine per configuration, created on first use, so
+importing this module costs nothing until a script actually talks to Postgres.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+# --- CONFIGURATION ---
+DB_USER = os.getenv('DB_USER', 'postgres')
+DB_PASSWORD = os.getenv('DB_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'localhost')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('DB_NAME', 'shipping_data_warehouse')
+
+# One pool per process; LOAD_WRITERS and PIPELINE_MAX_CONCURRENT should stay below size + overflow
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'False')
+# Applied by the API only; batch loads and dbt-sized statements run without a limit
+STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))  # 0 disables it
+
+POOL_OPTIONS = {
+    'pool_size': POOL_SIZE,
+    'max_overflow': MAX_OVERFLOW,
+    'pool_timeout': POOL_TIMEOUT,
+    'pool_recycle': POOL_RECYCLE,
+    'pool_pre_ping': POOL_PRE_PING,
+}
+
+_engines = {}
+_async_engines = {}
+
+def database_url(driver='postgresql'):
+    return f"{driver}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+def get_engine(statement_timeout_ms=0):
+    """The process's pooled engine, created (and sqlalchemy imported) on the first call"""
+    engine = _engines.get(statement_timeout_ms)
+    if engine is None:
+        from sqlalchemy import create_engine
+        connect_args = {'options': f"-c statement_timeout={statement_timeout_ms}"} if statement_timeout_ms else {}
+        engine = _engines[statement_timeout_ms] = create_engine(
+            database_url(), connect_args=connect_args, **POOL_OPTIONS)
+    return engine
+
+def get_async_engine(statement_timeout_ms=0):
+    """The asyncpg engine, created on first use so the sync path works without asyncpg installed"""
+    engine = _async_engines.get(statement_timeout_ms)
+    if engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        connect_args = ({'server_settings': {'statement_timeout': str(statement_timeout_ms)}}
+                        if statement_timeout_ms else {})
+        engine = _async_engines[statement_timeout_ms] = create_async_engine(
+            database_url('postgresql+asyncpg'), connect_args=connect_args, **POOL_OPTIONS)
+    return engine
+
+def dispose_engines():
+    """Close the sync engines' pooled connections"""
+    for engine in _engines.values():
+        engine.dispose()
+
+async def dispose_async_engines():
+    for engine in _async_engines.values():
+        await engine.dispose()
+
+def check_connection():
+    """Print the server version, to confirm the .env settings reach Postgres"""
+    from sqlalchemy import text
+    with get_engine().connect() as conn:
+        print(conn.execute(text("SELECT version()")).scalar())
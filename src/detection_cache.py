@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Detection Cache
+Persistent SQLite store of YOLO detections keyed by image content, model weights and thresholds
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.getenv('DETECTION_CACHE_PATH', 'data/cache/detections.sqlite')
+CACHE_ENABLED = os.getenv('DETECTION_CACHE', '1') not in ('0', 'false', 'False')
+
+def hash_file(path):
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DetectionCache:
+    """
+    Maps (image hash, model hash, confidence, image size) to the detections
+    YOLO produced for that image.
+
+    Photos never change after download, so an image is only sent to the model
+    again when its bytes, the model weights or the thresholds change. Entries
+    for other models are left alone, so switching from yolov8n.pt to
+    yolov8s.pt only misses for the new model.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Sharded detection opens one connection per worker process, so wait on locks
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS detections (
+                image_hash TEXT NOT NULL,
+                model_hash TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                image_size INTEGER NOT NULL,
+                detections TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (image_hash, model_hash, confidence, image_size)
+            )
+        """)
+        # Perceptual hashes of the images the model ran on, so near-duplicates match across runs
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS phashes (
+                image_hash TEXT PRIMARY KEY,
+                phash TEXT NOT NULL,  -- 16 hex digits; SQLite integers are signed
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, image_hash, model_hash, confidence, image_size):
+        """Cached detections for an image, or None on a miss"""
+        row = self.conn.execute(
+            "SELECT detections FROM detections "
+            "WHERE image_hash = ? AND model_hash = ? AND confidence = ? AND image_size = ?",
+            (image_hash, model_hash, confidence, image_size)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, entries, model_hash, confidence, image_size):
+        """Store [(image_hash, detections), ...] for one model/threshold"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO detections "
+            "(image_hash, model_hash, confidence, image_size, detections) VALUES (?, ?, ?, ?, ?)",
+            [(image_hash, model_hash, confidence, image_size, json.dumps(detections))
+             for image_hash, detections in entries]
+        )
+        self.conn.commit()
+
+    def put_phashes(self, entries):
+        """Store [(image_hash, phash, (width, height)), ...] for images the model ran on"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO phashes (image_hash, phash, width, height) VALUES (?, ?, ?, ?)",
+            [(image_hash, f"{image_phash:016x}", size[0], size[1]) for image_hash, image_phash, size in entries]
+        )
+        self.conn.commit()
+
+    def phashes(self, model_hash, confidence, image_size):
+        """Yield (image_hash, phash, (width, height)) of the images cached for one model/threshold"""
+        rows = self.conn.execute(
+            "SELECT p.image_hash, p.phash, p.width, p.height FROM phashes p "
+            "JOIN detections d ON d.image_hash = p.image_hash "
+            "WHERE d.model_hash = ? AND d.confidence = ? AND d.image_size = ?",
+            (model_hash, confidence, image_size)
+        )
+        for image_hash, image_phash, width, height in rows:
+            yield image_hash, int(image_phash, 16), (width, height)
+
+    def prune_model(self, model_hash):
+        """Drop every entry produced by one model's weights"""
+        self.conn.execute("DELETE FROM detections WHERE model_hash = ?", (model_hash,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def open_default_cache():
+    """The cache configured by DETECTION_CACHE_PATH, or None if DETECTION_CACHE=0"""
+    return DetectionCache() if CACHE_ENABLED else None
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+YOLO Detection Engine
+Batched, prefetching object detection shared by the image detection scripts
+"""
+
+import os
+import csv
+import time
+import shutil
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from detection_cache import DetectionCache, hash_file
+from columnar_io import ParquetDatasetWriter, detection_row, detection_schema
+from perceptual_dedup import DEDUP_ENABLED, NearDuplicateIndex, phash
+import metrics
+
+# --- CONFIGURATION ---
+MODEL_PATH = os.getenv('YOLO_MODEL', 'yolov8n.pt')  # You can use yolov8s.pt, yolov8m.pt, etc.
+BATCH_SIZE = int(os.getenv('YOLO_BATCH_SIZE', '16'))
+IMAGE_SIZE = int(os.getenv('YOLO_IMGSZ', '640'))
+CONFIDENCE = float(os.getenv('YOLO_CONF', '0.25'))
+PREFETCH_WORKERS = int(os.getenv('YOLO_PREFETCH_WORKERS', '4'))
+LETTERBOX_COLOR = 114  # same grey padding ultralytics uses
+IMAGES_DETECTED = metrics.counter('detection_images_total', "Images by where their detections came from", ['source'])
+OBJECTS_DETECTED = metrics.counter('detection_objects_total', "Objects detected by the model", ['object_class'])
+BATCH_SECONDS = metrics.histogram('detection_batch_seconds', "Seconds of model inference per batch")
+DETECTION_COLUMNS = ['message_id', 'image_filename', 'detected_object_class', 'confidence_score', 'bbox']
+
+def letterbox(image, size):
+    """
+    Resize an image to fit a size x size square, keeping its aspect ratio,
+    and pad the rest. Returns the padded image, the scale ratio and the
+    (x, y) padding so boxes can be mapped back to the original image.
+    """
+    h, w = image.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image
+    return canvas, ratio, (pad_x, pad_y)
+
+def load_image(image_path, size, with_phash=False):
+    """Decode and letterbox one image (and optionally hash it); runs on the prefetch thread pool"""
+    image = cv2.imread(str(image_path))
+    if image is None:
+        return None
+    h, w = image.shape[:2]
+    image_phash = phash(image) if with_phash else None
+    canvas, ratio, pad = letterbox(image, size)
+    return canvas, ratio, pad, (w, h), image_phash
+
+class DetectionEngine:
+    """
+    Runs YOLO over a stream of images in batches.
+
+    Images are decoded and letterboxed on a background thread pool while the
+    model works on the previous batch. Call detect() with an iterable of
+    (key, image_path) pairs; it yields (key, image_path, detections) per image,
+    where each detection is a dict with detected_object_class,
+    confidence_score and bbox ([x1, y1, x2, y2] in original image pixels).
+
+    With a DetectionCache, images whose content hash is already cached for
+    this model and thresholds are yielded straight from the cache and never
+    decoded or sent to the model.
+
+    With a NearDuplicateIndex, each decoded image is perceptually hashed and
+    an image close to one already run reuses that image's detections (boxes
+    rescaled to its size) instead of going through the model. With both, the
+    index starts out seeded with the images earlier runs sent to the model.
+    Reused detections are approximate, so they are never written to the cache.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, batch_size=BATCH_SIZE, image_size=IMAGE_SIZE,
+                 confidence=CONFIDENCE, prefetch_workers=PREFETCH_WORKERS, model=None, cache=None,
+                 dedup=None):
+        self.model_path = model_path
+        self.model = model if model is not None else YOLO(model_path)
+        self.cache = cache
+        self.dedup = dedup
+        self.model_hash = self._hash_model() if cache is not None else None
+        self.batch_size = max(1, batch_size)
+        self.image_size = image_size
+        self.confidence = confidence
+        self.prefetch_workers = max(1, prefetch_workers)
+        self.images_processed = 0
+        self.images_failed = 0
+        self.cache_hits = 0
+        self.duplicates_skipped = 0
+        self.inference_seconds = 0.0
+        self.total_seconds = 0.0
+        if cache is not None and dedup is not None:
+            dedup.seed(cache.phashes(self.model_hash, self.confidence, self.image_size))
+
+    def _hash_model(self):
+        """Hash the weights file so cache entries are tied to the exact model"""
+        weights = getattr(self.model, 'ckpt_path', None) or self.model_path
+        if weights and os.path.exists(weights):
+            return hash_file(weights)
+        return str(self.model_path)
+
+    def detect(self, items):
+        """Yield (key, image_path, detections) for every (key, image_path) in items"""
+        start = time.perf_counter()
+        # Keep a couple of batches decoding ahead of the model
+        max_prefetch = self.batch_size * 2
+        pending = deque()
+        cached = deque()
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.prefetch_workers) as pool:
+            def fill():
+                while len(pending) < max_prefetch and len(cached) < max_prefetch:
+                    item = next(items, None)
+                    if item is None:
+                        return
+                    key, image_path = item
+                    image_hash = None
+                    if self.cache is not None:
+                        image_hash = hash_file(image_path)
+                        detections = self.cache.get(image_hash, self.model_hash, self.confidence, self.image_size)
+                        if detections is not None:
+                            self.cache_hits += 1
+                            IMAGES_DETECTED.inc(source='cache')
+                            cached.append((key, image_path, detections))
+                            continue
+                    pending.append((key, image_path, image_hash,
+                                    pool.submit(load_image, image_path, self.image_size, self.dedup is not None)))
+
+            fill()
+            while pending or cached:
+                while cached:
+                    yield cached.popleft()
+                batch = []
+                while pending and len(batch) < self.batch_size:
+                    key, image_path, image_hash, future = pending.popleft()
+                    loaded = future.result()
+                    if loaded is None:
+                        self.images_failed += 1
+                        IMAGES_DETECTED.inc(source='unreadable')
+                        print(f"Skipping {image_path}: could not decode image")
+                        continue
+                    representative = None
+                    if self.dedup is not None:
+                        representative = self.dedup.find(loaded[4])
+                        if representative is not None and representative.detections is None \
+                                and representative.image_hash is not None:
+                            # Seeded from an earlier run: its detections are in the cache
+                            representative.detections = self.cache.get(
+                                representative.image_hash, self.model_hash, self.confidence, self.image_size)
+                            if representative.detections is None:
+                                # Entry gone since startup; this image is run in its place
+                                representative.image_hash, representative.size = None, loaded[3]
+                                batch.append((key, image_path, image_hash, loaded, representative))
+                                continue
+                        if representative is not None:
+                            # Near-duplicate of an image already run or queued in this batch
+                            self.duplicates_skipped += 1
+                            IMAGES_DETECTED.inc(source='near_duplicate')
+                            if representative.detections is not None:
+                                yield key, image_path, representative.detections_for(loaded[3])
+                            else:
+                                representative.followers.append((key, image_path, loaded[3]))
+                            continue
+                        representative = self.dedup.add(loaded[4], loaded[3])
+                    batch.append((key, image_path, image_hash, loaded, representative))
+                # Start decoding the next batch before running the model on this one
+                fill()
+                if batch:
+                    yield from self._run_batch(batch)
+        self.total_seconds += time.perf_counter() - start
+
+    def _run_batch(self, batch):
+        images = [loaded[0] for _, _, _, loaded, _ in batch]
+        t0 = time.perf_counter()
+        results = self.model(images, imgsz=self.image_size, conf=self.confidence, verbose=False)
+        elapsed = time.perf_counter() - t0
+        self.inference_seconds += elapsed
+        self.images_processed += len(batch)
+        BATCH_SECONDS.observe(elapsed)
+        IMAGES_DETECTED.inc(len(batch), source='model')
+
+        batch_detections = []
+        inferred = []
+        phashes = []
+        for (key, image_path, image_hash, (_, ratio, (pad_x, pad_y), (w, h), image_phash), representative), result \
+                in zip(batch, results):
+            boxes = result.boxes
+            xyxy = boxes.xyxy.cpu().numpy()
+            classes = boxes.cls.cpu().numpy().astype(int)
+            scores = boxes.conf.cpu().numpy()
+            detections = []
+            for (x1, y1, x2, y2), class_id, score in zip(xyxy, classes, scores):
+                # Undo the letterbox so boxes are in original image pixels
+                detections.append({
+                    'detected_object_class': self.model.names[int(class_id)],
+                    'confidence_score': float(score),
+                    'bbox': [
+                        float(np.clip((x1 - pad_x) / ratio, 0, w)),
+                        float(np.clip((y1 - pad_y) / ratio, 0, h)),
+                        float(np.clip((x2 - pad_x) / ratio, 0, w)),
+                        float(np.clip((y2 - pad_y) / ratio, 0, h)),
+                    ]
+                })
+            for detection in detections:
+                OBJECTS_DETECTED.inc(object_class=detection['detected_object_class'])
+            batch_detections.append((key, image_path, detections))
+            inferred.append((image_hash, detections))
+            if representative is not None:
+                representative.detections = detections
+                if image_hash is not None:
+                    phashes.append((image_hash, image_phash, (w, h)))
+                for follower_key, follower_path, follower_size in representative.followers:
+                    batch_detections.append((follower_key, follower_path,
+                                             representative.detections_for(follower_size)))
+                representative.followers = []
+
+        if self.cache is not None:
+            # Only model output is cached; followers' borrowed boxes would pass for real results
+            self.cache.put_many(inferred, self.model_hash, self.confidence, self.image_size)
+            if phashes:
+                self.cache.put_phashes(phashes)
+        yield from batch_detections
+
+    def summary(self):
+        """One-line throughput report for the work done so far"""
+        rate = self.images_processed / self.total_seconds if self.total_seconds else 0.0
+        summary = (f"Processed {self.images_processed} images ({self.images_failed} unreadable, "
+                   f"{self.cache_hits} served from cache) in {self.total_seconds:.1f}s: {rate:.1f} images/sec, "
+                   f"batch size {self.batch_size}, {self.inference_seconds:.1f}s in the model")
+        if self.dedup is not None:
+            decoded = self.images_processed + self.duplicates_skipped
+            fraction = self.duplicates_skipped / decoded if decoded else 0.0
+            summary += (f"; {self.duplicates_skipped} near-duplicates reused detections "
+                        f"({fraction:.1%} of inference calls skipped)")
+        return summary
+
+def _init_shard_worker(threads):
+    """Pin the intra-op thread count of a shard worker process"""
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set once work has started in this process
+
+def _detect_shard(items, partial_path, model_path, batch_size, use_cache, use_dedup,
+                  parquet_root=None, shard_index=0):
+    """
+    Worker process: load the model once, run one shard of (message_id, image_path)
+    items and write its detections to a headerless partial CSV, or straight
+    into the Parquet dataset at parquet_root.
+    """
+    cache = DetectionCache() if use_cache else None
+    # Within a run, near-duplicates are only matched inside a shard; every shard is seeded
+    # with the images earlier runs sent to the model
+    dedup = NearDuplicateIndex() if use_dedup else None
+    engine = DetectionEngine(model_path, batch_size=batch_size, cache=cache, dedup=dedup)
+    if parquet_root is not None:
+        writer = ParquetDatasetWriter(parquet_root, detection_schema(), partition_cols=['channel'],
+                                      file_prefix=f"shard{shard_index:03d}")
+        for message_id, image_path, detections in engine.detect(items):
+            for det in detections:
+                writer.write(detection_row(message_id, Path(image_path).name, det))
+        writer.close()
+        if cache is not None:
+            cache.close()
+        return engine.images_processed, engine.cache_hits + engine.duplicates_skipped, writer.rows_written
+    with open(partial_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for message_id, image_path, detections in engine.detect(items):
+            for det in detections:
+                writer.writerow([message_id, Path(image_path).name, det['detected_object_class'],
+                                 det['confidence_score'], [det['bbox']]])
+    if cache is not None:
+        cache.close()
+    return engine.images_processed, engine.cache_hits + engine.duplicates_skipped, None
+
+def detect_sharded(items, output_csv, workers, model_path=MODEL_PATH, batch_size=BATCH_SIZE,
+                   threads_per_worker=None, use_cache=True, use_dedup=DEDUP_ENABLED, parquet_root=None):
+    """
+    Split (message_id, image_path) items across worker processes and merge
+    their partial CSVs into output_csv (same columns as image_object_detection.py).
+    With parquet_root, each worker writes its own files into that Parquet
+    dataset instead and output_csv is not used.
+
+    Each worker loads the model once and runs with threads_per_worker torch
+    threads (default: the CPU count divided by the number of workers).
+    Returns (images run through the model, images served from the cache or a
+    near-duplicate, detection rows written).
+    """
+    items = list(items)
+    workers = max(1, min(workers, len(items) or 1))
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    shards = [items[i::workers] for i in range(workers)]
+
+    output_csv = Path(output_csv)
+    partial_dir = output_csv.parent / f"{output_csv.stem}_parts"
+    if parquet_root is None:
+        partial_dir.mkdir(parents=True, exist_ok=True)
+    partial_paths = [partial_dir / f"part-{i:03d}.csv" for i in range(workers)]
+
+    # spawn, not fork: torch thread pools do not survive a fork safely
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_shard_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(_detect_shard, shard, str(path), model_path, batch_size, use_cache, use_dedup,
+                               parquet_root, index)
+                   for index, (shard, path) in enumerate(zip(shards, partial_paths))]
+        shard_stats = [future.result() for future in futures]
+
+    processed = sum(stats[0] for stats in shard_stats)
+    reused = sum(stats[1] for stats in shard_stats)
+    if parquet_root is not None:
+        return processed, reused, sum(stats[2] for stats in shard_stats)
+
+    # Merge partials in shard order
+    rows_written = 0
+    with open(output_csv, 'w', newline='', encoding='utf-8') as out:
+        out.write(','.join(DETECTION_COLUMNS) + '\n')
+        for path in partial_paths:
+            with open(path, 'r', encoding='utf-8') as part:
+                for line in part:
+                    out.write(line)
+                    rows_written += 1
+    shutil.rmtree(partial_dir)
+    return processed, reused, rows_written
+
+def benchmark_workers(image_paths, worker_counts, model_path=MODEL_PATH, batch_size=BATCH_SIZE):
+    """Measure images/sec of detect_sharded for each worker count, without the cache"""
+    items = [(0, path) for path in image_paths]
+    output_csv = Path('data/cache/benchmark_detections.csv')
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    rates = {}
+    for workers in worker_counts:
+        start = time.perf_counter()
+        detect_sharded(items, output_csv, workers, model_path, batch_size, use_cache=False, use_dedup=False)
+        elapsed = time.perf_counter() - start
+        rates[workers] = len(items) / elapsed if elapsed else 0.0
+        print(f"workers={workers:>3}: {rates[workers]:.1f} images/sec ({elapsed:.1f}s, includes model load)")
+    output_csv.unlink(missing_ok=True)
+    return rates
+
+def benchmark(image_paths, batch_sizes, model_path=MODEL_PATH):
+    """Measure images/sec over the same images for each batch size; returns {batch_size: images/sec}"""
+    model = YOLO(model_path)
+    items = [(None, path) for path in image_paths]
+    # Warm up once so model loading and first-call setup are not timed
+    for _ in DetectionEngine(model_path, batch_size=1, model=model).detect(items[:1]):
+        pass
+
+    rates = {}
+    for batch_size in batch_sizes:
+        engine = DetectionEngine(model_path, batch_size=batch_size, model=model)
+        for _ in engine.detect(items):
+            pass
+        rates[batch_size] = engine.images_processed / engine.total_seconds if engine.total_seconds else 0.0
+        print(f"batch_size={batch_size:>3}: {rates[batch_size]:.1f} images/sec")
+    return rates
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO throughput at different batch sizes or worker counts")
+    parser.add_argument('images_dir', nargs='?', default='data/labeled/photos')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--limit', type=int, default=256, help="number of images to use")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help="benchmark sharded inference with these worker counts instead of batch sizes")
+    args = parser.parse_args()
+
+    image_paths = sorted(Path(args.images_dir).glob('*.jpg'))[:args.limit]
+    if not image_paths:
+        print(f"No images found in {args.images_dir}")
+        return
+    print(f"Benchmarking {args.model} on {len(image_paths)} images")
+    if args.workers:
+        benchmark_workers(image_paths, args.workers, args.model)
+    else:
+        benchmark(image_paths, args.batch_sizes, args.model)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 import os
 import pandas as pd
-from ultralytics import YOLO
 from pathlib import Path
 import re
+import time
+import argparse
+import metrics
+from detection_engine import IMAGES_DETECTED, DetectionEngine, detect_sharded
+from perceptual_dedup import open_default_index
+from detection_cache import CACHE_ENABLED, open_default_cache
+from columnar_io import ParquetDatasetWriter, channel_from_filename, column_values, detection_row, detection_schema
 
 # --- CONFIGURATION ---
-IMAGES_DIR = Path("data/labeled/photos")  # <-- Update this to your actual images folder
+IMAGES_DIR = Path(os.getenv("IMAGES_DIR", "data/labeled/photos"))  # <-- Update this to your actual images folder
 OUTPUT_CSV = "data/raw/image_detections.csv"  # Where to save detection results
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", "1"))  # >1 shards images across processes
+OUTPUT_FORMAT = os.getenv("DETECTION_OUTPUT_FORMAT", "csv")  # 'csv' or 'parquet'
+OUTPUT_PARQUET_DIR = "data/raw/image_detections"  # Parquet dataset, partitioned by channel
 
 # --- HELPER FUNCTION ---
 def extract_message_id(image_path):
@@ -20,33 +29,113 @@ def extract_message_id(image_path):
         return int(match.group(1))
     return None
 
-# --- LOAD YOLOv8 MODEL ---
-model = YOLO("yolov8n.pt")  # You can use yolov8s.pt, yolov8m.pt, etc.
+def iter_images(images_dir=IMAGES_DIR, channel=None):
+    """(message_id, path) for every photo, or only those of one channel ('@name_<id>.jpg')"""
+    pattern = f"@{channel.lstrip('@')}_*.jpg" if channel else "*.jpg"
+    for image_path in sorted(Path(images_dir).glob(pattern)):  # Adjust extension if needed
+        message_id = extract_message_id(image_path)
+        if message_id is None:
+            print(f"Skipping {image_path.name}: could not extract message_id")
+            continue
+        yield message_id, image_path
 
-results_list = []
+def not_in_dataset(images, root=OUTPUT_PARQUET_DIR):
+    """Drop images whose detections the Parquet dataset already holds, reading one channel partition at a time"""
+    written = {}
+    skipped = 0
+    for message_id, image_path in images:
+        channel = channel_from_filename(image_path.name)
+        if channel not in written:
+            written[channel] = column_values(Path(root) / f"channel={channel}", "image_filename")
+        if image_path.name in written[channel]:
+            skipped += 1
+            continue
+        yield message_id, image_path
+    if skipped:
+        print(f"Skipped {skipped} images already in {root}")
 
-# --- SCAN AND DETECT ---
-for image_path in IMAGES_DIR.glob("*.jpg"):  # Adjust extension if needed
-    message_id = extract_message_id(image_path)
-    if message_id is None:
-        print(f"Skipping {image_path.name}: could not extract message_id")
-        continue
+def run_single_process(images=None, output_csv=OUTPUT_CSV, parquet_files=None):
+    """Detect objects in images (default: every photo in IMAGES_DIR); returns the number of detections
 
-    results = model(image_path)
-    for r in results:
-        for box in r.boxes:
+    With Parquet output only images not yet in the dataset are run, so the dataset never
+    holds an image twice; the paths of the files written are appended to parquet_files.
+    """
+    # --- LOAD YOLOv8 MODEL ---
+    # Model, batch size and prefetch threads come from YOLO_MODEL, YOLO_BATCH_SIZE, etc.
+    # Images already cached for this model and threshold are not run again (DETECTION_CACHE=0 disables)
+    # Near-duplicate photos reuse detections of an image already run (PHASH_DEDUP=0 disables)
+    engine = DetectionEngine(cache=open_default_cache(), dedup=open_default_index())
+
+    results_list = []
+    parquet_writer = None
+    if OUTPUT_FORMAT == "parquet":
+        # Typed columns, bbox as four floats, one directory per channel
+        parquet_writer = ParquetDatasetWriter(OUTPUT_PARQUET_DIR, detection_schema(), partition_cols=["channel"])
+
+    # --- SCAN AND DETECT ---
+    images = iter_images() if images is None else images
+    if parquet_writer is not None:
+        images = not_in_dataset(images)
+    for message_id, image_path, detections in engine.detect(images):
+        for det in detections:
+            if parquet_writer is not None:
+                parquet_writer.write(detection_row(message_id, image_path.name, det))
+                continue
             results_list.append({
                 "message_id": message_id,
                 "image_filename": image_path.name,
-                "detected_object_class": model.names[int(box.cls)],
-                "confidence_score": float(box.conf),
-                "bbox": box.xyxy.tolist()  # Optional: bounding box coordinates
+                "detected_object_class": det["detected_object_class"],
+                "confidence_score": det["confidence_score"],
+                "bbox": [det["bbox"]]  # Optional: bounding box coordinates
             })
 
-# --- SAVE RESULTS ---
-if results_list:
-    df = pd.DataFrame(results_list)
-    df.to_csv(OUTPUT_CSV, index=False)
-    print(f"Detection results saved to {OUTPUT_CSV}")
-else:
-    print("No detections found.")
+    print(engine.summary())
+
+    # --- SAVE RESULTS ---
+    if parquet_writer is not None:
+        parquet_writer.close()
+        if parquet_files is not None:
+            parquet_files.extend(parquet_writer.files)
+        if parquet_writer.rows_written:
+            print(f"Detection results saved to {OUTPUT_PARQUET_DIR} ({parquet_writer.rows_written} rows)")
+        else:
+            print("No detections found.")
+        return parquet_writer.rows_written
+    if results_list:
+        df = pd.DataFrame(results_list)
+        df.to_csv(output_csv, index=False)
+        print(f"Detection results saved to {output_csv}")
+    else:
+        print("No detections found.")
+    return len(results_list)
+
+def run_sharded(workers):
+    # Each worker process loads the model once and writes a partial CSV that is merged here
+    parquet_root = OUTPUT_PARQUET_DIR if OUTPUT_FORMAT == "parquet" else None
+    images = not_in_dataset(iter_images()) if parquet_root else iter_images()
+    processed, reused, rows = detect_sharded(images, OUTPUT_CSV, workers, use_cache=CACHE_ENABLED,
+                                             parquet_root=parquet_root)
+    # Shards count in their own processes; record the totals here for the run report
+    IMAGES_DETECTED.inc(processed, source='model')
+    IMAGES_DETECTED.inc(reused, source='cache_or_near_duplicate')
+    print(f"Processed {processed} images ({reused} served from cache or a near-duplicate) across {workers} workers")
+    if rows:
+        print(f"Detection results saved to {parquet_root or OUTPUT_CSV}")
+    else:
+        print("No detections found.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run YOLO over the images in IMAGES_DIR")
+    parser.add_argument('--workers', type=int, default=DETECTION_WORKERS,
+                        help="shard images across this many processes (overrides DETECTION_WORKERS)")
+    args = parser.parse_args(argv)
+    started_at = time.time()
+    if args.workers > 1:
+        run_sharded(args.workers)
+    else:
+        run_single_process()
+    metrics.write_run_report('detect', started_at, {
+        'images_per_s': round(IMAGES_DETECTED.total() / max(time.time() - started_at, 1e-9), 1)})
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,219 @@
+import io
 import os
-from dotenv import load_dotenv
-import pandas as pd
-from sqlalchemy import create_engine
-
-# --- LOAD ENVIRONMENT VARIABLES ---
-load_dotenv()  # Loads variables from a .env file if present
+import re
+import csv
+import time
+import argparse
+from sqlalchemy import text
+from columnar_io import detection_schema, is_parquet_path, open_dataset
+from db import get_engine  # also loads .env
 
 # --- CONFIGURATION ---
-DB_USER = os.environ.get("DB_USER")
-DB_PASSWORD = os.environ.get("DB_PASSWORD")
-DB_HOST = os.environ.get("DB_HOST", "localhost")
-DB_PORT = os.environ.get("DB_PORT", "5432")
-DB_NAME = os.environ.get("DB_NAME")
+CSV_PATH = os.environ.get("CSV_PATH", "data/raw/image_detections.csv")  # or a Parquet dataset directory
+BATCH_SIZE = int(os.environ.get("LOAD_BATCH_SIZE", "5000"))
+
+DETECTION_COLUMNS = ["message_id", "image_filename", "detected_object_class", "confidence_score", "bbox"]
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS raw.image_detections (
+    id BIGSERIAL PRIMARY KEY,
+    message_id BIGINT NOT NULL,
+    image_filename TEXT NOT NULL,
+    detected_object_class TEXT NOT NULL,
+    confidence_score DOUBLE PRECISION,
+    bbox DOUBLE PRECISION[],
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+CREATE_INDEXES_SQL = [
+    """CREATE UNIQUE INDEX IF NOT EXISTS uq_image_detections_detection
+       ON raw.image_detections (message_id, image_filename, detected_object_class, bbox)""",
+    """CREATE INDEX IF NOT EXISTS idx_image_detections_message_id
+       ON raw.image_detections (message_id)""",
+]
 
-CSV_PATH = os.environ.get("CSV_PATH", "data/raw/image_detections.csv")
+# Earlier versions wrote this table with pandas to_sql(if_exists='replace'): no id,
+# bbox stored as text like "[[x1, y1, x2, y2]]" and possibly duplicate rows.
+MIGRATE_LEGACY_SQL = [
+    "ALTER TABLE raw.image_detections ADD COLUMN IF NOT EXISTS id BIGSERIAL",
+    "ALTER TABLE raw.image_detections ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+    """ALTER TABLE raw.image_detections
+       ALTER COLUMN bbox TYPE DOUBLE PRECISION[]
+       USING ('{' || trim(both '[]' from bbox) || '}')::DOUBLE PRECISION[]""",
+    """DELETE FROM raw.image_detections a
+       USING raw.image_detections b
+       WHERE a.message_id = b.message_id
+         AND a.image_filename = b.image_filename
+         AND a.detected_object_class = b.detected_object_class
+         AND a.bbox = b.bbox
+         AND a.id < b.id""",
+    "ALTER TABLE raw.image_detections ADD PRIMARY KEY (id)",
+]
 
-# --- CREATE DATABASE ENGINE ---
-engine = create_engine(
-    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+CREATE_STAGE_SQL = (
+    "CREATE TEMP TABLE image_detections_stage ON COMMIT DROP AS "
+    f"SELECT {', '.join(DETECTION_COLUMNS)} FROM raw.image_detections WITH NO DATA"
 )
+COPY_STAGE_SQL = f"COPY image_detections_stage ({', '.join(DETECTION_COLUMNS)}) FROM STDIN WITH (FORMAT text)"
+COPY_STAGE_CSV_SQL = f"COPY image_detections_stage ({', '.join(DETECTION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Only new detections are inserted; existing rows are rewritten only if their confidence changed
+UPSERT_SQL = f"""
+INSERT INTO raw.image_detections ({', '.join(DETECTION_COLUMNS)})
+SELECT DISTINCT ON (message_id, image_filename, detected_object_class, bbox) {', '.join(DETECTION_COLUMNS)}
+FROM image_detections_stage
+ON CONFLICT (message_id, image_filename, detected_object_class, bbox) DO UPDATE
+SET confidence_score = EXCLUDED.confidence_score,
+    loaded_at = CURRENT_TIMESTAMP
+WHERE image_detections.confidence_score IS DISTINCT FROM EXCLUDED.confidence_score
+"""
+
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+def create_detections_table(conn):
+    """Create raw.image_detections with typed columns and indexes, migrating the old pandas-made table"""
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('raw.image_detections'))"))  # one creator at a time
+    conn.execute(text("CREATE SCHEMA IF NOT EXISTS raw"))
+    bbox_type = conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'raw' AND table_name = 'image_detections' AND column_name = 'bbox'
+    """)).scalar()
+    if bbox_type == "text":
+        print("Migrating legacy raw.image_detections table to typed columns")
+        for sql in MIGRATE_LEGACY_SQL:
+            conn.execute(text(sql))
+    conn.execute(text(CREATE_TABLE_SQL))
+    for sql in CREATE_INDEXES_SQL:
+        conn.execute(text(sql))
+
+def _copy_value(value):
+    """Encode a value for PostgreSQL's COPY text format"""
+    if value is None or value == "":
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _bbox_array(bbox):
+    """'[[x1, y1, x2, y2]]' as written by the detection scripts -> COPY array literal '{x1,y1,x2,y2}'"""
+    numbers = NUMBER_PATTERN.findall(bbox or "")
+    return "{" + ",".join(numbers) + "}" if numbers else None
+
+def _detection_values(row):
+    """A CSV row's COPY values, or None if a NOT NULL or numeric column would make COPY fail"""
+    message_id = (row.get("message_id") or "").strip()
+    confidence = (row.get("confidence_score") or "").strip()
+    if not message_id.lstrip("-").isdigit() or not row.get("image_filename") \
+            or not row.get("detected_object_class"):
+        return None
+    if confidence:
+        try:
+            float(confidence)
+        except ValueError:
+            return None
+    return [message_id, row["image_filename"], row["detected_object_class"], confidence,
+            _bbox_array(row.get("bbox"))]
+
+def iter_copy_batches(csv_path, batch_size=BATCH_SIZE, stats=None):
+    """Read the detections CSV lazily and yield (COPY text, row count) batches
+
+    Rows COPY would reject are skipped, so one bad row cannot abort the load;
+    their count is added to stats['invalid'].
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("invalid", 0)
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        lines = []
+        for row in reader:
+            values = _detection_values(row)
+            if values is None:
+                stats["invalid"] += 1
+                continue
+            lines.append("\t".join(_copy_value(v) for v in values) + "\n")
+            if len(lines) >= batch_size:
+                yield "".join(lines), len(lines)
+                lines = []
+        if lines:
+            yield "".join(lines), len(lines)
+
+def iter_parquet_copy_batches(dataset_path, stats=None):
+    """
+    Read a Parquet detections dataset batch by batch and yield (COPY csv text, row count).
+
+    Columns are used as Arrow arrays without converting rows to Python objects;
+    the four bbox columns are joined into an array literal with Arrow compute.
+    Rows missing a NOT NULL column are dropped and counted in stats['invalid'].
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+
+    stats = stats if stats is not None else {}
+    stats.setdefault("invalid", 0)
+    dataset = open_dataset(dataset_path, detection_schema())
+    bbox_columns = ["bbox_x1", "bbox_y1", "bbox_x2", "bbox_y2"]
+    for batch in dataset.to_batches(columns=DETECTION_COLUMNS[:-1] + bbox_columns):
+        valid = pc.is_valid(batch.column("message_id"))
+        for name in ("image_filename", "detected_object_class"):
+            valid = pc.and_(valid, pc.is_valid(batch.column(name)))
+        kept = batch.filter(valid)
+        stats["invalid"] += batch.num_rows - kept.num_rows
+        batch = kept
+        if batch.num_rows == 0:
+            continue
+        coordinates = [pc.cast(batch.column(name), pa.string()) for name in bbox_columns]
+        bbox = pc.binary_join_element_wise("{", pc.binary_join_element_wise(*coordinates, ","), "}", "")
+        table = pa.table([batch.column(name) for name in DETECTION_COLUMNS[:-1]] + [bbox],
+                         names=DETECTION_COLUMNS)
+        buffer = io.BytesIO()
+        pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+        yield buffer.getvalue().decode("utf-8"), batch.num_rows
+
+def load_detections(csv_path=CSV_PATH):
+    """Stream detections (a CSV, a Parquet dataset or a list of Parquet files) through a COPY stage into raw.image_detections"""
+    stats = {"invalid": 0}
+    if is_parquet_path(csv_path):
+        batches, copy_sql = iter_parquet_copy_batches(csv_path, stats), COPY_STAGE_CSV_SQL
+    else:
+        batches, copy_sql = iter_copy_batches(csv_path, stats=stats), COPY_STAGE_SQL
+
+    start = time.perf_counter()
+    engine = get_engine()
+    with engine.begin() as conn:
+        create_detections_table(conn)
+
+    rows_read = 0
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.execute(CREATE_STAGE_SQL)
+            for copy_text, row_count in batches:
+                cursor.copy_expert(copy_sql, io.StringIO(copy_text))
+                rows_read += row_count
+            cursor.execute(UPSERT_SQL)
+            rows_written = cursor.rowcount
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    elapsed = time.perf_counter() - start
+    source = f"{len(csv_path)} Parquet files" if isinstance(csv_path, (list, tuple)) else csv_path
+    print(f"Read {rows_read} rows from {source}; inserted or updated {rows_written} rows "
+          f"in raw.image_detections ({elapsed:.1f}s)")
+    if stats["invalid"]:
+        print(f"Skipped {stats['invalid']} invalid rows (blank or non-numeric message_id, "
+              f"missing filename or class, or bad confidence)")
+    return rows_written
 
-# --- LOAD CSV AND WRITE TO DATABASE ---
-df = pd.read_csv(CSV_PATH)
-df.to_sql('image_detections', engine, schema='raw', if_exists='replace', index=False)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load YOLO detections into raw.image_detections")
+    parser.add_argument('path', nargs='?', default=CSV_PATH, help="detections CSV or Parquet dataset directory")
+    args = parser.parse_args(argv)
+    load_detections(args.path)
 
-print(f"Loaded {len(df)} rows into raw.image_detections")
+if __name__ == "__main__":
+    main()
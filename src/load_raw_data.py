@@ -4,16 +4,181 @@ Raw Data Loader Script
 Loads raw JSON files from data lake into PostgreSQL database
 """
 
+import io
+import argparse
 import os
+import hashlib
 import json
-import pandas as pd
-from datetime import datetime
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
+from sqlalchemy import column, literal_column, table as table_clause, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import metrics
+from db import get_engine  # also loads .env
+from data_lake import data_lake_path
 
-# Load environment variables from .env file
-load_dotenv('.env')
+FILES_PROCESSED = metrics.counter('loader_files_total', "Data lake files by outcome", ['result'])
+ROWS_LOADED = metrics.counter('loader_rows_total', "Rows upserted into raw.telegram_messages")
+BYTES_LOADED = metrics.counter('loader_bytes_total', "Bytes of data lake files loaded")
+FILE_ROWS = metrics.histogram('loader_file_rows', "Rows upserted per file", buckets=metrics.ROW_BUCKETS)
+FILE_SECONDS = metrics.histogram('loader_file_seconds', "Seconds to parse and load one file")
+
+# Column order used for COPY into raw.telegram_messages
+RAW_MESSAGE_COLUMNS = [
+    'message_id', 'channel_name', 'channel_id', 'sender_id', 'sender_username',
+    'message_text', 'message_date', 'has_media', 'media_type',
+    'views', 'forwards', 'replies', 'raw_data'
+]
+# Messages without chat.id are keyed under NO_CHANNEL_ID_BASE - crc32(channel name)
+NO_CHANNEL_ID_BASE = -(2 ** 40)
+# Rows are unique on (channel_id, message_id); reloading a message refreshes its engagement counters
+ENGAGEMENT_COLUMNS = ['views', 'forwards', 'replies']
+CREATE_STAGE_SQL = (
+    "CREATE TEMP TABLE telegram_messages_stage ON COMMIT DROP AS "
+    f"SELECT {', '.join(RAW_MESSAGE_COLUMNS)} FROM raw.telegram_messages WITH NO DATA"
+)
+COPY_MESSAGES_SQL = (
+    f"COPY telegram_messages_stage ({', '.join(RAW_MESSAGE_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT text)"
+)
+# Both load paths resolve conflicts the same way: a copy without engagement counters keeps the
+# known ones, and loaded_at moves so the incremental dbt models pick the row up again
+CONFLICT_UPDATES = {
+    **{col: f"COALESCE(EXCLUDED.{col}, telegram_messages.{col})" for col in ENGAGEMENT_COLUMNS},
+    'raw_data': "EXCLUDED.raw_data",
+    'loaded_at': "CURRENT_TIMESTAMP",
+}
+ON_CONFLICT_SQL = "ON CONFLICT (channel_id, message_id) DO UPDATE SET " + ", ".join(
+    f"{col} = {expr}" for col, expr in CONFLICT_UPDATES.items())
+RAW_MESSAGES_TABLE = table_clause('telegram_messages', *map(column, RAW_MESSAGE_COLUMNS + ['loaded_at']), schema='raw')
+UPSERT_FROM_STAGE_SQL = f"""
+    INSERT INTO raw.telegram_messages ({', '.join(RAW_MESSAGE_COLUMNS)})
+    SELECT DISTINCT ON (channel_id, message_id) {', '.join(RAW_MESSAGE_COLUMNS)}
+    FROM telegram_messages_stage
+    ORDER BY channel_id, message_id, views DESC NULLS LAST
+    {ON_CONFLICT_SQL}
+"""
+
+def _copy_value(value):
+    """Encode a value for PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r').replace('\x00', ''))
+
+def _iter_messages(file_path: Path):
+    """Yield (message, raw JSON text) from a JSON file (array or object) or a JSONL file line by line
+
+    JSONL lines are passed through as the raw JSON text so they are not encoded a second time.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.suffix == '.jsonl':
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line), line
+        else:
+            data = json.load(f)
+            if not isinstance(data, list):
+                data = [data]
+            for msg in data:
+                yield msg, json.dumps(msg)
+
+def _channel_from_path(file_path: Path):
+    """Extract the channel name from the file path"""
+    # Expected path: data/raw/telegrammessages/YYYY-MM-DD/channelname.json
+    # or, from the scraper's JSONL output, YYYY-MM-DD/channelname.<run>-<seq>.jsonl
+    path_parts = file_path.parts
+    if len(path_parts) < 4:
+        return 'unknown'
+    if file_path.suffix == '.jsonl':
+        return path_parts[-1].split('.')[0]
+    return path_parts[-1].replace('.json', '')
+
+def _fallback_channel_id(channel_name):
+    """
+    Stand-in channel_id for exports without chat.id, stable per channel name.
+
+    The unique key (channel_id, message_id) treats NULLs as distinct, so rows
+    without a channel id would be inserted again on every run. The stand-in sits
+    below real (positive) and synthetic (-1 .. -1000-n) ids.
+    """
+    return NO_CHANNEL_ID_BASE - zlib.crc32((channel_name or '').encode('utf-8'))
+
+def _build_record(msg, raw_json, channel_name):
+    """Map a Telegram message to a raw.telegram_messages row"""
+    channel_id = msg.get('chat', {}).get('id')
+    if channel_id is None:
+        channel_id = _fallback_channel_id(channel_name)
+    return {
+        'message_id': msg.get('id'),
+        'channel_name': channel_name,
+        'channel_id': channel_id,
+        'sender_id': msg.get('from', {}).get('id'),
+        'sender_username': msg.get('from', {}).get('username'),
+        'message_text': msg.get('text', msg.get('message')),
+        'message_date': msg.get('date'),
+        'has_media': bool(msg.get('media')),
+        'media_type': msg.get('media_type'),
+        'views': msg.get('views'),
+        'forwards': msg.get('forwards'),
+        'replies': msg.get('replies'),
+        'raw_data': raw_json
+    }
+
+def _iter_record_batches(file_path: Path, batch_size):
+    """Yield lists of at most batch_size records from one file"""
+    channel_name = _channel_from_path(file_path)
+    records = []
+    for msg, raw_json in _iter_messages(file_path):
+        records.append(_build_record(msg, raw_json, channel_name))
+        if len(records) >= batch_size:
+            yield records
+            records = []
+    if records:
+        yield records
+
+def _encode_copy_batch(records):
+    """Encode a batch of records as COPY text-format rows"""
+    return ''.join(
+        '\t'.join(_copy_value(record[col]) for col in RAW_MESSAGE_COLUMNS) + '\n'
+        for record in records
+    )
+
+def _transform_file(file_path, batch_size):
+    """Parse one file into COPY-ready batches; runs in a worker process"""
+    file_path = Path(file_path)
+    return [(_encode_copy_batch(records), len(records))
+            for records in _iter_record_batches(file_path, batch_size)]
+
+def _views(record):
+    views = record.get('views')
+    return -1 if views is None or views != views else views  # None or NaN sorts last
+
+def _upsert_rows(table, conn, keys, data_iter):
+    """pandas to_sql method: multi-row INSERT ... ON CONFLICT on (channel_id, message_id)"""
+    # A single statement cannot update the same row twice, so keep the copy with the most views,
+    # as the COPY path's DISTINCT ON does
+    rows = {}
+    for row in data_iter:
+        record = dict(zip(keys, row))
+        key = (record['channel_id'], record['message_id'])
+        kept = rows.get(key)
+        if kept is None or _views(record) >= _views(kept):
+            rows[key] = record
+    if not rows:
+        return 0
+    stmt = pg_insert(RAW_MESSAGES_TABLE).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['channel_id', 'message_id'],
+        set_={col: literal_column(expr) for col, expr in CONFLICT_UPDATES.items()}
+    )
+    result = conn.execute(stmt)
+    return result.rowcount
 
 class RawDataLoader:
     def __init__(self):
@@ -21,19 +186,15 @@ class RawDataLoader:
         # Validate database environment variables
         self._validate_env_variables()
         
-        # Get database configuration from environment
-        db_user = os.getenv('DB_USER', 'postgres')
-        db_password = os.getenv('DB_PASSWORD', 'password')
-        db_host = os.getenv('DB_HOST', 'localhost')
-        db_port = os.getenv('DB_PORT', '5432')
-        db_name = os.getenv('DB_NAME', 'shipping_data_warehouse')
-        
-        self.db_url = (
-            f"postgresql://{db_user}:{db_password}@"
-            f"{db_host}:{db_port}/{db_name}"
-        )
-        self.engine = create_engine(self.db_url)
-        self.data_lake_path = Path(os.getenv('DATA_LAKE_PATH', 'Shipping-Data-Product/data/raw'))
+        self.data_lake_path = Path(data_lake_path())
+        self.batch_size = int(os.getenv('LOAD_BATCH_SIZE', '5000'))
+        # 'copy' streams rows with COPY FROM STDIN; 'to_sql' is the original pandas path
+        self.load_method = os.getenv('LOAD_METHOD', 'copy')
+        # Parallel mode: parse processes and concurrent writer connections (1 worker = sequential)
+        self.parse_workers = int(os.getenv('LOAD_WORKERS', '1'))
+        self.writer_connections = int(os.getenv('LOAD_WRITERS', '4'))
+        # Shared pool (DB_POOL_SIZE + DB_MAX_OVERFLOW connections); writers borrow from it
+        self.engine = get_engine()
         
         # Create logs directory if it doesn't exist
         Path('logs').mkdir(exist_ok=True)
@@ -67,6 +228,9 @@ class RawDataLoader:
         """Create the raw schema and tables if they don't exist"""
         try:
             with self.engine.connect() as conn:
+                # Concurrent loaders (e.g. parallel partition runs) take turns creating the tables
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('raw.telegram_messages'))"))
+
                 # Create raw schema
                 conn.execute(text("CREATE SCHEMA IF NOT EXISTS raw"))
                 
@@ -91,6 +255,74 @@ class RawDataLoader:
                 );
                 """
                 conn.execute(text(create_table_sql))
+
+                # Unique key for upserts. Earlier append-only loads may have left
+                # duplicates, so keep only the newest copy before building the index.
+                has_unique_key = conn.execute(text(
+                    "SELECT to_regclass('raw.uq_telegram_messages_channel_message') IS NOT NULL"
+                )).scalar()
+                if not has_unique_key:
+                    conn.execute(text("""
+                    DELETE FROM raw.telegram_messages a
+                    USING raw.telegram_messages b
+                    WHERE a.channel_id = b.channel_id
+                      AND a.message_id = b.message_id
+                      AND a.id < b.id
+                    """))
+                    conn.execute(text("""
+                    CREATE UNIQUE INDEX uq_telegram_messages_channel_message
+                    ON raw.telegram_messages (channel_id, message_id)
+                    """))
+
+                # Rows loaded before channel ids were defaulted slipped past the
+                # unique key (NULLs are distinct); keep the newest copy and give
+                # them the same stand-in id new loads use
+                conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_telegram_messages_null_channel
+                ON raw.telegram_messages (channel_name) WHERE channel_id IS NULL
+                """))
+                null_channels = conn.execute(text(
+                    "SELECT DISTINCT channel_name FROM raw.telegram_messages WHERE channel_id IS NULL"
+                )).scalars().all()
+                for channel_name in null_channels:
+                    params = {'channel_name': channel_name,
+                              'channel_id': _fallback_channel_id(channel_name)}
+                    conn.execute(text("""
+                    DELETE FROM raw.telegram_messages a
+                    WHERE a.channel_id IS NULL
+                      AND a.channel_name IS NOT DISTINCT FROM :channel_name
+                      AND EXISTS (
+                          SELECT 1 FROM raw.telegram_messages b
+                          WHERE b.message_id = a.message_id
+                            AND (b.channel_id = :channel_id
+                                 OR (b.channel_id IS NULL
+                                     AND b.channel_name IS NOT DISTINCT FROM :channel_name
+                                     AND b.id > a.id))
+                      )
+                    """), params)
+                    conn.execute(text("""
+                    UPDATE raw.telegram_messages SET channel_id = :channel_id
+                    WHERE channel_id IS NULL
+                      AND channel_name IS NOT DISTINCT FROM :channel_name
+                    """), params)
+
+                # Incremental dbt models select new rows by loaded_at
+                conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_telegram_messages_loaded_at
+                ON raw.telegram_messages (loaded_at)
+                """))
+
+                # Files already loaded, so unchanged files can be skipped
+                conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS raw.load_manifest (
+                    file_path TEXT PRIMARY KEY,
+                    file_size BIGINT,
+                    file_mtime DOUBLE PRECISION,
+                    content_hash VARCHAR(64),
+                    rows_loaded INTEGER,
+                    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """))
                 conn.commit()
                 print("Raw schema and tables created successfully")
                 
@@ -98,102 +330,301 @@ class RawDataLoader:
             print(f"Error creating schema: {str(e)}")
             raise
     
+    def _iter_batches(self, file_path: Path):
+        """Yield lists of at most batch_size records so large files are never held whole"""
+        return _iter_record_batches(file_path, self.batch_size)
+
+    def _insert_records(self, records):
+        """Upsert a batch of records into raw.telegram_messages with pandas"""
+        import pandas as pd  # only the to_sql path needs it
+        df = pd.DataFrame(records)
+        df.to_sql('telegram_messages', self.engine, schema='raw',
+                 if_exists='append', index=False, method=_upsert_rows)
+
+    def _copy_batches(self, copy_batches):
+        """COPY pre-encoded batches into a temp stage and upsert them, in one transaction
+
+        Returns the number of rows copied. Uses a connection from the engine's pool.
+        """
+        loaded = 0
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.execute(CREATE_STAGE_SQL)
+                for copy_text, row_count in copy_batches:
+                    cursor.copy_expert(COPY_MESSAGES_SQL, io.StringIO(copy_text))
+                    loaded += row_count
+                cursor.execute(UPSERT_FROM_STAGE_SQL)
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        return loaded
+
+    def _load_file_with_copy(self, file_path: Path):
+        """Load one file through COPY in a single transaction"""
+        return self._copy_batches(
+            (_encode_copy_batch(records), len(records)) for records in self._iter_batches(file_path)
+        )
+
+    def _load_file_with_to_sql(self, file_path: Path):
+        """Load one file through DataFrame.to_sql with a multi-row upsert"""
+        loaded = 0
+        for records in self._iter_batches(file_path):
+            self._insert_records(records)
+            loaded += len(records)
+        return loaded
+
     def load_json_file(self, file_path: Path):
-        """Load a single JSON file into the database"""
+        """Load a single JSON or JSONL file into the database, returning the number of rows loaded"""
         try:
             print(f"Loading file: {file_path}")
-            
-            # Read JSON file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Extract channel information from file path
-            # Expected path: data/raw/telegrammessages/YYYY-MM-DD/channelname.json
-            path_parts = file_path.parts
-            if len(path_parts) >= 4:
-                date_str = path_parts[-2]  # YYYY-MM-DD
-                channel_name = path_parts[-1].replace('.json', '')
+            start = time.perf_counter()
+            if self.load_method == 'copy':
+                loaded = self._load_file_with_copy(file_path)
             else:
-                date_str = datetime.now().strftime('%Y-%m-%d')
-                channel_name = 'unknown'
-            
-            # Prepare data for insertion
-            records = []
-            if isinstance(data, list):
-                messages = data
-            else:
-                messages = [data]
-            
-            for msg in messages:
-                record = {
-                    'message_id': msg.get('id'),
-                    'channel_name': channel_name,
-                    'channel_id': msg.get('chat', {}).get('id'),
-                    'sender_id': msg.get('from', {}).get('id'),
-                    'sender_username': msg.get('from', {}).get('username'),
-                    'message_text': msg.get('text', msg.get('message')),
-                    'message_date': msg.get('date'),
-                    'has_media': bool(msg.get('media')),
-                    'media_type': msg.get('media_type'),
-                    'views': msg.get('views'),
-                    'forwards': msg.get('forwards'),
-                    'replies': msg.get('replies'),
-                    'raw_data': json.dumps(msg)
-                }
-                records.append(record)
+                loaded = self._load_file_with_to_sql(file_path)
+            elapsed = time.perf_counter() - start
             
-            # Insert into database
-            if records:
-                df = pd.DataFrame(records)
-                df.to_sql('telegram_messages', self.engine, schema='raw', 
-                         if_exists='append', index=False, method='multi')
-                print(f"Successfully loaded {len(records)} records from {file_path}")
+            if loaded:
+                print(f"Successfully loaded {loaded} records from {file_path} "
+                      f"({loaded / max(elapsed, 1e-9):,.0f} rows/sec via {self.load_method})")
+            return loaded
             
         except Exception as e:
             print(f"Error loading file {file_path}: {str(e)}")
             raise
     
-    def load_all_raw_data(self):
-        """Load all JSON files from the data lake"""
+    def _observe_file(self, size, rows_loaded, seconds):
+        FILES_PROCESSED.inc(result='loaded')
+        ROWS_LOADED.inc(rows_loaded)
+        BYTES_LOADED.inc(size)
+        FILE_ROWS.observe(rows_loaded)
+        FILE_SECONDS.observe(seconds)
+
+    def _manifest_key(self, file_path: Path):
+        """Manifest entries are keyed by path relative to the data lake"""
+        try:
+            return file_path.relative_to(self.data_lake_path).as_posix()
+        except ValueError:
+            return file_path.as_posix()
+
+    def _hash_file(self, file_path: Path):
+        """SHA-256 of the file contents, read in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _read_manifest(self):
+        """Return {file_path: (size, mtime, content_hash)} for every loaded file"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT file_path, file_size, file_mtime, content_hash FROM raw.load_manifest"
+            )).fetchall()
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+    def _record_manifest(self, key, size, mtime, content_hash, rows_loaded):
+        """Insert or refresh a manifest entry after a file has been loaded"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO raw.load_manifest (file_path, file_size, file_mtime, content_hash, rows_loaded)
+                VALUES (:file_path, :file_size, :file_mtime, :content_hash, :rows_loaded)
+                ON CONFLICT (file_path) DO UPDATE SET
+                    file_size = EXCLUDED.file_size,
+                    file_mtime = EXCLUDED.file_mtime,
+                    content_hash = EXCLUDED.content_hash,
+                    rows_loaded = COALESCE(EXCLUDED.rows_loaded, load_manifest.rows_loaded),
+                    loaded_at = CURRENT_TIMESTAMP
+            """), {"file_path": key, "file_size": size, "file_mtime": mtime,
+                   "content_hash": content_hash, "rows_loaded": rows_loaded})
+
+    def _pending_files(self, json_files, force=False):
+        """Split files into those that need loading and those unchanged since the last load
+
+        Size and mtime are checked first; the content is only hashed when they differ,
+        so a touched but unchanged file is skipped too.
+        """
+        manifest = {} if force else self._read_manifest()
+        pending = []
+        skipped = 0
+        for file_path in json_files:
+            key = self._manifest_key(file_path)
+            stat = file_path.stat()
+            previous = manifest.get(key)
+            if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                skipped += 1
+                continue
+            content_hash = self._hash_file(file_path)
+            if previous and previous[2] == content_hash:
+                self._record_manifest(key, stat.st_size, stat.st_mtime, content_hash, None)
+                skipped += 1
+                continue
+            pending.append((file_path, key, stat.st_size, stat.st_mtime, content_hash))
+        return pending, skipped
+
+    def _load_files_parallel(self, pending):
+        """Parse files in a process pool and write them over a bounded set of pooled connections
+
+        At most two files per parse worker are in flight (parsed or being written), which
+        bounds memory. Errors are counted per file as in the sequential path; if the run
+        itself fails, queued work is cancelled and both pools are shut down before re-raising.
+        """
+        success_count = 0
+        error_count = 0
+        total_rows = 0
+        files = iter(pending)
+        parse_futures = {}
+        write_futures = {}
+        submitted_at = {}
+        max_in_flight = self.parse_workers * 2
+
+        parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        write_pool = ThreadPoolExecutor(max_workers=self.writer_connections)
+
+        def submit_parse():
+            item = next(files, None)
+            if item is not None:
+                print(f"Loading file: {item[0]}")
+                submitted_at[item[1]] = time.perf_counter()
+                parse_futures[parse_pool.submit(_transform_file, str(item[0]), self.batch_size)] = item
+
+        try:
+            for _ in range(max_in_flight):
+                submit_parse()
+
+            while parse_futures or write_futures:
+                done, _ = wait(list(parse_futures) + list(write_futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parse_futures:
+                        item = parse_futures.pop(future)
+                        try:
+                            copy_batches = future.result()
+                        except Exception as e:
+                            error_count += 1
+                            FILES_PROCESSED.inc(result='failed')
+                            print(f"Failed to load {item[0]}: {str(e)}")
+                            submit_parse()
+                            continue
+                        write_futures[write_pool.submit(self._copy_batches, copy_batches)] = item
+                    else:
+                        file_path, key, size, mtime, content_hash = write_futures.pop(future)
+                        try:
+                            rows_loaded = future.result()
+                            self._record_manifest(key, size, mtime, content_hash, rows_loaded)
+                            self._observe_file(size, rows_loaded, time.perf_counter() - submitted_at.pop(key))
+                            total_rows += rows_loaded
+                            success_count += 1
+                            print(f"Successfully loaded {rows_loaded} records from {file_path}")
+                        except Exception as e:
+                            error_count += 1
+                            FILES_PROCESSED.inc(result='failed')
+                            print(f"Failed to load {file_path}: {str(e)}")
+                        submit_parse()
+        except BaseException:
+            for future in list(parse_futures) + list(write_futures):
+                future.cancel()
+            raise
+        finally:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+            write_pool.shutdown(wait=True, cancel_futures=True)
+
+        return success_count, error_count, total_rows
+
+    def load_all_raw_data(self, force=False, channels=None):
+        """Load new or changed JSON files from the data lake
+
+        Files listed in raw.load_manifest with the same size/mtime or content hash are
+        skipped unless force is True. Messages are upserted on (channel_id, message_id),
+        so reloading a file never duplicates rows. With channels, only those channels'
+        files are considered. Returns a summary dict of files and rows loaded.
+        """
         try:
             print("Starting raw data load process")
             
             # Create schema and tables
             self.create_raw_schema()
             
-            # Find all JSON files in the data lake
-            json_files = list(self.data_lake_path.rglob('*.json'))
+            # Find all JSON and JSONL files in the data lake
+            json_files = sorted(list(self.data_lake_path.rglob('*.json')) +
+                                list(self.data_lake_path.rglob('*.jsonl')))
+            if channels:
+                wanted = {channel.lstrip('@') for channel in channels}
+                json_files = [f for f in json_files if _channel_from_path(f) in wanted]
             
             if not json_files:
                 print(f"No JSON files found in {self.data_lake_path}")
-                return
-            
-            print(f"Found {len(json_files)} JSON files to process")
-            
-            # Load each file
-            success_count = 0
-            error_count = 0
-            
-            for file_path in json_files:
-                try:
-                    self.load_json_file(file_path)
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    print(f"Failed to load {file_path}: {str(e)}")
-            
-            print(f"Data load completed. Success: {success_count}, Errors: {error_count}")
+                return {'files_loaded': 0, 'files_failed': 0, 'files_skipped': 0, 'rows_loaded': 0}
+            return self.load_files(json_files, force=force)
             
         except Exception as e:
             print(f"Error in load_all_raw_data: {str(e)}")
             raise
 
-def main():
+    def load_files(self, json_files, force=False):
+        """Load the given JSON/JSONL files, skipping those the manifest shows as unchanged
+
+        Used directly for one date/channel partition of the data lake. Returns the same
+        summary dict as load_all_raw_data.
+        """
+        pending, skipped = self._pending_files(json_files, force=force)
+        FILES_PROCESSED.inc(skipped, result='skipped')
+        print(f"Found {len(json_files)} JSON files, {len(pending)} new or changed, {skipped} unchanged")
+        
+        # Load each file
+        success_count = 0
+        error_count = 0
+        total_rows = 0
+        start = time.perf_counter()
+        
+        parallel = self.parse_workers > 1 and self.load_method == 'copy'
+        if self.parse_workers > 1 and not parallel:
+            print("Parallel loading requires LOAD_METHOD=copy; loading files sequentially")
+        if parallel:
+            print(f"Loading in parallel: {self.parse_workers} parse workers, "
+                  f"{self.writer_connections} writer connections")
+            success_count, error_count, total_rows = self._load_files_parallel(pending)
+        
+        for file_path, key, size, mtime, content_hash in ([] if parallel else pending):
+            try:
+                file_start = time.perf_counter()
+                rows_loaded = self.load_json_file(file_path)
+                self._record_manifest(key, size, mtime, content_hash, rows_loaded)
+                self._observe_file(size, rows_loaded, time.perf_counter() - file_start)
+                total_rows += rows_loaded
+                success_count += 1
+            except Exception as e:
+                error_count += 1
+                FILES_PROCESSED.inc(result='failed')
+                print(f"Failed to load {file_path}: {str(e)}")
+        
+        elapsed = time.perf_counter() - start
+        print(f"Data load completed. Success: {success_count}, Errors: {error_count}")
+        print(f"Loaded {total_rows} rows in {elapsed:.1f}s "
+              f"({total_rows / max(elapsed, 1e-9):,.0f} rows/sec via {self.load_method})")
+        return {'files_loaded': success_count, 'files_failed': error_count,
+                'files_skipped': skipped, 'rows_loaded': total_rows}
+
+def main(argv=None):
     """Main function to run the data loader"""
     try:
         print("Starting raw data loader...")
+        parser = argparse.ArgumentParser(description="Load raw Telegram JSON files into PostgreSQL")
+        parser.add_argument('--force', action='store_true',
+                            help="reload every file, ignoring the load manifest")
+        parser.add_argument('--workers', type=int,
+                            help="parse files in this many processes (overrides LOAD_WORKERS)")
+        args = parser.parse_args(argv)
         loader = RawDataLoader()
-        loader.load_all_raw_data()
+        if args.workers:
+            loader.parse_workers = args.workers
+        started_at = time.time()
+        summary = loader.load_all_raw_data(force=args.force)
+        metrics.write_run_report('load', started_at, {
+            **summary, 'rows_per_s': round(summary['rows_loaded'] / max(time.time() - started_at, 1e-9), 1)})
         print("Raw data loading completed successfully")
     except ValueError as e:
         print(f"Configuration error: {str(e)}")
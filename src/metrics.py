@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Metrics
+Counters, latency histograms and timers shared by the scraper, loader, detection scripts
+and API. Rendered in the Prometheus text format for the API's /metrics route and written
+as a JSON run report at the end of each script or pipeline run.
+
+With METRICS=0 every metric is a shared no-op object and @timed returns the function
+unchanged, so instrumented code pays at most an empty method call.
+"""
+
+import os
+import json
+import time
+import bisect
+import inspect
+import threading
+from functools import wraps
+from datetime import datetime, timezone
+
+# --- CONFIGURATION ---
+METRICS_ENABLED = os.getenv('METRICS', '1') not in ('0', 'false', 'False')
+REPORT_DIR = os.getenv('METRICS_REPORT_DIR', 'data/reports')
+# Seconds; covers a fast cached API hit up to a slow batch of YOLO inference
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROW_BUCKETS = (10, 100, 1000, 5000, 10000, 50000, 100000, 500000)
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                for key, value in sorted(self.values.items())]
+
+    def snapshot(self):
+        return [{'labels': dict(zip(self.labelnames, key)), 'value': value}
+                for key, value in sorted(self.values.items())]
+
+class Histogram:
+    """Observations counted into fixed buckets per label combination, with their sum"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, labels)
+
+    def quantile(self, series, fraction):
+        """Estimate a quantile by interpolating inside the bucket that contains it"""
+        counts = series[:-1]
+        target = fraction * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= target:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return 0.0
+
+    def render(self):
+        lines = []
+        for key, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+    def snapshot(self):
+        result = []
+        for key, series in sorted(self.values.items()):
+            count = sum(series[:-1])
+            result.append({
+                'labels': dict(zip(self.labelnames, key)),
+                'count': count,
+                'sum': round(series[-1], 6),
+                'mean': round(series[-1] / count, 6) if count else 0.0,
+                'p50': round(self.quantile(series, 0.50), 6),
+                'p99': round(self.quantile(series, 0.99), 6),
+            })
+        return result
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+class _NoOpMetric:
+    """Stands in for every metric when METRICS=0"""
+
+    def inc(self, amount=1, **labels):
+        pass
+
+    def observe(self, value, **labels):
+        pass
+
+    def time(self, **labels):
+        return self
+
+    def total(self):
+        return 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NOOP = _NoOpMetric()
+
+class Registry:
+    """Metrics by name; asking twice for the same name returns the same metric"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in sorted(self.metrics.items())}
+
+REGISTRY = Registry()
+
+def counter(name, help_text, labelnames=()):
+    if not METRICS_ENABLED:
+        return NOOP
+    return REGISTRY._get(Counter, name, help_text, labelnames)
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    if not METRICS_ENABLED:
+        return NOOP
+    return REGISTRY._get(Histogram, name, help_text, labelnames, buckets)
+
+def timed(metric, **labels):
+    """Decorator observing each call's duration (sync or async) in a histogram"""
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with metric.time(**labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render():
+    return REGISTRY.render()
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+def write_run_report(run_name, started_at, extra=None, report_dir=REPORT_DIR, metrics_snapshot=None):
+    """Write <report_dir>/<run_name>-<UTC timestamp>.json with the run's duration and metrics
+
+    started_at is a time.time() value. metrics_snapshot replaces this process's metrics,
+    e.g. with snapshots gathered from other processes. Returns the path, or None when
+    metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return None
+    finished_at = time.time()
+    report = {
+        'run': run_name,
+        'started_at': datetime.fromtimestamp(started_at, timezone.utc).isoformat(),
+        'finished_at': datetime.fromtimestamp(finished_at, timezone.utc).isoformat(),
+        'duration_s': round(finished_at - started_at, 3),
+        **(extra or {}),
+        'metrics': snapshot() if metrics_snapshot is None else metrics_snapshot,
+    }
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = datetime.fromtimestamp(finished_at, timezone.utc).strftime('%Y%m%dT%H%M%S')
+    path = os.path.join(report_dir, f"{run_name}-{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"📊 Run report written to {path}")
+    return path
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Perceptual Dedup
+Perceptual hashing and a BK-tree index for finding re-encoded or resized copies of an image
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+DEDUP_ENABLED = os.getenv('PHASH_DEDUP', '1') not in ('0', 'false', 'False')
+MAX_DISTANCE = int(os.getenv('PHASH_MAX_DISTANCE', '4'))  # bits out of 64
+
+def phash(image):
+    """
+    64-bit DCT perceptual hash of a decoded BGR image.
+
+    The image is reduced to 32x32 grey, the top-left 8x8 DCT coefficients
+    are kept, and each bit records whether a coefficient is above the median.
+    Re-encoding and resizing barely move the hash, unlike a byte hash.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    coefficients = cv2.dct(small)[:8, :8].flatten()
+    bits = coefficients > np.median(coefficients[1:])  # ignore the DC term
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for near-neighbour lookups"""
+
+    def __init__(self):
+        self.root = None  # node: [hash, value, {distance: child}]
+        self.size = 0
+
+    def add(self, key, value):
+        if self.root is None:
+            self.root = [key, value, {}]
+            self.size += 1
+            return
+        node = self.root
+        while True:
+            distance = hamming(key, node[0])
+            if distance == 0:
+                return  # an identical hash is already indexed
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                self.size += 1
+                return
+            node = child
+
+    def find(self, key, max_distance):
+        """The (distance, value) of the closest entry within max_distance, or None"""
+        if self.root is None:
+            return None
+        best = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(key, node[0])
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, node[1])
+            # Triangle inequality: only children in [d - max, d + max] can match
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return best
+
+class Representative:
+    """The first image seen of a group of near-duplicates, and the detections YOLO found on it"""
+
+    def __init__(self, size, image_hash=None):
+        self.size = size  # (width, height) of the original image
+        self.image_hash = image_hash  # set when seeded from the cache; its detections are read on first match
+        self.detections = None  # filled in once the model has run on it
+        self.followers = []  # near-duplicates waiting for those detections
+
+    def detections_for(self, size):
+        """Detections with boxes rescaled to a duplicate of a different size"""
+        scale_x = size[0] / self.size[0]
+        scale_y = size[1] / self.size[1]
+        return [
+            {**det, 'bbox': [det['bbox'][0] * scale_x, det['bbox'][1] * scale_y,
+                             det['bbox'][2] * scale_x, det['bbox'][3] * scale_y]}
+            for det in self.detections
+        ]
+
+class NearDuplicateIndex:
+    """Maps perceptual hashes to Representatives, matching within max_distance bits"""
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.tree = BKTree()
+
+    def find(self, image_hash):
+        match = self.tree.find(image_hash, self.max_distance)
+        return match[1] if match else None
+
+    def add(self, image_hash, size):
+        representative = Representative(size)
+        self.tree.add(image_hash, representative)
+        return representative
+
+    def seed(self, entries):
+        """Index (content hash, perceptual hash, size) of images run earlier; returns the index size"""
+        for content_hash, image_phash, size in entries:
+            self.tree.add(image_phash, Representative(size, image_hash=content_hash))
+        return self.tree.size
+
+def open_default_index():
+    """A NearDuplicateIndex with PHASH_MAX_DISTANCE, or None if PHASH_DEDUP=0"""
+    return NearDuplicateIndex() if DEDUP_ENABLED else None
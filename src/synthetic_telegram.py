@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Synthetic Telegram Corpus
+Telethon-like messages, JPEG photos and a fake Telegram client, so the scraper, loader,
+detector and API can be benchmarked without credentials, a session file or real data.
+
+Synthetic channels are named bench_channel_<n> and get channel ids from -1000 down,
+so their rows never collide with scraped data (or the dbt benchmark's -1..-50).
+"""
+
+import io
+import os
+import json
+import random
+import asyncio
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from text_matcher import load_dictionary
+
+CHANNEL_PREFIX = "bench_channel_"
+FIRST_CHANNEL_ID = -1000
+
+FILLER = (
+    "new stock available today call us for more information free consultation "
+    "quality guaranteed original product best price in addis ababa visit our shop "
+    "ዋጋ ለማዘዝ ይደውሉ"
+).split()
+
+class SyntheticMessage:
+    """The attributes of a telethon Message that telegram_scrapper reads"""
+
+    def __init__(self, message_id, date, text, sender_id, photo_id=None, views=0, forwards=0, replies=None):
+        self.id = message_id
+        self.date = date
+        self.message = text
+        self.sender_id = sender_id
+        self.sender = SimpleNamespace(username=f"user{sender_id}")
+        self.photo = SimpleNamespace(id=photo_id) if photo_id is not None else None
+        self.media = SimpleNamespace(photo=self.photo) if self.photo else None
+        self.document = None
+        self.views = views
+        self.forwards = forwards
+        self.replies = SimpleNamespace(replies=replies) if replies is not None else None
+
+@lru_cache(maxsize=256)  # re-posted photos are encoded once
+def synthetic_jpeg(seed, size=(320, 240)):
+    """JPEG bytes of a random image; undecodable JPEG-framed noise when Pillow is not installed"""
+    rng = random.Random(seed)
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return b"\xff\xd8" + rng.randbytes(2048) + b"\xff\xd9"
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(2, 6)):
+        x1, y1 = rng.randrange(size[0]), rng.randrange(size[1])
+        x2, y2 = min(size[0], x1 + rng.randint(20, 120)), min(size[1], y1 + rng.randint(20, 120))
+        draw.rectangle([x1, y1, x2, y2], fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def generate_corpus(channels=3, messages_per_channel=1000, photo_ratio=0.3, duplicate_ratio=0.1,
+                    days=30, seed=0, end=None):
+    """{'@bench_channel_<n>': [SyntheticMessage, ...] newest first}, plus {photo_id: seed}
+
+    duplicate_ratio of the photos re-post an earlier photo, like channels re-sharing product shots.
+    """
+    rng = random.Random(seed)
+    dictionary = load_dictionary()
+    terms = [s for synonyms in dictionary.get('products', {}).values() for s in synonyms]
+    terms += [t for flag_terms in dictionary.get('flags', {}).values() for t in flag_terms]
+    end = end or datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start) / max(messages_per_channel, 1)
+
+    corpus = {}
+    photo_seeds = {}
+    for n in range(channels):
+        messages = []
+        for i in range(messages_per_channel):
+            words = rng.choices(FILLER, k=rng.randint(5, 60))
+            for _ in range(rng.randint(0, 3)):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(terms))
+            photo_id = None
+            if rng.random() < photo_ratio:
+                if photo_seeds and rng.random() < duplicate_ratio:
+                    photo_id = rng.choice(list(photo_seeds))
+                else:
+                    photo_id = len(photo_seeds) + 1
+                    photo_seeds[photo_id] = rng.randrange(2 ** 32)
+            messages.append(SyntheticMessage(
+                i + 1, start + step * i, " ".join(words), rng.randrange(5000), photo_id,
+                views=rng.randrange(10000), forwards=rng.randrange(100), replies=rng.randrange(30)))
+        corpus[f"@{CHANNEL_PREFIX}{n}"] = messages[::-1]
+    return corpus, photo_seeds
+
+def channel_id(channel_username):
+    return FIRST_CHANNEL_ID - int(channel_username.rsplit("_", 1)[1])
+
+class FakeTelegramClient:
+    """
+    Serves a synthetic corpus through the TelegramClient calls the scraper makes:
+    start, get_entity, iter_messages (newest first, or oldest first with reverse;
+    offset_id/min_id/limit, exclusive as in Telethon) and
+    download_media(media, file=bytes). latency adds a delay per page of 100 messages
+    and per download, to stand in for the network.
+    """
+
+    def __init__(self, corpus, photo_seeds, latency=0.0):
+        self.corpus = corpus
+        self.photo_seeds = photo_seeds
+        self.latency = latency
+
+    async def start(self):
+        return self
+
+    async def get_entity(self, channel_username):
+        return SimpleNamespace(id=channel_id(channel_username), title=channel_username.lstrip("@").replace("_", " "),
+                               username=channel_username.lstrip("@"))
+
+    async def iter_messages(self, entity, limit=None, offset_id=0, min_id=0, reverse=False):
+        sent = 0
+        messages = self.corpus[f"@{entity.username}"]
+        for message in (reversed(messages) if reverse else messages):
+            if limit is not None and sent >= limit:
+                return
+            if reverse:
+                # Oldest first, offset_id and min_id are both lower bounds
+                if message.id <= max(offset_id, min_id):
+                    continue
+            else:
+                if offset_id and message.id >= offset_id:
+                    continue
+                if message.id <= min_id:
+                    return
+            if self.latency and sent % 100 == 0:
+                await asyncio.sleep(self.latency)
+            sent += 1
+            yield message
+
+    async def download_media(self, media, file=bytes):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return synthetic_jpeg(self.photo_seeds[media.photo.id])
+
+def message_record(message, channel_username, media_dir):
+    """The JSONL record the scraper writes for a message"""
+    name = channel_username.lstrip("@")
+    return {
+        'id': message.id,
+        'date': message.date.isoformat(),
+        'message': message.message,
+        'chat': {'id': channel_id(channel_username), 'title': name.replace("_", " "), 'username': channel_username},
+        'from': {'id': message.sender_id, 'username': message.sender.username},
+        'media': bool(message.media),
+        'media_type': 'photo' if message.photo else None,
+        'media_path': os.path.join(media_dir, f"{channel_username}_{message.id}.jpg") if message.photo else None,
+        'views': message.views,
+        'forwards': message.forwards,
+        'replies': message.replies.replies if message.replies else None,
+    }
+
+def write_data_lake(corpus, root, media_dir):
+    """Write the corpus as <root>/YYYY-MM-DD/<channel>.bench-0000.jsonl; returns (files, bytes)"""
+    paths = []
+    for channel_username, messages in corpus.items():
+        name = channel_username.lstrip("@")
+        f = None
+        try:
+            for message in reversed(messages):  # oldest first, so each day's file is written in one go
+                date_str = message.date.strftime('%Y-%m-%d')
+                path = os.path.join(root, date_str, f"{name}.bench-0000.jsonl")
+                if f is None or f.name != path:
+                    if f is not None:
+                        f.close()
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    f = open(path, 'w', encoding='utf-8')
+                    paths.append(path)
+                f.write(json.dumps(message_record(message, channel_username, media_dir), ensure_ascii=False) + "\n")
+        finally:
+            if f is not None:
+                f.close()
+    return len(paths), sum(os.path.getsize(path) for path in paths)
+
+def write_photos(corpus, photo_seeds, media_dir):
+    """Write '@<channel>_<message id>.jpg' for every photo message; returns the number written"""
+    os.makedirs(media_dir, exist_ok=True)
+    written = 0
+    for channel_username, messages in corpus.items():
+        for message in messages:
+            if message.photo is None:
+                continue
+            with open(os.path.join(media_dir, f"{channel_username}_{message.id}.jpg"), 'wb') as f:
+                f.write(synthetic_jpeg(photo_seeds[message.photo.id]))
+            written += 1
+    return written
@@ -1,8 +1,19 @@
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+import asyncio
+import argparse
+import json
+import hashlib
+import shutil
+from collections import OrderedDict
+from datetime import datetime
 import csv
 import os
 import sys
+import time
 from dotenv import load_dotenv
+import metrics
+from data_lake import data_lake_path
 
 # Load environment variables once
 load_dotenv('.env')
@@ -12,72 +23,462 @@ api_id = os.getenv('TG_API_ID')
 api_hash = os.getenv('TG_API_HASH')
 phone = os.getenv('phone')
 
-# Validate that all required environment variables are present
-if not api_id or api_id == 'your_api_id_here':
-    print("❌ Error: TG_API_ID not found or not set properly in .env file")
-    print("Please create a .env file with your Telegram API credentials")
-    print("You can copy env_template.txt to .env and fill in your credentials")
-    sys.exit(1)
+def _require_credentials():
+    """Exit with a hint unless the Telegram credentials are set in .env"""
+    for name, value, placeholder in (('TG_API_ID', api_id, 'your_api_id_here'),
+                                     ('TG_API_HASH', api_hash, 'your_api_hash_here'),
+                                     ('phone', phone, 'your_phone_number_here')):
+        if not value or value == placeholder:
+            print(f"❌ Error: {name} not found or not set properly in .env file")
+            print("Please create a .env file with your Telegram API credentials")
+            print("You can copy env_template.txt to .env and fill in your credentials")
+            sys.exit(1)
+    print("✅ Environment variables loaded successfully")
 
-if not api_hash or api_hash == 'your_api_hash_here':
-    print("❌ Error: TG_API_HASH not found or not set properly in .env file")
-    print("Please create a .env file with your Telegram API credentials")
-    print("You can copy env_template.txt to .env and fill in your credentials")
-    sys.exit(1)
+# Scrape tuning (override in .env)
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', '4'))  # channels scraped at the same time; 1 = sequential
+SCRAPE_MESSAGE_LIMIT = int(os.getenv('SCRAPE_MESSAGE_LIMIT', '100'))  # first run only, before a channel has a checkpoint
+FLOOD_MAX_RETRIES = int(os.getenv('FLOOD_MAX_RETRIES', '5'))
+FLOOD_WAIT_PADDING = float(os.getenv('FLOOD_WAIT_PADDING', '1.0'))  # extra seconds on top of Telegram's wait
+SCRAPE_STATE_PATH = os.getenv('SCRAPE_STATE_PATH', 'scraping_state.json')  # kept next to scraping_session
+BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', '500'))
+BACKFILL_MAX_CHUNKS = int(os.getenv('BACKFILL_MAX_CHUNKS', '10'))  # per channel per run
+CHECKPOINT_EVERY = 200  # rows written between checkpoint saves
+MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', '4'))  # concurrent photo downloads
+MEDIA_STORE_SUBDIR = 'by_hash'  # content-addressed photos live in <media_dir>/by_hash/<sha256>.jpg
+SCRAPE_OUTPUT = os.getenv('SCRAPE_OUTPUT', 'csv')  # 'csv' or 'jsonl'
+JSONL_ROOT = data_lake_path()  # same tree RawDataLoader reads
+JSONL_ROTATE_BYTES = int(os.getenv('JSONL_ROTATE_BYTES', str(64 * 1024 * 1024)))  # max size of one segment
+JSONL_MAX_OPEN_FILES = 64
 
-if not phone or phone == 'your_phone_number_here':
-    print("❌ Error: phone not found or not set properly in .env file")
-    print("Please create a .env file with your Telegram API credentials")
-    print("You can copy env_template.txt to .env and fill in your credentials")
-    sys.exit(1)
+# List of channels to scrape
+CHANNELS = [
+    '@CheMed123',
+    '@lobelia4cosmetics',
+    '@tikvahpharma'
+]
 
-print("✅ Environment variables loaded successfully")
+MESSAGES_SCRAPED = metrics.counter('scraper_messages_total', "Messages fetched from Telegram", ['channel'])
+MEDIA_DOWNLOADS = metrics.counter('scraper_media_downloads_total', "Photo downloads by outcome", ['result'])
+MEDIA_BYTES = metrics.counter('scraper_media_bytes_total', "Bytes of newly stored photos")
+FLOOD_WAITS = metrics.counter('scraper_flood_waits_total', "FloodWaitErrors from Telegram", ['channel'])
+
+CSV_HEADER = ['Channel Title', 'Channel Username', 'ID', 'Message', 'Date', 'Media Path']
+
+class CheckpointStore:
+    """Per-channel high-water marks persisted as a small JSON file.
+
+    For every channel we keep the newest message id written (`last_id`), the
+    oldest one (`oldest_id`) and whether backfill has reached the start of the
+    channel. Only rows that reached the output file are recorded. Incremental
+    passes fetch oldest first, so every id up to `last_id` has been written.
+    """
+
+    def __init__(self, path=SCRAPE_STATE_PATH):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def get(self, channel_username):
+        return self.state.setdefault(channel_username, {'last_id': 0, 'oldest_id': 0, 'backfill_complete': False})
+
+    def observe(self, channel_username, message_id):
+        channel_state = self.get(channel_username)
+        channel_state['last_id'] = max(channel_state['last_id'], message_id)
+        if not channel_state['oldest_id'] or message_id < channel_state['oldest_id']:
+            channel_state['oldest_id'] = message_id
+
+    def mark_backfill_complete(self, channel_username):
+        self.get(channel_username)['backfill_complete'] = True
+
+    def save(self):
+        # Write to a temp file first so a crash never leaves a truncated state file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class CsvOutput:
+    """Appends rows to the flat data/raw/telegram_data.csv file."""
+
+    def __init__(self, csv_path):
+        # Append so earlier runs are kept; header only for a new file
+        write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        self.file = open(csv_path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if write_header:
+            self.writer.writerow(CSV_HEADER)  # Include channel title in the header
+
+    def write(self, record):
+        self.writer.writerow([record['chat']['title'], record['chat']['username'], record['id'],
+                              record['message'], record['date'], record['media_path']])
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class PartitionedJsonlWriter:
+    """Streams messages into append-only JSONL segments partitioned by date and channel.
+
+    Layout matches what RawDataLoader reads:
+    <root>/YYYY-MM-DD/<channel>.<run id>-<seq>.jsonl
+
+    Lines go to a `.jsonl.part` file first. A segment is renamed to `.jsonl`
+    only once it is complete (size limit, handle eviction, or end of run), so
+    the loader never sees a half-written file.
+    """
+
+    def __init__(self, root=JSONL_ROOT, rotate_bytes=JSONL_ROTATE_BYTES, max_open_files=JSONL_MAX_OPEN_FILES):
+        self.root = root
+        self.rotate_bytes = rotate_bytes
+        self.max_open_files = max_open_files
+        self.run_id = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        self.segments = OrderedDict()  # (date, channel) -> [file, part_path, bytes_written]
+        self.sequence = {}
+        self.recover()
+
+    def recover(self):
+        """Publish segments left behind by an interrupted run, dropping any torn last line."""
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith('.jsonl.part'):
+                    continue
+                part_path = os.path.join(dirpath, name)
+                with open(part_path, 'rb+') as f:
+                    data = f.read()
+                    f.truncate(data.rfind(b'\n') + 1)
+                os.replace(part_path, part_path[:-len('.part')])
+
+    def write(self, record):
+        channel = record['chat']['username'].lstrip('@')
+        key = (record['date'].strftime('%Y-%m-%d'), channel)
+        segment = self.segments.get(key)
+        if segment is None:
+            segment = self._open(key)
+        self.segments.move_to_end(key)
+        line = (json.dumps(record, ensure_ascii=False, default=_json_default) + '\n').encode('utf-8')
+        segment[0].write(line)
+        segment[2] += len(line)
+        if segment[2] >= self.rotate_bytes:
+            self._publish(key)
+
+    def _open(self, key):
+        if len(self.segments) >= self.max_open_files:
+            self._publish(next(iter(self.segments)))
+        date_str, channel = key
+        partition_dir = os.path.join(self.root, date_str)
+        os.makedirs(partition_dir, exist_ok=True)
+        seq = self.sequence.get(key, 0)
+        self.sequence[key] = seq + 1
+        part_path = os.path.join(partition_dir, f"{channel}.{self.run_id}-{seq:04d}.jsonl.part")
+        segment = [open(part_path, 'ab'), part_path, 0]
+        self.segments[key] = segment
+        return segment
+
+    def _publish(self, key):
+        f, part_path, _ = self.segments.pop(key)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(part_path, part_path[:-len('.part')])
+
+    def flush(self):
+        for f, _, _ in self.segments.values():
+            f.flush()
+
+    def close(self):
+        for key in list(self.segments):
+            self._publish(key)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def get_media_type(message):
+    """Short media type name as stored in raw.telegram_messages.media_type."""
+    if not message.media:
+        return None
+    if message.photo:
+        return 'photo'
+    if message.document:
+        return 'document'
+    return type(message.media).__name__.replace('MessageMedia', '').lower() or None
+
+def message_to_record(message, entity, channel_username, channel_title, media_path):
+    """Flatten a Telethon message into the dict shape RawDataLoader reads."""
+    sender = message.sender
+    return {
+        'id': message.id,
+        'date': message.date,
+        'message': message.message,
+        'chat': {'id': entity.id, 'title': channel_title, 'username': channel_username},
+        'from': {'id': message.sender_id, 'username': getattr(sender, 'username', None)},
+        'media': bool(message.media),
+        'media_type': get_media_type(message),
+        'media_path': media_path,
+        'views': message.views,
+        'forwards': message.forwards,
+        'replies': message.replies.replies if message.replies else None,
+    }
 
 # Function to scrape data from a single channel
-async def scrape_channel(client, channel_username, writer, media_dir):
+async def scrape_channel(client, channel_username, queue, media_queue, media_dir, progress=None):
+    """Scrape one channel and push message records onto the writer queue.
+
+    Photos are not downloaded here; they are handed to the media workers
+    through `media_queue` so message metadata never waits on image I/O.
+
+    `progress` holds the paging window (`offset_id`, `min_id`), the direction
+    (`reverse`: oldest first) and how many messages are still wanted
+    (`remaining`, None for no limit). It is updated as rows are queued, so a
+    retry after a FloodWait resumes instead of starting over.
+    """
+    if progress is None:
+        progress = {'offset_id': 0, 'min_id': 0, 'remaining': SCRAPE_MESSAGE_LIMIT}
+    reverse = progress.get('reverse', False)
     entity = await client.get_entity(channel_username)
     channel_title = entity.title  # Extract the channel's title
-    async for message in client.iter_messages(entity, limit=100):
+    async for message in client.iter_messages(entity, limit=progress['remaining'], reverse=reverse,
+                                              offset_id=progress['offset_id'], min_id=progress['min_id']):
         media_path = None
         if message.media and hasattr(message.media, 'photo'):
             # Create a unique filename for the photo
             filename = f"{channel_username}_{message.id}.jpg"
             media_path = os.path.join(media_dir, filename)
-            # Download the media to the specified directory if it's a photo
-            await client.download_media(message.media, media_path)
-        
+            # Queue the download unless an earlier run already fetched it
+            if not os.path.exists(media_path):
+                await media_queue.put((channel_username, message.media, media_path))
+
         # Write the channel title along with other data
-        writer.writerow([channel_title, channel_username, message.id, message.message, message.date, media_path])
+        await queue.put(message_to_record(message, entity, channel_username, channel_title, media_path))
+        MESSAGES_SCRAPED.inc(channel=channel_username)
+        # Oldest first, min_id is the exclusive lower bound to resume from
+        progress['min_id' if reverse else 'offset_id'] = message.id
+        if progress['remaining'] is not None:
+            progress['remaining'] -= 1
+
+async def run_with_flood_backoff(channel_username, scrape):
+    """Await `scrape()` until it finishes, sleeping on FloodWaitError.
+
+    Only the throttled channel sleeps; the other channel tasks keep running.
+    Returns False if the channel is still throttled after FLOOD_MAX_RETRIES.
+    """
+    for attempt in range(FLOOD_MAX_RETRIES + 1):
+        try:
+            await scrape()
+            return True
+        except FloodWaitError as e:
+            FLOOD_WAITS.inc(channel=channel_username)
+            if attempt == FLOOD_MAX_RETRIES:
+                print(f"❌ Giving up on {channel_username} after {attempt + 1} flood waits")
+                return False
+            wait = e.seconds * (attempt + 1) + FLOOD_WAIT_PADDING
+            print(f"⏳ FloodWait on {channel_username}: sleeping {wait:.0f}s (attempt {attempt + 1}/{FLOOD_MAX_RETRIES})")
+            await asyncio.sleep(wait)
+
+async def scrape_channel_with_backoff(client, channel_username, queue, media_queue, media_dir, semaphore, checkpoints, backfill=False):
+    """Fetch everything newer than the channel's checkpoint, then optionally backfill.
+
+    Without a checkpoint the newest SCRAPE_MESSAGE_LIMIT messages are fetched.
+    Backfill pages further back from the oldest message seen, in chunks of
+    BACKFILL_CHUNK_SIZE, for at most BACKFILL_MAX_CHUNKS chunks per run.
+    """
+    async with semaphore:
+        channel_state = checkpoints.get(channel_username)
+        last_id, oldest_id = channel_state['last_id'], channel_state['oldest_id']
+
+        if last_id:
+            # Oldest first, so last_id only ever advances over messages already written with
+            # nothing missing below them; a crash or a give-up resumes where the output stopped
+            progress = {'offset_id': 0, 'min_id': last_id, 'remaining': None, 'reverse': True}
+        else:
+            progress = {'offset_id': 0, 'min_id': 0, 'remaining': SCRAPE_MESSAGE_LIMIT}
+        if not await run_with_flood_backoff(
+                channel_username, lambda: scrape_channel(client, channel_username, queue, media_queue, media_dir, progress)):
+            return
+        print(f"Scraped new messages from {channel_username} (since id {last_id})")
+
+        if not backfill or channel_state['backfill_complete']:
+            return
+        # A first run has just fetched the newest page, so continue below it
+        offset_id = oldest_id or progress['offset_id']
+        for _ in range(BACKFILL_MAX_CHUNKS):
+            if not offset_id:
+                break
+            progress = {'offset_id': offset_id, 'min_id': 0, 'remaining': BACKFILL_CHUNK_SIZE}
+            if not await run_with_flood_backoff(
+                    channel_username, lambda: scrape_channel(client, channel_username, queue, media_queue, media_dir, progress)):
+                return
+            if progress['remaining'] > 0:
+                checkpoints.mark_backfill_complete(channel_username)
+                print(f"Backfill of {channel_username} reached the first message")
+                return
+            offset_id = progress['offset_id']
+        print(f"Backfilled {channel_username} down to id {offset_id}")
+
+def link_media(store_path, media_path):
+    """Expose a content-addressed photo under its channel/id filename.
+
+    Hard links cost no extra space; fall back to a symlink, then a copy, on
+    filesystems that do not support them.
+    """
+    try:
+        os.link(store_path, media_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(store_path), media_path)
+        except OSError:
+            shutil.copyfile(store_path, media_path)
+
+async def download_photo(client, media, media_path, media_dir, stats):
+    """Download one photo into the content-addressed store and link it into place."""
+    data = await client.download_media(media, file=bytes)
+    if not data:
+        return
+    digest = hashlib.sha256(data).hexdigest()
+    store_dir = os.path.join(media_dir, MEDIA_STORE_SUBDIR)
+    store_path = os.path.join(store_dir, f"{digest}.jpg")
+    if os.path.exists(store_path):
+        stats['deduplicated'] += 1
+        MEDIA_DOWNLOADS.inc(result='deduplicated')
+    else:
+        tmp_path = f"{store_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, store_path)
+        stats['downloaded'] += 1
+        stats['bytes'] += len(data)
+        MEDIA_DOWNLOADS.inc(result='downloaded')
+        MEDIA_BYTES.inc(len(data))
+    link_media(store_path, media_path)
+
+async def media_download_worker(client, media_queue, media_dir, stats):
+    """Drain the media queue until a None sentinel arrives.
+
+    A failed download is reported and skipped so one bad file never stops
+    the rest of the scrape.
+    """
+    while True:
+        item = await media_queue.get()
+        if item is None:
+            break
+        channel_username, media, media_path = item
+        if os.path.exists(media_path):
+            stats['skipped'] += 1
+            MEDIA_DOWNLOADS.inc(result='skipped')
+            continue
+        try:
+            await run_with_flood_backoff(
+                channel_username, lambda: download_photo(client, media, media_path, media_dir, stats))
+        except Exception as e:
+            stats['failed'] += 1
+            MEDIA_DOWNLOADS.inc(result='failed')
+            print(f"Failed to download {media_path}: {str(e)}")
 
-# Initialize the client once
-client = TelegramClient('scraping_session', api_id, api_hash)
+async def output_writer_worker(queue, output, checkpoints):
+    """Single consumer that serializes all records into the output.
 
-async def main():
+    Checkpoints advance only after a record is written, and are saved together
+    with a flush so the state file never runs ahead of the output.
+    """
+    written = 0
+    while True:
+        record = await queue.get()
+        if record is None:
+            break
+        output.write(record)
+        checkpoints.observe(record['chat']['username'], record['id'])
+        written += 1
+        if written % CHECKPOINT_EVERY == 0:
+            output.flush()
+            checkpoints.save()
+    output.close()
+    checkpoints.save()
+    print(f"Wrote {written} new messages")
+
+# Created on first use, so importing this module needs no credentials
+client = None
+
+def get_client():
+    global client
+    if client is None:
+        _require_credentials()
+        client = TelegramClient('scraping_session', api_id, api_hash)
+    return client
+
+async def main(backfill=False, output_mode=SCRAPE_OUTPUT, channels=None):
+    client = get_client()
     await client.start()
     
     # Create data/raw directory and photos subdirectory
     raw_data_dir = 'data/raw'
     media_dir = os.path.join(raw_data_dir, 'photos')
-    os.makedirs(media_dir, exist_ok=True)
-
-    # Open the CSV file in data/raw directory and prepare the writer
-    csv_path = os.path.join(raw_data_dir, 'telegram_data.csv')
-    with open(csv_path, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Channel Title', 'Channel Username', 'ID', 'Message', 'Date', 'Media Path'])  # Include channel title in the header
-        
-        # List of channels to scrape
-        channels = [  
-            '@CheMed123',
-             '@lobelia4cosmetics',
-             '@tikvahpharma'
-    
-        ]
-        
-        # Iterate over channels and scrape data into the single CSV file
-        for channel in channels:
-            await scrape_channel(client, channel, writer, media_dir)
-            print(f"Scraped data from {channel}")
-
-with client:
-    client.loop.run_until_complete(main())
\ No newline at end of file
+    os.makedirs(os.path.join(media_dir, MEDIA_STORE_SUBDIR), exist_ok=True)
+
+    checkpoints = CheckpointStore()
+
+    if output_mode == 'jsonl':
+        output = PartitionedJsonlWriter()
+    else:
+        output = CsvOutput(os.path.join(raw_data_dir, 'telegram_data.csv'))
+
+    # All channel tasks feed one queue; a single writer drains it into the output
+    queue = asyncio.Queue(maxsize=1000)
+    writer_task = asyncio.create_task(output_writer_worker(queue, output, checkpoints))
+
+    # Photos go through their own bounded worker pool
+    workers = max(1, MEDIA_WORKERS)
+    media_queue = asyncio.Queue(maxsize=workers * 4)
+    media_stats = {'downloaded': 0, 'deduplicated': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+    media_tasks = [
+        asyncio.create_task(media_download_worker(client, media_queue, media_dir, media_stats))
+        for _ in range(workers)
+    ]
+
+    semaphore = asyncio.Semaphore(max(1, SCRAPE_CONCURRENCY))
+    try:
+        await asyncio.gather(*(
+            scrape_channel_with_backoff(client, channel, queue, media_queue, media_dir, semaphore, checkpoints, backfill)
+            for channel in (channels or CHANNELS)
+        ))
+    finally:
+        for _ in media_tasks:
+            await media_queue.put(None)
+        await asyncio.gather(*media_tasks)
+        await queue.put(None)
+        await writer_task
+
+    print(f"Photos: {media_stats['downloaded']} downloaded ({media_stats['bytes'] / 1e6:.1f} MB), "
+          f"{media_stats['deduplicated']} duplicates linked, {media_stats['skipped']} already present, "
+          f"{media_stats['failed']} failed")
+
+def scrape(channels=None, backfill=False, output_mode=SCRAPE_OUTPUT):
+    """Run one scrape to completion from synchronous code (e.g. a Dagster op)"""
+    client = get_client()
+    with client:
+        client.loop.run_until_complete(main(backfill=backfill, output_mode=output_mode, channels=channels))
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Telegram channels incrementally")
+    parser.add_argument('--backfill', action='store_true',
+                        help="also page further back than the oldest message already scraped")
+    parser.add_argument('--output', choices=['csv', 'jsonl'], default=SCRAPE_OUTPUT,
+                        help="flat CSV in data/raw, or date/channel partitioned JSONL in DATA_LAKE_PATH")
+    args = parser.parse_args(argv)
+    started_at = time.time()
+    scrape(backfill=args.backfill, output_mode=args.output)
+    elapsed = max(time.time() - started_at, 1e-9)
+    metrics.write_run_report('scrape', started_at, {
+        'messages_per_s': round(MESSAGES_SCRAPED.total() / elapsed, 1),
+        'media_mb_per_s': round(MEDIA_BYTES.total() / 1e6 / elapsed, 2),
+    })
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Text Matcher
+Aho-Corasick keyword matching and the dictionary-driven content classifier built on it
+"""
+
+import os
+import json
+import hashlib
+
+try:
+    import ahocorasick  # pyahocorasick: same automaton, built in C
+except ImportError:
+    ahocorasick = None
+
+# --- CONFIGURATION ---
+DICTIONARY_PATH = os.getenv(
+    'CONTENT_DICTIONARY',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content_dictionary.json')
+)
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of a set of terms in one pass over the text.
+
+    Terms are matched case-insensitively. Uses pyahocorasick when it is
+    installed and an equivalent pure-Python automaton otherwise.
+    """
+
+    def __init__(self, terms):
+        """terms: iterable of (term, payload); find() yields (start, end, payload)"""
+        self.patterns = []  # (term length, payload)
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            by_term = {}
+            for term, payload in terms:
+                if term:
+                    by_term.setdefault(term.casefold(), []).append(payload)
+            for term, payloads in by_term.items():
+                self.automaton.add_word(term, (len(term), payloads))
+            if by_term:
+                self.automaton.make_automaton()
+            self.empty = not by_term
+            return
+
+        # Trie as parallel lists: goto[state] = {char: next state}, out[state] = pattern ids
+        self.goto = [{}]
+        self.out = [[]]
+        for term, payload in terms:
+            term = term.casefold()
+            if not term:
+                continue
+            state = 0
+            for ch in term:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.out.append([])
+                state = next_state
+            self.out[state].append(len(self.patterns))
+            self.patterns.append((len(term), payload))
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        """Breadth-first: each state falls back to the longest proper suffix that is also in the trie"""
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text):
+        """Yield (start, end, payload) for every match in casefolded text"""
+        if ahocorasick is not None:
+            if self.empty:
+                return
+            for end, (length, payloads) in self.automaton.iter(text):
+                for payload in payloads:
+                    yield end + 1 - length, end + 1, payload
+            return
+
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pattern_id in out[state]:
+                    length, payload = patterns[pattern_id]
+                    yield i + 1 - length, i + 1, payload
+
+def load_dictionary(path=DICTIONARY_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dictionary_hash(dictionary):
+    """Stable hash of a dictionary; messages are reclassified when it changes"""
+    encoded = json.dumps(dictionary, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+def _is_word_boundary(text, start, end):
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    return not before.isalnum() and not after.isalnum()
+
+class ContentClassifier:
+    """
+    Flags and product mentions for a message, from a dictionary of the form
+
+        {"flags": {"medical_content": ["medic", "drug"], ...},
+         "products": {"paracetamol": ["paracetamol", "panadol"], ...}}
+
+    Flag terms match anywhere, like the ILIKE '%term%' checks they replace.
+    Product synonyms only match as whole words, so "serum" does not fire inside "serumless".
+    """
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.version = dictionary_hash(dictionary)
+        terms = []
+        for flag, flag_terms in dictionary.get('flags', {}).items():
+            terms.extend((term, ('flag', flag, term)) for term in flag_terms)
+        for product, synonyms in dictionary.get('products', {}).items():
+            terms.extend((synonym, ('product', product, synonym)) for synonym in synonyms)
+        self.matcher = KeywordMatcher(terms)
+
+    def classify(self, text):
+        """(sorted flag names, {product: (mention count, first matched term)})"""
+        flags = set()
+        mentions = {}
+        last_end = {}  # synonyms ending at the same place ("body lotion"/"lotion") count once
+        if not text:
+            return [], mentions
+        folded = text.casefold()
+        for start, end, (kind, name, term) in self.matcher.find(folded):
+            if kind == 'flag':
+                flags.add(name)
+            elif last_end.get(name) != end and _is_word_boundary(folded, start, end):
+                last_end[name] = end
+                count, first_term = mentions.get(name, (0, term))
+                mentions[name] = (count + 1, first_term)
+        return sorted(flags), mentions
+
+def open_default_classifier():
+    """A ContentClassifier over CONTENT_DICTIONARY (src/content_dictionary.json by default)"""
+    return ContentClassifier(load_dictionary())
@@ -1,47 +1,82 @@
 import os
+import argparse
 import pandas as pd
-from ultralytics import YOLO
 from pathlib import Path
 import json
+import time
+import metrics
+from detection_engine import DetectionEngine
+from perceptual_dedup import open_default_index
+from detection_cache import open_default_cache
+from columnar_io import ParquetDatasetWriter, detection_row, detection_schema
 
 # Paths
 CSV_PATH = 'data/labeled/telegram_data.csv'
 PHOTOS_DIR = Path('data/labeled/photos')
 OUTPUT_JSON = 'data/labeled/image_detections.json'
+OUTPUT_FORMAT = os.getenv('DETECTION_OUTPUT_FORMAT', 'json')  # 'json' or 'parquet'
+OUTPUT_PARQUET_DIR = 'data/labeled/image_detections'  # Parquet dataset, partitioned by channel
 
-# Load CSV
-df = pd.read_csv(CSV_PATH)
-
-# Load YOLOv8 model (pre-trained)
-model = YOLO('yolov8n.pt')  # You can use yolov8s.pt, yolov8m.pt, etc.
-
-results_list = []
-
-for idx, row in df.iterrows():
-    media_path = row.get('Media Path')
-    message_id = row.get('ID')
-    if pd.isna(media_path) or not media_path:
-        continue
-    image_path = PHOTOS_DIR / os.path.basename(media_path)
-    if not image_path.exists():
-        continue
-
-    # Run YOLO detection
-    results = model(image_path)
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls[0])
-            class_name = model.names[class_id]
-            confidence = float(box.conf[0])
+def iter_images(df, photos_dir=PHOTOS_DIR):
+    """(message_id, image path) for each row whose photo was downloaded"""
+    for media_path, message_id in zip(df['Media Path'], df['ID']):
+        if pd.isna(media_path) or not media_path:
+            continue
+        image_path = Path(photos_dir) / os.path.basename(media_path)
+        if not image_path.exists():
+            continue
+        yield int(message_id), image_path
+
+def enrich(csv_path=CSV_PATH, output_format=OUTPUT_FORMAT):
+    """Run YOLO over the photos of the labeled messages and save the detections"""
+    df = pd.read_csv(csv_path)
+
+    # Load YOLOv8 model (pre-trained); set YOLO_MODEL to use yolov8s.pt, yolov8m.pt, etc.
+    # Images already cached for this model and threshold are not run again (DETECTION_CACHE=0 disables)
+    # Near-duplicate photos reuse detections of an image already run (PHASH_DEDUP=0 disables)
+    engine = DetectionEngine(cache=open_default_cache(), dedup=open_default_index())
+
+    results_list = []
+    parquet_writer = None
+    if output_format == 'parquet':
+        parquet_writer = ParquetDatasetWriter(OUTPUT_PARQUET_DIR, detection_schema(), partition_cols=['channel'])
+
+    # Run YOLO detection in batches
+    for message_id, image_path, detections in engine.detect(iter_images(df)):
+        for det in detections:
+            if parquet_writer is not None:
+                parquet_writer.write(detection_row(message_id, image_path.name, det))
+                continue
             results_list.append({
                 'message_id': message_id,
                 'image_path': str(image_path),
-                'detected_object_class': class_name,
-                'confidence_score': confidence
+                'detected_object_class': det['detected_object_class'],
+                'confidence_score': det['confidence_score']
             })
 
-# Save results to JSON
-with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-    json.dump(results_list, f, ensure_ascii=False, indent=2)
+    print(engine.summary())
+
+    if parquet_writer is not None:
+        parquet_writer.close()
+        print(f"Detection results saved to {OUTPUT_PARQUET_DIR} ({parquet_writer.rows_written} rows)")
+    else:
+        # Save results to JSON
+        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+            json.dump(results_list, f, ensure_ascii=False, indent=2)
+
+        print(f"Detection results saved to {OUTPUT_JSON}")
+    return engine
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run YOLO over the photos of the labeled messages in CSV_PATH")
+    parser.add_argument('--csv', default=CSV_PATH, help=f"labeled messages (default {CSV_PATH})")
+    parser.add_argument('--format', choices=['json', 'parquet'], default=OUTPUT_FORMAT,
+                        help="output format (overrides DETECTION_OUTPUT_FORMAT)")
+    args = parser.parse_args(argv)
+    started_at = time.time()
+    engine = enrich(args.csv, args.format)
+    metrics.write_run_report('enrich', started_at, {
+        'images_per_s': round(engine.images_processed / engine.total_seconds, 1) if engine.total_seconds else 0.0})
 
-print(f"Detection results saved to {OUTPUT_JSON}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
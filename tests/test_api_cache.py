@@ -0,0 +1,84 @@
+import asyncio
+
+from api.cache import MemoryBackend, RedisBackend, ResponseCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_entries_are_keyed_on_the_data_version():
+    cache = ResponseCache(MemoryBackend(), ttl=60, version_check_seconds=0)
+
+    async def scenario():
+        await cache.set_version(1)
+        await cache.set("top-products", {"limit": 10}, [{"product_name": "serum", "mention_count": 3}])
+        first = await cache.get("top-products", {"limit": 10})
+        await cache.set_version(2)
+        second = await cache.get("top-products", {"limit": 10})
+        return first, second, await cache.stats()
+
+    first, second, stats = run(scenario())
+    assert first == [{"product_name": "serum", "mention_count": 3}]
+    assert second is None
+    assert (stats["hits"], stats["misses"], stats["invalidations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_memory_backend_evicts_the_least_recently_used_entry():
+    backend = MemoryBackend(max_entries=2)
+
+    async def scenario():
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")
+        await backend.set("c", 3, ttl=60)
+        return [await backend.get(key) for key in ("a", "b", "c")], await backend.size()
+
+    assert run(scenario()) == ([1, None, 3], 2)
+
+
+def test_memory_backend_drops_expired_entries():
+    backend = MemoryBackend()
+    run(backend.set("stale", 1, ttl=-1))
+    assert run(backend.get("stale")) is None
+    assert run(backend.size()) == 0
+
+
+class FakeAsyncRedis:
+    """The redis.asyncio calls RedisBackend makes; a sync call would return a plain value and fail to await"""
+
+    def __init__(self):
+        self.values = {}
+        self.scans = []
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.values[key] = value.encode()
+
+    async def scan_iter(self, match, count):
+        self.scans.append(match)
+        for key in list(self.values):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+    def keys(self, pattern):
+        raise AssertionError("KEYS blocks the Redis server")
+
+
+def test_redis_backend_awaits_the_client_and_counts_with_scan():
+    backend = RedisBackend.__new__(RedisBackend)
+    backend.client = FakeAsyncRedis()
+    backend.client.values["other:key"] = b"1"
+    cache = ResponseCache(backend, ttl=0.5)
+
+    async def scenario():
+        await cache.set_version(7)
+        await cache.set("channel-activity", {"channel_name": "CheMed123"}, [{"message_count": 2}])
+        return await cache.get("channel-activity", {"channel_name": "CheMed123"}), await cache.stats()
+
+    value, stats = run(scenario())
+    assert value == [{"message_count": 2}]
+    assert stats["entries"] == 1
+    assert backend.client.scans == ["api-cache:*"]
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from columnar_io import (  # noqa: E402
+    ParquetDatasetWriter, column_values, detection_row, detection_schema, is_parquet_path, open_dataset,
+)
+
+DETECTION = {"detected_object_class": "bottle", "confidence_score": 0.9, "bbox": [1.0, 2.0, 3.0, 4.0]}
+
+
+def write_detections(root, rows, rows_per_file=1000):
+    writer = ParquetDatasetWriter(root, detection_schema(), partition_cols=["channel"], rows_per_file=rows_per_file)
+    for message_id, image in rows:
+        writer.write(detection_row(message_id, image, DETECTION))
+    writer.close()
+    return writer
+
+
+def test_rows_are_written_to_hive_channel_partitions(tmp_path):
+    writer = write_detections(tmp_path, [(1, "@CheMed123_1.jpg"), (2, "@lobelia4cosmetics_2.jpg"),
+                                         (3, "@CheMed123_3.jpg")])
+    assert writer.rows_written == 3
+    assert sorted(Path(path).parent.name for path in writer.files) == [
+        "channel=CheMed123", "channel=lobelia4cosmetics"]
+    table = open_dataset(tmp_path).to_table().sort_by("message_id")
+    assert table.column("message_id").to_pylist() == [1, 2, 3]
+    assert table.column("channel").to_pylist() == ["CheMed123", "lobelia4cosmetics", "CheMed123"]
+    assert table.column("bbox_x2").to_pylist() == [3.0, 3.0, 3.0]
+
+
+def test_each_flush_and_run_adds_files_instead_of_overwriting(tmp_path):
+    first = write_detections(tmp_path, [(1, "@CheMed123_1.jpg"), (2, "@CheMed123_2.jpg")], rows_per_file=1)
+    assert first.flushes == 2 and len(first.files) == 2
+    second = write_detections(tmp_path, [(3, "@CheMed123_3.jpg")])
+    assert column_values(tmp_path, "message_id") == {1, 2, 3}
+    # The files a writer reports are exactly what it wrote, so a run can load only those
+    assert open_dataset(second.files).to_table().column("message_id").to_pylist() == [3]
+
+
+def test_only_parquet_files_and_directories_count_as_parquet(tmp_path):
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    (csv_dir / "detections.csv").write_text("message_id\n1\n")
+    writer = write_detections(tmp_path / "dataset", [(1, "@CheMed123_1.jpg")])
+
+    assert is_parquet_path(tmp_path / "dataset")
+    assert is_parquet_path(writer.files)
+    assert is_parquet_path("missing.parquet")
+    assert not is_parquet_path(csv_dir)
+    assert not is_parquet_path(csv_dir / "detections.csv")
+    assert not is_parquet_path([])
+    assert column_values(csv_dir, "message_id") == set()
@@ -0,0 +1,38 @@
+import csv
+import json
+
+import combine_csvs_to_json
+from combine_csvs_to_json import SeenKeys
+
+
+def test_seen_keys_normalizes_numeric_ids():
+    seen = SeenKeys()
+    assert seen.add("@chemed", "123")
+    assert not seen.add("@chemed", "123.0")
+    assert not seen.add("@chemed", 123)
+    assert seen.add("@lobelia4cosmetics", "123.0")
+    assert seen.size == 2
+
+
+def test_seen_keys_falls_back_to_digest_for_other_ids():
+    seen = SeenKeys()
+    assert seen.add("@chemed", "abc")
+    assert not seen.add("@chemed", "abc")
+    assert seen.add("@chemed", "nan")
+    assert seen.add("@chemed", "inf")
+
+
+def test_combine_to_jsonl_skips_float_formatted_duplicates(tmp_path, monkeypatch):
+    header = ["Channel Title", "Channel Username", "ID", "Message", "Date", "Media Path"]
+    for name, message_id in [("a.csv", "123"), ("b.csv", "123.0")]:
+        with open(tmp_path / name, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerow(["CheMed", "@chemed", message_id, "hi", "2024-01-01T00:00:00", ""])
+    output = tmp_path / "all_data.jsonl"
+    monkeypatch.setattr(combine_csvs_to_json, "LABELED_DIR", str(tmp_path))
+    monkeypatch.setattr(combine_csvs_to_json, "OUTPUT_JSONL_FILE", str(output))
+
+    assert combine_csvs_to_json.combine_to_jsonl(schema="messages") == 1
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [row["ID"] for row in rows] == [123]
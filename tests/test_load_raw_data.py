@@ -0,0 +1,32 @@
+from load_raw_data import NO_CHANNEL_ID_BASE, _build_record
+
+
+def _message(message_id, chat=None):
+    msg = {"id": message_id, "text": "hello", "date": "2024-01-01T00:00:00"}
+    if chat is not None:
+        msg["chat"] = chat
+    return msg
+
+
+def test_build_record_keeps_chat_id():
+    record = _build_record(_message(1, {"id": 1234}), "{}", "@chemed")
+    assert record["channel_id"] == 1234
+
+
+def test_missing_chat_id_gets_a_stable_key_per_channel():
+    first = _build_record(_message(1, {"username": "@chemed"}), "{}", "@chemed")
+    again = _build_record(_message(1), "{}", "@chemed")
+    other = _build_record(_message(1), "{}", "@lobelia4cosmetics")
+
+    # Never NULL, so a re-run hits ON CONFLICT (channel_id, message_id) instead of inserting again
+    assert first["channel_id"] is not None
+    assert first["channel_id"] == again["channel_id"]
+    assert first["channel_id"] != other["channel_id"]
+    # Clear of real (positive) and synthetic (-1 .. -1000-n) channel ids
+    assert first["channel_id"] <= NO_CHANNEL_ID_BASE < -1000 - 10 ** 6
+
+
+def test_missing_chat_id_rows_dedupe_in_the_copy_stage():
+    records = [_build_record(_message(7), "{}", "@chemed") for _ in range(2)]
+    keys = {(r["channel_id"], r["message_id"]) for r in records}
+    assert len(keys) == 1
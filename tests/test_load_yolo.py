@@ -0,0 +1,67 @@
+import csv
+import io
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pyarrow")
+
+from columnar_io import ParquetDatasetWriter, detection_row, detection_schema  # noqa: E402
+from loadYOLO import iter_copy_batches, iter_parquet_copy_batches  # noqa: E402
+
+# Engine output: confidences widened from the model's float32, boxes rescaled in float64
+DETECTIONS = [
+    (101, "@CheMed123_101.jpg", {"detected_object_class": "bottle", "confidence_score": 0.8999999761581421,
+                                 "bbox": [12.345678901234567, 40.1, 220.00000000000003, 310.7]}),
+    (102, "@lobelia4cosmetics_102.jpg", {"detected_object_class": "person", "confidence_score": 0.25,
+                                         "bbox": [0.0, 1e-07, 639.9999, 479.5]}),
+]
+
+
+def as_postgres_would(value):
+    """Parse a COPY field the way Postgres stores it in raw.image_detections"""
+    if value.startswith("{"):
+        return tuple(float(v) for v in value.strip("{}").split(","))
+    return value
+
+
+def copied_rows(batches, csv_format):
+    rows = set()
+    for copy_text, _ in batches:
+        lines = csv.reader(io.StringIO(copy_text)) if csv_format else (
+            line.split("\t") for line in copy_text.splitlines())
+        for message_id, filename, object_class, confidence, bbox in lines:
+            rows.add((int(message_id), filename, object_class, float(confidence), as_postgres_would(bbox)))
+    return rows
+
+
+def test_csv_and_parquet_copy_the_same_key_and_confidence(tmp_path):
+    csv_path = tmp_path / "image_detections.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["message_id", "image_filename", "detected_object_class", "confidence_score", "bbox"])
+        for message_id, image, det in DETECTIONS:
+            # image_object_detection.py writes the box as str([bbox]) through pandas
+            writer.writerow([message_id, image, det["detected_object_class"], det["confidence_score"],
+                             str([det["bbox"]])])
+    parquet_writer = ParquetDatasetWriter(tmp_path / "image_detections", detection_schema(), partition_cols=["channel"])
+    for message_id, image, det in DETECTIONS:
+        parquet_writer.write(detection_row(message_id, image, det))
+    parquet_writer.close()
+
+    from_csv = copied_rows(iter_copy_batches(csv_path), csv_format=False)
+    from_parquet = copied_rows(iter_parquet_copy_batches(tmp_path / "image_detections"), csv_format=True)
+    assert len(from_csv) == len(DETECTIONS)
+    assert from_parquet == from_csv
+
+
+def test_invalid_rows_are_skipped_and_counted(tmp_path):
+    csv_path = tmp_path / "image_detections.csv"
+    csv_path.write_text("message_id,image_filename,detected_object_class,confidence_score,bbox\n"
+                        "1,@a_1.jpg,bottle,0.5,\"[[1, 2, 3, 4]]\"\n"
+                        ",@a_2.jpg,bottle,0.5,\n"
+                        "3,@a_3.jpg,bottle,high,\n")
+    stats = {}
+    batches = list(iter_copy_batches(csv_path, stats=stats))
+    assert [count for _, count in batches] == [1]
+    assert stats["invalid"] == 2
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, Registry
+
+
+def test_counter_renders_one_sorted_line_per_label_set():
+    counter = Counter("files_total", "Files", ["result"])
+    counter.inc(result="skipped")
+    counter.inc(3, result="loaded")
+    counter.inc(result="loaded")
+    assert counter.render() == ['files_total{result="loaded"} 4', 'files_total{result="skipped"} 1']
+    assert counter.total() == 5
+
+
+def test_label_values_are_escaped():
+    counter = Counter("messages_total", "Messages", ["channel"])
+    counter.inc(channel='a"b\\c\nd')
+    assert counter.render() == ['messages_total{channel="a\\"b\\\\c\\nd"} 1']
+
+
+def test_unlabelled_counter_has_no_braces():
+    counter = Counter("rows_total", "Rows")
+    counter.inc(2)
+    assert counter.render() == ["rows_total 2"]
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("seconds", "Latency", ["route"], buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, route="/x")
+    assert histogram.render() == [
+        'seconds_bucket{route="/x",le="0.1"} 2',  # a bound is inclusive, like Prometheus' le
+        'seconds_bucket{route="/x",le="1"} 3',
+        'seconds_bucket{route="/x",le="+Inf"} 4',
+        'seconds_sum{route="/x"} 2.65',
+        'seconds_count{route="/x"} 4',
+    ]
+
+
+def test_histogram_snapshot_interpolates_quantiles_inside_buckets():
+    histogram = Histogram("seconds", "Latency", buckets=(1, 2))
+    for value in (0.5, 1.5, 1.5, 1.5):
+        histogram.observe(value)
+    [series] = histogram.snapshot()
+    assert series["count"] == 4
+    assert series["mean"] == 1.25
+    assert series["p50"] == pytest.approx(1 + (2 - 1) * (2 - 1) / 3)
+    assert series["p99"] == pytest.approx(1 + (3.96 - 1) / 3)
+
+
+def test_registry_renders_help_and_type_and_reuses_metrics():
+    registry = Registry()
+    counter = registry._get(Counter, "b_total", "B things")
+    assert registry._get(Counter, "b_total", "ignored") is counter
+    counter.inc()
+    registry._get(Histogram, "a_seconds", "A time", (), (1,)).observe(0.5)
+    assert registry.render() == "\n".join([
+        "# HELP a_seconds A time",
+        "# TYPE a_seconds histogram",
+        'a_seconds_bucket{le="1"} 1',
+        'a_seconds_bucket{le="+Inf"} 1',
+        "a_seconds_sum 0.5",
+        "a_seconds_count 1",
+        "# HELP b_total B things",
+        "# TYPE b_total counter",
+        "b_total 1",
+    ]) + "\n"
+    assert list(registry.snapshot()) == ["a_seconds", "b_total"]
+
+
+@pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="METRICS=0")
+def test_timed_observes_sync_and_async_calls():
+    histogram = Histogram("call_seconds", "Calls", ["function"])
+
+    @metrics.timed(histogram, function="add")
+    def add(a, b):
+        return a + b
+
+    @metrics.timed(histogram, function="add_async")
+    async def add_async(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    assert asyncio.run(add_async(2, 3)) == 5
+    assert [s["labels"]["function"] for s in histogram.snapshot()] == ["add", "add_async"]
+    assert all(s["count"] == 1 for s in histogram.snapshot())
+
+
+@pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="METRICS=0")
+def test_run_report_records_duration_extras_and_metrics(tmp_path):
+    path = metrics.write_run_report("load", 1_700_000_000, {"rows_per_s": 10.0}, report_dir=str(tmp_path),
+                                    metrics_snapshot={"rows_total": [{"labels": {}, "value": 3}]})
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["run"] == "load"
+    assert report["started_at"] == "2023-11-14T22:13:20+00:00"
+    assert report["rows_per_s"] == 10.0
+    assert report["metrics"] == {"rows_total": [{"labels": {}, "value": 3}]}
+    assert report["duration_s"] > 0
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from perceptual_dedup import BKTree, NearDuplicateIndex, Representative, hamming, phash  # noqa: E402
+
+
+def brute_force(entries, key, max_distance):
+    matches = [(hamming(key, k), v) for k, v in entries if hamming(key, k) <= max_distance]
+    return min(matches, key=lambda m: m[0]) if matches else None
+
+
+def test_empty_tree_finds_nothing():
+    assert BKTree().find(0, 64) is None
+
+
+def test_identical_hash_keeps_the_first_value():
+    tree = BKTree()
+    tree.add(0b1010, "first")
+    tree.add(0b1010, "second")
+    assert tree.size == 1
+    assert tree.find(0b1010, 0) == (0, "first")
+
+
+def test_max_distance_is_inclusive():
+    tree = BKTree()
+    tree.add(0, "zero")
+    assert tree.find(0b111, 3) == (3, "zero")
+    assert tree.find(0b1111, 3) is None
+
+
+def test_matches_brute_force_on_random_hashes():
+    rng = random.Random(11)
+    entries = {}
+    tree = BKTree()
+    for i in range(500):
+        key = rng.getrandbits(64)
+        if key not in entries:
+            entries[key] = i
+            tree.add(key, i)
+    assert tree.size == len(entries)
+    for _ in range(200):
+        # Flip a few bits of a known hash so most queries have a match nearby
+        key = rng.choice(list(entries)) ^ sum(1 << rng.randrange(64) for _ in range(rng.randint(0, 8)))
+        for max_distance in (0, 4, 10):
+            found = tree.find(key, max_distance)
+            expected = brute_force(entries.items(), key, max_distance)
+            assert (found and found[0]) == (expected and expected[0])
+
+
+def test_index_seeds_representatives_from_earlier_runs():
+    index = NearDuplicateIndex(max_distance=4)
+    assert index.seed([("sha-a", 0, (100, 50)), ("sha-b", (1 << 64) - 1, (10, 10))]) == 2
+    representative = index.find(0b11)
+    assert representative.image_hash == "sha-a"
+    assert representative.size == (100, 50)
+    assert index.find(0xFFFF) is None
+
+
+def test_detections_are_rescaled_to_the_duplicate():
+    representative = Representative((100, 50))
+    representative.detections = [{"detected_object_class": "bottle", "bbox": [10, 10, 50, 40]}]
+    assert representative.detections_for((200, 25)) == [
+        {"detected_object_class": "bottle", "bbox": [20.0, 5.0, 100.0, 20.0]}]
+
+
+def test_phash_survives_resizing_and_reencoding():
+    rng = np.random.default_rng(3)
+    image = cv2.resize(rng.integers(0, 256, (16, 16, 3), dtype=np.uint8), (256, 256),
+                       interpolation=cv2.INTER_LINEAR)
+    smaller = cv2.resize(image, (180, 180), interpolation=cv2.INTER_AREA)
+    _, jpeg = cv2.imencode(".jpg", smaller, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    reencoded = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+    other = cv2.resize(rng.integers(0, 256, (16, 16, 3), dtype=np.uint8), (256, 256),
+                       interpolation=cv2.INTER_LINEAR)
+    assert hamming(phash(image), phash(reencoded)) <= 4
+    assert hamming(phash(image), phash(other)) > 4
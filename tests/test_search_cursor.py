@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from api.crud import decode_cursor, encode_cursor  # noqa: E402
+
+ROW = {"message_key": 42, "message_timestamp": "2025-01-02 10:30:00+00:00", "rank": 0.25}
+
+
+def test_recent_cursor_round_trips():
+    assert decode_cursor(encode_cursor(ROW, "recent"), "recent") == {
+        "cursor_timestamp": datetime(2025, 1, 2, 10, 30, tzinfo=timezone.utc),
+        "cursor_key": 42,
+    }
+
+
+def test_relevance_cursor_carries_the_rank():
+    params = decode_cursor(encode_cursor(ROW, "relevance"), "relevance")
+    assert params["cursor_rank"] == 0.25
+    assert params["cursor_key"] == 42
+
+
+def test_cursor_is_url_safe():
+    row = {**ROW, "message_text": "?&/+", "rank": 1 / 3}
+    for sort in ("recent", "relevance"):
+        cursor = encode_cursor(row, sort)
+        assert cursor.isascii() and not set(cursor) & set("+/?&")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "bm90IGpzb24=",  # base64 of 'not json'
+    "WyJ5ZXN0ZXJkYXkiLCAxXQ==",  # ["yesterday", 1]
+    "W251bGwsIDFd",  # [null, 1]
+    "é",
+])
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "recent")
+
+
+def test_cursor_of_another_sort_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(ROW, "recent"), "relevance")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(ROW, "relevance"), "recent")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    pytest.importorskip("psycopg2")  # api.database builds (but does not connect) the sync engine
+    try:
+        from fastapi.testclient import TestClient
+    except (ImportError, RuntimeError):  # fastapi, or the httpx package its TestClient needs, is missing
+        pytest.skip("fastapi's TestClient is not available")
+    import api.main as main
+
+    pages = {}
+
+    async def fake_page(db, cursor=None, **kwargs):
+        return pages[cursor]
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(main, "search_messages_page_async", fake_page)
+    monkeypatch.setitem(main.app.dependency_overrides, main.get_async_db, no_db)
+    return TestClient(main.app), pages
+
+
+def test_search_body_stays_a_list_with_the_cursor_in_a_header(client):
+    client, pages = client
+    result = {"message_key": 42, "message_id": 7, "channel_name": "c", "message_text": "paracetamol",
+              "message_timestamp": ROW["message_timestamp"], "rank": 0.25}
+    pages[None] = {"results": [result], "next_cursor": "next"}
+    pages["next"] = {"results": [], "next_cursor": None}
+
+    first = client.get("/api/search/messages", params={"query": "paracetamol"})
+    assert first.status_code == 200
+    assert first.json() == [result]
+    assert first.headers["X-Next-Cursor"] == "next"
+
+    last = client.get("/api/search/messages", params={"query": "paracetamol", "cursor": "next"})
+    assert last.json() == []
+    assert "X-Next-Cursor" not in last.headers
@@ -0,0 +1,127 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("telethon")
+
+from telegram_scrapper import PartitionedJsonlWriter  # noqa: E402
+
+
+def record(message_id, channel="@CheMed123", day=1, text="paracetamol in stock"):
+    return {"id": message_id, "date": datetime(2025, 1, day, 9, 0, tzinfo=timezone.utc), "message": text,
+            "chat": {"username": channel, "title": channel.lstrip("@")}, "media_path": None}
+
+
+def files(root):
+    return sorted(os.path.relpath(os.path.join(dirpath, name), root)
+                  for dirpath, _, names in os.walk(root) for name in names)
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_segments_are_partitioned_by_date_and_channel_and_published_on_close(tmp_path):
+    writer = PartitionedJsonlWriter(root=str(tmp_path))
+    writer.write(record(1))
+    writer.write(record(2, day=2))
+    writer.write(record(3, channel="@lobelia4cosmetics"))
+    writer.flush()
+    assert all(name.endswith(".jsonl.part") for name in files(tmp_path))
+
+    writer.close()
+    run_id = writer.run_id
+    assert files(tmp_path) == [
+        f"2025-01-01/CheMed123.{run_id}-0000.jsonl",
+        f"2025-01-01/lobelia4cosmetics.{run_id}-0000.jsonl",
+        f"2025-01-02/CheMed123.{run_id}-0000.jsonl",
+    ]
+    [line] = read_lines(tmp_path / "2025-01-01" / f"CheMed123.{run_id}-0000.jsonl")
+    assert line["id"] == 1
+    assert line["date"] == "2025-01-01T09:00:00+00:00"
+
+
+def test_full_segments_rotate_to_the_next_sequence_number(tmp_path):
+    writer = PartitionedJsonlWriter(root=str(tmp_path), rotate_bytes=1)
+    writer.write(record(1))
+    writer.write(record(2))
+    assert files(tmp_path) == [f"2025-01-01/CheMed123.{writer.run_id}-{seq:04d}.jsonl" for seq in (0, 1)]
+
+
+def test_least_recently_written_segment_is_published_when_too_many_are_open(tmp_path):
+    writer = PartitionedJsonlWriter(root=str(tmp_path), max_open_files=2)
+    writer.write(record(1, day=1))
+    writer.write(record(2, day=2))
+    writer.write(record(3, day=1))
+    writer.write(record(4, day=3))
+    run_id = writer.run_id
+    assert files(tmp_path) == [
+        f"2025-01-01/CheMed123.{run_id}-0000.jsonl.part",
+        f"2025-01-02/CheMed123.{run_id}-0000.jsonl",
+        f"2025-01-03/CheMed123.{run_id}-0000.jsonl.part",
+    ]
+    writer.close()
+
+
+def test_interrupted_segments_are_recovered_without_their_torn_line(tmp_path):
+    partition = tmp_path / "2025-01-01"
+    partition.mkdir()
+    (partition / "CheMed123.20250101T000000-0000.jsonl.part").write_text('{"id": 1}\n{"id": 2, "mess')
+
+    PartitionedJsonlWriter(root=str(tmp_path)).close()
+    assert files(tmp_path) == ["2025-01-01/CheMed123.20250101T000000-0000.jsonl"]
+    assert read_lines(partition / "CheMed123.20250101T000000-0000.jsonl") == [{"id": 1}]
+
+
+class CrashingClient:
+    """Wraps a FakeTelegramClient and fails after yielding `crash_after` messages"""
+
+    def __init__(self, client, crash_after):
+        self.client = client
+        self.crash_after = crash_after
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def iter_messages(self, entity, **kwargs):
+        sent = 0
+        async for message in self.client.iter_messages(entity, **kwargs):
+            if sent == self.crash_after:
+                raise ConnectionError("connection lost")
+            sent += 1
+            yield message
+
+
+def scraped_ids(tmp_path):
+    import csv
+    with open(tmp_path / "data" / "raw" / "telegram_data.csv", newline="", encoding="utf-8") as f:
+        return sorted(int(row["ID"]) for row in csv.DictReader(f))
+
+
+def test_incremental_run_resumes_after_failing_partway_through_a_channel(tmp_path, monkeypatch):
+    import asyncio
+    import telegram_scrapper
+    from synthetic_telegram import FakeTelegramClient, generate_corpus
+
+    monkeypatch.chdir(tmp_path)  # the CSV output, photos and checkpoint file are relative paths
+    state_path = tmp_path / "state.json"
+    monkeypatch.setattr(telegram_scrapper.CheckpointStore.__init__, "__defaults__", (str(state_path),))
+    corpus, photo_seeds = generate_corpus(channels=1, messages_per_channel=50, photo_ratio=0, seed=1)
+    channel = next(iter(corpus))
+    fake = FakeTelegramClient(corpus, photo_seeds)
+    # An earlier run wrote messages 1..20
+    state_path.write_text(json.dumps({channel: {"last_id": 20, "oldest_id": 1, "backfill_complete": True}}))
+
+    monkeypatch.setattr(telegram_scrapper, "client", CrashingClient(fake, crash_after=10))
+    with pytest.raises(ConnectionError):
+        asyncio.run(telegram_scrapper.main(output_mode="csv", channels=[channel]))
+    assert json.loads(state_path.read_text())[channel]["last_id"] == 30
+    assert scraped_ids(tmp_path) == list(range(21, 31))
+
+    monkeypatch.setattr(telegram_scrapper, "client", fake)
+    asyncio.run(telegram_scrapper.main(output_mode="csv", channels=[channel]))
+    assert json.loads(state_path.read_text())[channel]["last_id"] == 50
+    assert scraped_ids(tmp_path) == list(range(21, 51))
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import text_matcher
+from text_matcher import ContentClassifier, KeywordMatcher
+
+
+@pytest.fixture(params=["pyahocorasick", "python"])
+def backend(request, monkeypatch):
+    """Run each test against the C automaton (when installed) and the pure-Python one"""
+    if request.param == "pyahocorasick":
+        if text_matcher.ahocorasick is None:
+            pytest.skip("pyahocorasick is not installed")
+    else:
+        monkeypatch.setattr(text_matcher, "ahocorasick", None)
+    return request.param
+
+
+def brute_force(terms, text):
+    return sorted((start, start + len(term), payload)
+                  for term, payload in terms
+                  for start in range(len(text)) if term and text.startswith(term, start))
+
+
+def test_finds_overlapping_terms(backend):
+    terms = [("he", "he"), ("she", "she"), ("his", "his"), ("hers", "hers")]
+    assert sorted(KeywordMatcher(terms).find("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_terms_are_casefolded(backend):
+    matcher = KeywordMatcher([("Panadol", "paracetamol")])
+    assert list(matcher.find("buy PANADOL now".casefold())) == [(4, 11, "paracetamol")]
+
+
+def test_duplicate_terms_yield_every_payload(backend):
+    matcher = KeywordMatcher([("drug", "a"), ("DRUG", "b")])
+    assert sorted(matcher.find("drugs")) == [(0, 4, "a"), (0, 4, "b")]
+
+
+def test_no_terms_matches_nothing(backend):
+    assert list(KeywordMatcher([]).find("anything")) == []
+    assert list(KeywordMatcher([("", "empty")]).find("anything")) == []
+
+
+def test_matches_brute_force_on_random_text(backend):
+    rng = random.Random(7)
+    terms = [("".join(rng.choice("abc") for _ in range(rng.randint(1, 4))), i) for i in range(30)]
+    matcher = KeywordMatcher(terms)
+    for _ in range(50):
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 40)))
+        assert sorted(matcher.find(text)) == brute_force(terms, text)
+
+
+DICTIONARY = {
+    "flags": {"medical_content": ["medic", "drug"], "delivery_content": ["deliver"]},
+    "products": {"serum": ["serum"], "lotion": ["body lotion", "lotion"]},
+}
+
+
+def test_flags_match_inside_words(backend):
+    flags, mentions = ContentClassifier(DICTIONARY).classify("Medications delivered today")
+    assert flags == ["delivery_content", "medical_content"]
+    assert mentions == {}
+
+
+def test_products_match_whole_words_only(backend):
+    classifier = ContentClassifier(DICTIONARY)
+    assert classifier.classify("serumless formula")[1] == {}
+    assert classifier.classify("Serum, then more serum.")[1] == {"serum": (2, "serum")}
+
+
+def test_synonyms_ending_together_count_once(backend):
+    _, mentions = ContentClassifier(DICTIONARY).classify("new body lotion and a lotion refill")
+    assert mentions == {"lotion": (2, "body lotion")}
+
+
+def test_empty_text():
+    assert ContentClassifier(DICTIONARY).classify("") == ([], {})
+    assert ContentClassifier(DICTIONARY).classify(None) == ([], {})
+
+
+def test_version_follows_the_dictionary():
+    changed = {**DICTIONARY, "products": {**DICTIONARY["products"], "panadol": ["panadol"]}}
+    assert ContentClassifier(DICTIONARY).version == ContentClassifier(dict(DICTIONARY)).version
+    assert ContentClassifier(DICTIONARY).version != ContentClassifier(changed).version